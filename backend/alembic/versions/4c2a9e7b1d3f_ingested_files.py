@@ -0,0 +1,40 @@
+"""ingested files index
+
+Revision ID: 4c2a9e7b1d3f
+Revises: 93f6479cbd51
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2a9e7b1d3f'
+down_revision: Union[str, None] = '93f6479cbd51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingested_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(), nullable=True),
+    sa.Column('job_id', sa.String(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ingested_files_content_hash'), 'ingested_files', ['content_hash'], unique=True)
+    op.create_index(op.f('ix_ingested_files_id'), 'ingested_files', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ingested_files_id'), table_name='ingested_files')
+    op.drop_index(op.f('ix_ingested_files_content_hash'), table_name='ingested_files')
+    op.drop_table('ingested_files')
@@ -0,0 +1,157 @@
+"""
+Micro-batching in front of a vectorized scoring function.
+Concurrent callers submit small DataFrames; a worker thread collects them for up to max_wait_ms (from
+the oldest waiting request) or until max_batch_rows rows are queued, makes one call on the concatenated
+batch and hands every caller its own slice of the result. Set SCORING_BATCH_WAIT_MS=0 to score inline.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+import pandas as pd
+from utils.telemetry import scoring_batch_rows, scoring_queue_delay
+
+SCORING_BATCH_WAIT_MS = float(os.getenv("SCORING_BATCH_WAIT_MS", "1"))
+SCORING_BATCH_MAX_ROWS = int(os.getenv("SCORING_BATCH_MAX_ROWS", "1000"))
+BATCH_STATS_WINDOW = 1000  # recent batches / requests kept for stats()
+
+class _Request:
+    __slots__ = ("df", "future", "enqueued")
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+def _slice(result, start: int, stop: int):
+    if isinstance(result, tuple):
+        return tuple(_slice(part, start, stop) for part in result)
+    return np.asarray(result)[start:stop]
+
+class MicroBatcher:
+    def __init__(self, fn, max_wait_ms: float = None, max_batch_rows: int = None, name: str = "scoring"):
+        """fn(df) must return an array (or tuple of arrays) with one entry per row of df."""
+        self.fn = fn
+        self.max_wait_ms = SCORING_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms
+        self.max_batch_rows = max_batch_rows or SCORING_BATCH_MAX_ROWS
+        self.name = name
+        self.queue = queue.Queue()
+        self.carry = None  # request that did not fit in the previous batch
+        self.thread = None
+        self.lock = threading.Lock()
+        self.batches = self.requests = self.rows = self.errors = 0
+        self.batch_rows = deque(maxlen=BATCH_STATS_WINDOW)
+        self.queue_delays_ms = deque(maxlen=BATCH_STATS_WINDOW)
+
+    def submit(self, df: pd.DataFrame) -> Future:
+        """Queue df for scoring; the future resolves to fn's result for exactly these rows."""
+        request = _Request(df)
+        if self.max_wait_ms <= 0 or len(df) >= self.max_batch_rows:
+            # Nothing to gain from waiting: batching is off or the request fills a batch on its own
+            self._run([request])
+            return request.future
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self.thread.start()
+        self.queue.put(request)
+        return request.future
+
+    def __call__(self, df: pd.DataFrame, timeout: float = None):
+        """Blocking submit: fn's result for df, computed as part of a shared batch."""
+        return self.submit(df).result(timeout=timeout)
+
+    def close(self):
+        """Score whatever is queued, then stop the worker thread."""
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is not None and thread.is_alive():
+            self.queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        with self.lock:
+            sizes, delays = list(self.batch_rows), list(self.queue_delays_ms)
+            totals = {"batches": self.batches, "requests": self.requests, "rows": self.rows, "errors": self.errors}
+        return dict(
+            totals,
+            max_wait_ms=self.max_wait_ms,
+            max_batch_rows=self.max_batch_rows,
+            queued=self.queue.qsize(),
+            avg_batch_rows=float(np.mean(sizes)) if sizes else 0.0,
+            max_batch_rows_seen=max(sizes, default=0),
+            avg_queue_delay_ms=float(np.mean(delays)) if delays else 0.0,
+            p95_queue_delay_ms=float(np.percentile(delays, 95)) if delays else 0.0,
+        )
+
+    def _next(self, timeout=None):
+        if self.carry is not None:
+            request, self.carry = self.carry, None
+            return request
+        return self.queue.get(timeout=timeout)
+
+    def _worker(self):
+        while True:
+            first = self._next()
+            if first is None:
+                return
+            batch, rows = [first], len(first.df)
+            deadline = first.enqueued + self.max_wait_ms / 1000
+            stop = False
+            while rows < self.max_batch_rows:
+                try:
+                    request = self._next(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                if rows + len(request.df) > self.max_batch_rows:
+                    self.carry = request
+                    break
+                batch.append(request)
+                rows += len(request.df)
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch: list):
+        started = time.monotonic()
+        # Requests are concatenated only with others that have the same columns, so no row picks up
+        # NaNs for a column its caller never sent
+        groups = {}
+        for request in batch:
+            groups.setdefault(tuple(request.df.columns), []).append(request)
+        for requests in groups.values():
+            dfs = [r.df for r in requests]
+            df = dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+            try:
+                result = self.fn(df)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                for r in requests:
+                    r.future.set_exception(e)
+                continue
+            start = 0
+            for r in requests:
+                r.future.set_result(_slice(result, start, start + len(r.df)))
+                start += len(r.df)
+            self._record(requests, len(df), started)
+
+    def _record(self, requests: list, rows: int, started: float):
+        delays = [(started - r.enqueued) * 1000 for r in requests]
+        with self.lock:
+            self.batches += 1
+            self.requests += len(requests)
+            self.rows += rows
+            self.batch_rows.append(rows)
+            self.queue_delays_ms.extend(delays)
+        attrs = {"batcher": self.name}
+        scoring_batch_rows.record(rows, attributes=attrs)
+        for delay in delays:
+            scoring_queue_delay.record(delay, attributes=attrs)
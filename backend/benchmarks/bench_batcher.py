@@ -0,0 +1,59 @@
+"""
+Benchmark: many threads scoring one-row requests against the global IsolationForest, each calling
+ml.score directly vs. going through the MicroBatcher.
+
+Usage (from backend/):
+    python -m benchmarks.bench_batcher [--threads 32] [--requests 200] [--wait-ms 1]
+"""
+import argparse
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import ml
+from batcher import MicroBatcher
+from model_registry import ModelRegistry
+
+def run(fn, threads: int, requests: int) -> float:
+    rng = np.random.default_rng(0)
+    events = [pd.DataFrame({"amount": [float(a)]}) for a in rng.normal(100, 10, requests)]
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        for event in events:
+            fn(event)
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="requests per thread")
+    parser.add_argument("--wait-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    ml.anomaly_model = ModelRegistry("isolation_forest", model_dir=tempfile.mkdtemp())
+    ml.train_anomaly_model(pd.DataFrame({"amount": np.random.default_rng(1).normal(100, 10, 5000)}))
+    total = args.threads * args.requests
+
+    for label, fn in (("sklearn direct", lambda df: ml.anomaly_model.model.decision_function(df[["amount"]].to_numpy())),
+                      ("ml.score direct", ml.score)):
+        seconds = run(fn, args.threads, args.requests)
+        print(f"{label:<16}: {total / seconds:>9,.0f} req/s")
+
+    batcher = MicroBatcher(ml.score, max_wait_ms=args.wait_ms)
+    seconds = run(batcher, args.threads, args.requests)
+    stats = batcher.stats()
+    print(f"{'micro-batched':<16}: {total / seconds:>9,.0f} req/s   avg batch {stats['avg_batch_rows']:.1f} rows, "
+          f"queue delay avg {stats['avg_queue_delay_ms']:.2f} ms / p95 {stats['p95_queue_delay_ms']:.2f} ms")
+    batcher.close()
+
+if __name__ == "__main__":
+    main()
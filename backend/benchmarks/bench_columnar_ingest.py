@@ -0,0 +1,60 @@
+"""
+Benchmark: CSV vs Parquet ingest of the same dataset (parse + column prep + validation).
+
+Usage (from backend/):
+    python -m benchmarks.bench_columnar_ingest [--rows 1000000]
+
+Scoring and DB writes are identical for both formats and are left out.
+"""
+import argparse
+import time
+from io import BytesIO, StringIO
+import numpy as np
+import pandas as pd
+from utils.ingest import prepare_columns, read_columnar, validate_transactions
+
+def make_dataset(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s"),
+        "amount": np.round(rng.lognormal(5, 1.5, n), 2),
+        "type": rng.choice(["deposit", "withdrawal", "wire", "ach"], n),
+        "customer_id": rng.integers(1, 50000, n).astype(str),
+    })
+
+def ingest_csv(payload: bytes):
+    df = pd.read_csv(StringIO(payload.decode("utf-8")))
+    return validate_transactions(prepare_columns(df))
+
+def ingest_parquet(payload: bytes):
+    df = read_columnar(BytesIO(payload), "parquet")
+    return validate_transactions(prepare_columns(df))
+
+def best_of(fn, payload, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        clean_df, _ = fn(payload)
+        times.append(time.perf_counter() - start)
+    return min(times), len(clean_df)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows)
+    csv_payload = df.to_csv(index=False).encode("utf-8")
+    buf = BytesIO()
+    df.to_parquet(buf)
+    parquet_payload = buf.getvalue()
+
+    print(f"{'format':>8} {'size MB':>9} {'seconds':>9} {'rows/s':>12}")
+    for name, fn, payload in (("csv", ingest_csv, csv_payload), ("parquet", ingest_parquet, parquet_payload)):
+        seconds, rows = best_of(fn, payload, args.repeat)
+        assert rows == args.rows
+        print(f"{name:>8} {len(payload) / 1e6:>9.1f} {seconds:>9.3f} {rows / seconds:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
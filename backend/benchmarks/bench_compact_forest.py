@@ -0,0 +1,46 @@
+"""
+Benchmark: IsolationForest.decision_function vs. the array-backed CompactIsolationForest, for single
+events and for batches of increasing size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compact_forest [--features 8] [--repeat 2000]
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from compact_forest import CompactIsolationForest
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--features", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model = IsolationForest(contamination=0.05, random_state=42).fit(rng.normal(size=(10_000, args.features)))
+    start = time.perf_counter()
+    compact = CompactIsolationForest.from_sklearn(model)
+    print(f"export: {(time.perf_counter() - start) * 1000:.1f} ms, {compact.nbytes / 1024:.0f} KB")
+
+    event = rng.normal(size=args.features)
+    sk_us = per_call_us(lambda: model.decision_function(event.reshape(1, -1)), max(args.repeat // 20, 10))
+    compact_us = per_call_us(lambda: compact.score_one(event), args.repeat)
+    print(f"single event: sklearn {sk_us:8.1f} us   compact {compact_us:6.1f} us   ({sk_us / compact_us:.0f}x)")
+
+    for rows in (10, 100, 1000, 10_000):
+        X = rng.normal(size=(rows, args.features))
+        assert np.allclose(model.decision_function(X), compact.decision_function(X), atol=1e-12)
+        repeat = max(3, 200 // rows * 10)
+        sk_ms = per_call_us(lambda: model.decision_function(X), repeat) / 1000
+        compact_ms = per_call_us(lambda: compact.decision_function(X), repeat) / 1000
+        print(f"{rows:>6} rows:   sklearn {sk_ms:8.2f} ms   compact {compact_ms:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: per-customer model scoring, in-process vs. sharded across a process pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_customer_models [--customers 2000] [--rows 500000] [--workers 4]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from customer_models import CustomerModels
+from model_registry import ModelRegistry
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    means = rng.lognormal(5, 1.5, args.customers)
+    customers = rng.integers(0, args.customers, args.rows)
+    df = pd.DataFrame({
+        "timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(args.rows), unit="s"),
+        "amount": rng.normal(means[customers], means[customers] * 0.1),
+        "customer_id": customers.astype(str),
+    })
+    fallback = lambda part: np.zeros(len(part), dtype=bool)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cm = CustomerModels(registry=ModelRegistry("customer_models", model_dir=tmp),
+                            max_workers=args.workers, parallel_min_rows=1)
+        fit = cm.fit(df)
+        print(f"fit {fit['customers']:,} customer models on {args.rows:,} rows: {fit['latency_ms'] / 1000:.2f}s")
+
+        cm.predict(df.head(1000), fallback)  # start workers and load the bundle
+        start = time.perf_counter()
+        cm.predict(df, fallback)
+        pool_s = time.perf_counter() - start
+
+        cm.max_workers = 1
+        start = time.perf_counter()
+        cm.predict(df, fallback)
+        single_s = time.perf_counter() - start
+        cm.shutdown()
+
+    print(f"  in-process         : {args.rows / single_s:>12,.0f} rows/s  {single_s:.2f}s")
+    print(f"  process pool ({args.workers}x)  : {args.rows / pool_s:>12,.0f} rows/s  {pool_s:.2f}s")
+
+if __name__ == "__main__":
+    main()
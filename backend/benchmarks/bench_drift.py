@@ -0,0 +1,46 @@
+"""
+Benchmark: KLL sketch drift check vs. exact ks_2samp on full arrays.
+
+Usage (from backend/):
+    python -m benchmarks.bench_drift [--reference 5000000] [--current 1000000]
+"""
+import argparse
+import time
+import numpy as np
+from scipy.stats import ks_2samp
+from drift import KLLSketch, ks_test, psi
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reference", type=int, default=5_000_000)
+    parser.add_argument("--current", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    reference = rng.lognormal(5, 1.5, args.reference)
+    current = rng.lognormal(5.05, 1.5, args.current)
+
+    start = time.perf_counter()
+    ref_sketch = KLLSketch(seed=1)
+    for chunk in np.array_split(reference, max(1, args.reference // 10_000)):
+        ref_sketch.update(chunk)
+    cur_sketch = KLLSketch(seed=2).update(current)
+    update_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stat, p_value = ks_test(ref_sketch, cur_sketch)
+    stability = psi(ref_sketch, cur_sketch)
+    check_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    exact = ks_2samp(reference, current)
+    exact_ms = (time.perf_counter() - start) * 1000
+
+    print(f"reference {args.reference:,} values (10k-row batches), current {args.current:,}")
+    print(f"  sketch updates : {update_s * 1000:8.1f} ms, {ref_sketch.nbytes + cur_sketch.nbytes:,} bytes for both sketches")
+    print(f"  sketch check   : {check_ms:8.2f} ms  KS={stat:.4f} p={p_value:.3g} PSI={stability:.4f}")
+    print(f"  exact ks_2samp : {exact_ms:8.1f} ms  KS={exact.statistic:.4f} p={exact.pvalue:.3g} "
+          f"(needs {(reference.nbytes + current.nbytes) / 1e6:,.0f} MB in memory)")
+
+if __name__ == "__main__":
+    main()
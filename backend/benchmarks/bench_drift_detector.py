@@ -0,0 +1,48 @@
+"""
+Benchmark: ml_extended.DriftDetector throughput (Welford moments, Page-Hinkley and three tumbling
+window lengths) on a stream with a mean shift half way, fed in batches and one value at a time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_drift_detector [--rows 5000000] [--batch 100000]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from ml_extended import DriftDetector
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    half = args.rows // 2
+    values = np.concatenate([rng.lognormal(4, 1, half), rng.lognormal(4.3, 1, args.rows - half)])
+
+    detector = DriftDetector()
+    detector.update_reference(pd.DataFrame({"amount": rng.lognormal(4, 1, 100_000)}))
+    start = time.perf_counter()
+    events = []
+    for i in range(0, len(values), args.batch):
+        events += detector.update(values[i:i + args.batch])
+    seconds = time.perf_counter() - start
+    print(f"batches of {args.batch:,}: {len(values) / seconds / 1e6:6.1f} M values/s, {len(events)} events")
+    first = next((e for e in events if e["detector"] == "page_hinkley"), None)
+    if first:
+        print(f"  page-hinkley change point {first['change_point']:,} (true {half:,}), "
+              f"mean {first['mean_before']:.1f} -> {first['mean_after']:.1f}")
+    for length, stats in detector.report()["windows"].items():
+        print(f"  last {int(length):>7,}-value window: mean shift {stats['mean_shift']:+.2f} sd, std ratio {stats['std_ratio']:.2f}")
+
+    single = DriftDetector()
+    single.update_reference(pd.DataFrame({"amount": values[:1000]}))
+    n = 20_000
+    start = time.perf_counter()
+    for value in values[:n]:
+        single.update(value)
+    print(f"one value per call: {(time.perf_counter() - start) / n * 1e6:.1f} us/value")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: ensemble_model_predict with IsolationForest / RandomForest / LogisticRegression members,
+serial scipy-mode combiner (previous implementation) vs. thread-pool members and bincount voting.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ensemble [--rows 200000]
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+import ml
+
+def serial_mode(models, X):
+    from scipy.stats import mode
+    votes = np.array([model.predict(X) for model in models])
+    return mode(votes, axis=0, keepdims=False)[0].tolist()
+
+class Precomputed:
+    """Member that returns fixed labels, to time the combining step alone."""
+    def __init__(self, labels):
+        self.labels = labels
+
+    def predict(self, X):
+        return self.labels
+
+def median_ms(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(args.rows, 4))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=args.rows) > 1.5).astype(int)
+    fit_X, fit_y = X[:20_000], y[:20_000]
+    models = [
+        RandomForestClassifier(n_estimators=50, random_state=0).fit(fit_X, fit_y),
+        LogisticRegression().fit(fit_X, fit_y),
+        RandomForestClassifier(n_estimators=50, random_state=1, max_depth=6).fit(fit_X, fit_y),
+    ]
+    forest = IsolationForest(random_state=0).fit(fit_X)
+
+    assert serial_mode(models, X) == ml.ensemble_model_predict(models, X)
+    print(f"{args.rows:,} rows, {len(models)} classifiers ({ml.ENSEMBLE_MAX_WORKERS} worker threads)")
+    print(f"  serial + scipy mode : {median_ms(lambda: serial_mode(models, X)):8.1f} ms")
+    print(f"  hard voting         : {median_ms(lambda: ml.ensemble_model_predict(models, X)):8.1f} ms")
+    print(f"  weighted hard       : {median_ms(lambda: ml.ensemble_model_predict(models, X, weights=[2, 1, 1])):8.1f} ms")
+    print(f"  soft voting         : {median_ms(lambda: ml.ensemble_model_predict(models, X, voting='soft')):8.1f} ms")
+    members = [forest] * 3
+    print(f"  3x IsolationForest  : {median_ms(lambda: ml.ensemble_model_predict(members, X)):8.1f} ms "
+          f"(serial {median_ms(lambda: serial_mode(members, X)):.1f} ms)")
+
+    fixed = [Precomputed(rng.choice([-1, 1], size=args.rows * 5)) for _ in range(3)]
+    print(f"  combine only, {args.rows * 5:,} x 3 votes: scipy mode "
+          f"{median_ms(lambda: serial_mode(fixed, None)):.1f} ms, bincount/sum "
+          f"{median_ms(lambda: ml.ensemble_model_predict(fixed, None)):.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: compiled fraud rule engine, 20 rules (thresholds, combos, per-customer velocity) over 1M rows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_fraud_rules [--rows 1000000] [--customers 50000]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from fraud_rules import DEFAULT_RULES, FraudRuleEngine
+
+TYPES = ["debit", "credit", "wire", "card", "atm"]
+
+def rules():
+    out = list(DEFAULT_RULES)
+    for i, limit in enumerate([2000, 5000, 20000, 50000]):
+        out.append({"name": f"amount_over_{limit}", "kind": "threshold", "column": "amount", "op": ">", "value": limit})
+    for t in TYPES:
+        out.append({"name": f"large_{t}", "kind": "all", "conditions": [
+            {"column": "type", "op": "==", "value": t}, {"column": "amount", "op": ">", "value": 3000}]})
+    out.append({"name": "risky_type", "kind": "threshold", "column": "type", "op": "in", "value": ["wire", "atm"]})
+    out.append({"name": "tiny_amount", "kind": "threshold", "column": "amount", "op": "<", "value": 1})
+    for window, count in [(60, 3), (300, 5), (3600, 10), (86400, 20)]:
+        out.append({"name": f"velocity_{count}_in_{window}s", "kind": "velocity", "key": "customer_id",
+                    "window_seconds": window, "max_count": count})
+    out.append({"name": "type_burst", "kind": "velocity", "key": "type", "window_seconds": 1, "max_count": 50})
+    out.append({"name": "negative_amount", "kind": "threshold", "column": "amount", "op": "<", "value": 0})
+    out.append({"name": "round_amount", "kind": "threshold", "column": "amount", "op": "in", "value": [1000.0, 5000.0, 10000.0]})
+    return out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 30 * 86400, args.rows), unit="s"),
+        "amount": rng.lognormal(5, 1.5, args.rows).round(2),
+        "type": rng.choice(TYPES, args.rows),
+        "customer_id": rng.integers(0, args.customers, args.rows).astype(str),
+    })
+    engine = FraudRuleEngine(rules())
+    engine.apply(df.head(1000))
+    start = time.perf_counter()
+    result = engine.apply(df)
+    elapsed = time.perf_counter() - start
+    print(f"{args.rows:,} rows x {len(engine.names)} rules: {elapsed * 1000:.0f} ms "
+          f"({args.rows / elapsed:,.0f} rows/s), {int(result['is_fraud'].sum()):,} flagged")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: loading a published model bundle in several worker processes, copied vs. memory-mapped.
+Reports load time and the private (unshared) memory each worker adds after scoring with the compact
+export, plus the cost of ModelRegistry.refresh() on the scoring path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_model_mmap [--workers 4] [--trees 1000] [--rows 20000]
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from compact_forest import CompactIsolationForest
+from model_registry import ModelRegistry
+
+def private_kb() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        return sum(int(line.split()[1]) for line in f if line.startswith(("Private_Clean", "Private_Dirty")))
+
+def worker(model_dir: str, mmap: bool, results):
+    before = private_kb()
+    start = time.perf_counter()
+    registry = ModelRegistry("bench", model_dir=model_dir, mmap=mmap)
+    registry.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    registry.artifacts["compact"].decision_function(np.random.default_rng(0).normal(size=(500, 1)))
+    results.put((load_ms, private_kb() - before))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    model = IsolationForest(n_estimators=args.trees, max_samples=4096, random_state=42)
+    model.fit(np.random.default_rng(0).normal(size=(args.rows, 1)))
+    compact = CompactIsolationForest.from_sklearn(model)
+    print(f"compact export: {compact.nbytes / 2**20:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        ModelRegistry("bench", model_dir=model_dir).publish(model, artifacts={"compact": compact})
+        ctx = multiprocessing.get_context("spawn")
+        for mmap in (False, True):
+            results = ctx.Queue()
+            procs = [ctx.Process(target=worker, args=(model_dir, mmap, results)) for _ in range(args.workers)]
+            for p in procs:
+                p.start()
+            stats = [results.get() for _ in procs]
+            for p in procs:
+                p.join()
+            load_ms, private = np.mean(stats, axis=0)
+            label = "mmap" if mmap else "copy"
+            print(f"{label}: load {load_ms:7.1f} ms   private memory per worker {private / 1024:6.1f} MB")
+
+        registry = ModelRegistry("bench", model_dir=model_dir, reload_seconds=5)
+        registry.load()
+        repeat = 1_000_000
+        start = time.perf_counter()
+        for _ in range(repeat):
+            registry.refresh()
+        print(f"refresh(): {(time.perf_counter() - start) / repeat * 1e9:.0f} ns per call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: NDJSON streaming ingest throughput (events/sec) on a single worker.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ndjson_stream [--events 200000] [--batch-size 5000]
+
+Runs utils.ingest_stream.ingest_ndjson against an in-memory SQLite database with the real
+ml.detect_anomalies, feeding the body in 64 KB chunks like request.stream() does.
+"""
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from utils.ingest_stream import ingest_ndjson
+
+def make_body(n: int, seed: int = 42) -> bytes:
+    rng = np.random.default_rng(seed)
+    amounts = np.round(rng.lognormal(5, 1.5, n), 2)
+    types = rng.choice(["deposit", "withdrawal", "wire", "ach"], n)
+    customers = rng.integers(1, 50000, n)
+    return "".join(
+        json.dumps({"timestamp": f"2024-01-01T{i % 24:02d}:{i % 60:02d}:00", "amount": float(a), "type": str(t), "customer_id": str(c)}) + "\n"
+        for i, (a, t, c) in enumerate(zip(amounts, types, customers))
+    ).encode()
+
+async def chunked(body: bytes, size: int = 65536):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    body = make_body(args.events)
+
+    start = time.perf_counter()
+    result = asyncio.run(ingest_ndjson(db, chunked(body), batch_size=args.batch_size))
+    elapsed = time.perf_counter() - start
+    assert result["inserted"] == args.events
+    print(f"{args.events:,} events, batch {args.batch_size}: {elapsed:.2f} s, {args.events / elapsed:,.0f} events/s")
+
+if __name__ == "__main__":
+    main()
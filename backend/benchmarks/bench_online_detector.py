@@ -0,0 +1,49 @@
+"""
+Benchmark: online detector throughput (events/sec) and per-event latency.
+
+Usage (from backend/):
+    python -m benchmarks.bench_online_detector [--events 1000000] [--customers 50000]
+"""
+import argparse
+import time
+import numpy as np
+import ml
+from online_detector import OnlineAnomalyDetector
+import online_detector as od
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    customers = [str(c) for c in rng.integers(0, args.customers, args.events)]
+    amounts = rng.lognormal(5, 1.5, args.events).tolist()
+
+    det = OnlineAnomalyDetector()
+    start = time.perf_counter()
+    for cid, amount in zip(customers, amounts):
+        det.update(cid, amount)
+    update_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for cid, amount in zip(customers, amounts):
+        det.score(cid, amount)
+    score_s = time.perf_counter() - start
+
+    od.online_detector = OnlineAnomalyDetector()
+    events = [{"customer_id": cid, "amount": amount} for cid, amount in zip(customers, amounts)]
+    start = time.perf_counter()
+    for event in events:
+        ml.real_time_scoring_pipeline(event)
+    pipeline_s = time.perf_counter() - start
+
+    n = args.events
+    print(f"{n:,} events over {args.customers:,} customers")
+    print(f"  update (score + learn)     : {n / update_s:>12,.0f} events/s  {update_s / n * 1e6:6.2f} us/event")
+    print(f"  score only                 : {n / score_s:>12,.0f} events/s  {score_s / n * 1e6:6.2f} us/event")
+    print(f"  real_time_scoring_pipeline : {n / pipeline_s:>12,.0f} events/s  {pipeline_s / n * 1e6:6.2f} us/event")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark: anomaly scoring latency per batch, fit-per-call vs score-only against a trained model.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scoring [--batch 1000] [--repeat 20]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import ml
+from model_registry import ModelRegistry
+
+def batch_of(n: int, seed: int) -> pd.DataFrame:
+    return pd.DataFrame({"amount": np.random.default_rng(seed).lognormal(5, 1.5, n)})
+
+def median_ms(fn, batches):
+    times = []
+    for batch in batches:
+        start = time.perf_counter()
+        fn(batch)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    batches = [batch_of(args.batch, seed) for seed in range(args.repeat)]
+
+    fit_ms = median_ms(lambda df: ml._new_isolation_forest().fit_predict(df[ml.ANOMALY_FEATURES]), batches)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        ml.anomaly_model = ModelRegistry("isolation_forest", model_dir=model_dir)
+        ml.train_anomaly_model(batch_of(100_000, seed=999))
+        score_ms = median_ms(ml.score, batches)
+
+    print(f"batch of {args.batch} rows (median of {args.repeat})")
+    print(f"  fit per call : {fit_ms:8.2f} ms")
+    print(f"  score only   : {score_ms:8.2f} ms  ({fit_ms / score_ms:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark: IsolationForest training time vs. table size, fitting on every row (previous behaviour)
+vs. a stratified reservoir sample of TRAIN_SAMPLE_ROWS rows built from streamed chunks.
+
+Usage (from backend/):
+    python -m benchmarks.bench_training_sample [--sizes 100000 1000000 4000000] [--chunk-rows 100000]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sampling import StratifiedReservoir
+
+def chunks(rows: int, chunk_rows: int):
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        yield pd.DataFrame({
+            "amount": rng.lognormal(4, 1, n),
+            "type": rng.choice(["card", "wire", "ach", "crypto"], n, p=[0.6, 0.25, 0.149, 0.001]),
+            "customer_id": rng.integers(0, 10_000, n).astype(str),
+        })
+
+def fit(df: pd.DataFrame):
+    IsolationForest(contamination=0.05, random_state=42).fit(df[["amount"]].to_numpy(dtype=float))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for rows in args.sizes:
+        start = time.perf_counter()
+        fit(pd.concat(chunks(rows, args.chunk_rows), ignore_index=True))
+        full_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reservoir = StratifiedReservoir()
+        for chunk in chunks(rows, args.chunk_rows):
+            reservoir.add(chunk)
+        sample = reservoir.sample()
+        sampled_s = time.perf_counter() - start
+        fit(sample)
+        fit_s = time.perf_counter() - start - sampled_s
+        print(f"{rows:>10,} rows: full fit {full_s:6.2f} s   sampled {sampled_s + fit_s:6.2f} s "
+              f"(sampling incl. data generation {sampled_s:.2f} s, fit on {len(sample):,} rows {fit_s:.2f} s)")
+
+if __name__ == "__main__":
+    main()
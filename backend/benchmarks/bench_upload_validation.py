@@ -0,0 +1,75 @@
+"""
+Benchmark: row-wise vs column-wise validation of uploaded transactions.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_validation [--sizes 10000 100000 1000000] [--legacy-max 100000]
+
+The row-wise baseline reproduces the previous iterrows() + safe_parse loop from
+routes/transactions.py. It is skipped above --legacy-max rows because it takes minutes.
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.ingest import validate_transactions
+
+def make_upload(n: int, bad_fraction: float = 0.01, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s")
+    df = pd.DataFrame({
+        "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"),
+        "amount": np.round(rng.lognormal(5, 1.5, n), 2).astype(str),
+        "type": rng.choice(["deposit", "withdrawal", "wire", "ach"], n),
+        "customer_id": rng.integers(1, 50000, n).astype(str),
+    })
+    bad = rng.random(n) < bad_fraction
+    df.loc[bad, "amount"] = "invalid"
+    return df
+
+def legacy_validate(df: pd.DataFrame):
+    def safe_parse(row, idx):
+        try:
+            ts = pd.to_datetime(row['timestamp'])
+            amt = float(row['amount'])
+            typ = str(row['type'])
+            cid = str(row['customer_id'])
+            return {'timestamp': ts, 'amount': amt, 'type': typ, 'customer_id': cid}, None
+        except Exception as e:
+            return None, f"Row {idx+1}: {str(e)}"
+
+    valid_rows, errors = [], []
+    for idx, row in df.iterrows():
+        parsed, err = safe_parse(row, idx)
+        if parsed:
+            valid_rows.append(parsed)
+        else:
+            errors.append(err)
+    return pd.DataFrame(valid_rows), errors
+
+def timed(fn, df):
+    start = time.perf_counter()
+    clean_df, errors = fn(df)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(clean_df), len(errors)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-wise rows/s':>18} {'vectorized rows/s':>20} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_upload(n)
+        new_s, new_ok, new_err = timed(validate_transactions, df)
+        if n <= args.legacy_max:
+            old_s, old_ok, old_err = timed(legacy_validate, df)
+            assert (old_ok, old_err) == (new_ok, new_err)
+            old_rate = f"{n / old_s:,.0f}"
+            speedup = f"{old_s / new_s:,.0f}x"
+        else:
+            old_rate, speedup = "skipped", "-"
+        print(f"{n:>10,} {old_rate:>18} {n / new_s:>20,.0f} {speedup:>9}")
+
+if __name__ == "__main__":
+    main()
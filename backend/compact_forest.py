@@ -0,0 +1,134 @@
+"""
+Array-backed IsolationForest evaluator.
+CompactIsolationForest flattens a fitted sklearn IsolationForest into a few contiguous arrays (split
+feature, threshold, children, leaf path length) covering every tree, and walks all trees one level
+at a time with NumPy. Scores match sklearn's, without its per-call validation and per-tree loop, which
+dominate when scoring a handful of rows.
+"""
+import numpy as np
+
+COMPACT_CHUNK_ROWS = 4096  # rows walked at once; bounds the (rows, trees) node index matrix
+
+def average_path_length(n_samples) -> np.ndarray:
+    """Expected path length of an unsuccessful BST search among n samples (sklearn's c(n))."""
+    n = np.asarray(n_samples, dtype=float)
+    safe = np.maximum(n, 3.0)
+    c = 2.0 * (np.log(safe - 1.0) + np.euler_gamma) - 2.0 * (safe - 1.0) / safe
+    return np.where(n <= 1, 0.0, np.where(n <= 2, 1.0, c))
+
+def _node_depths(children_left: np.ndarray, children_right: np.ndarray) -> np.ndarray:
+    depths = np.zeros(len(children_left), dtype=np.int64)
+    frontier = np.array([0])
+    while len(frontier):
+        frontier = frontier[children_left[frontier] >= 0]
+        children = np.concatenate([children_left[frontier], children_right[frontier]])
+        depths[children] = np.concatenate([depths[frontier], depths[frontier]]) + 1
+        frontier = children
+    return depths
+
+class CompactIsolationForest:
+    def __init__(self, feature, threshold, children, leaf_value, nan_right, roots, max_depth,
+                 denominator, offset, n_features):
+        self.feature = feature          # global input column split on, per node (0 for leaves)
+        self.threshold = threshold      # go right when x > threshold; +inf for leaves
+        self.children = children        # flat [left, right] pairs: node i's children at 2i, 2i+1
+        self.leaf_value = leaf_value    # depth + c(n_node_samples), used at leaves only
+        self.nan_right = nan_right      # where a missing value goes at each node
+        self.roots = roots              # root node of each tree
+        self.max_depth = max_depth
+        self.denominator = denominator  # n_estimators * c(max_samples)
+        self.offset = offset
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompactIsolationForest":
+        """Export a fitted IsolationForest."""
+        features, thresholds, children, leaf_values, nan_right, roots = [], [], [], [], [], []
+        start, max_depth = 0, 0
+        for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+            t = tree.tree_
+            left, right = t.children_left.astype(np.int64), t.children_right.astype(np.int64)
+            is_leaf = left < 0
+            node = np.arange(t.node_count)
+            depths = _node_depths(left, right)
+            # Leaves point back at themselves, so every row can take max_depth steps
+            children.append(np.stack([np.where(is_leaf, node, left), np.where(is_leaf, node, right)], axis=1) + start)
+            features.append(np.where(is_leaf, 0, np.asarray(tree_features)[np.maximum(t.feature, 0)]))
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            leaf_values.append(depths + average_path_length(t.n_node_samples))
+            nan_right.append(~is_leaf & (t.missing_go_to_left == 0) if hasattr(t, "missing_go_to_left") else ~is_leaf)
+            roots.append(start)
+            start += t.node_count
+            max_depth = max(max_depth, int(depths.max()))
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(float),
+            children=np.concatenate(children).ravel().astype(np.intp),
+            leaf_value=np.concatenate(leaf_values),
+            nan_right=np.concatenate(nan_right),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            denominator=len(model.estimators_) * float(average_path_length(model.max_samples_)),
+            offset=float(model.offset_),
+            n_features=model.n_features_in_,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.leaf_value, self.nan_right))
+
+    def _go_right(self, values, nodes):
+        go_right = values > self.threshold[nodes]
+        missing = np.isnan(values)
+        if missing.any():
+            go_right |= missing & self.nan_right[nodes]
+        return go_right
+
+    def _score_row(self, x: np.ndarray) -> float:
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            nodes = self.children[2 * nodes + self._go_right(x[self.feature[nodes]], nodes)]
+        return self._score(self.leaf_value[nodes].sum())
+
+    def _score_rows(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            nodes = self.children[2 * nodes + self._go_right(X[rows, self.feature[nodes]], nodes)]
+        return self._score(self.leaf_value[nodes].sum(axis=1))
+
+    def _score(self, depths):
+        # A forest fit on a single sample has depth and denominator 0; sklearn scores it as 1
+        if self.denominator == 0:
+            return -np.ones_like(depths)
+        return -(2.0 ** (-depths / self.denominator))
+
+    def _validate(self, X) -> np.ndarray:
+        # sklearn compares float32 inputs against its thresholds; do the same so scores match exactly
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[-1]} features, but the forest expects {self.n_features}.")
+        return X.astype(float)
+
+    def score_samples(self, X) -> np.ndarray:
+        """Same as IsolationForest.score_samples: lower is more abnormal."""
+        X = self._validate(X)
+        if len(X) == 1:
+            return np.array([self._score_row(X[0])])
+        return np.concatenate([self._score_rows(X[i:i + COMPACT_CHUNK_ROWS])
+                               for i in range(0, len(X), COMPACT_CHUNK_ROWS)] or [np.empty(0)])
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X) -> np.ndarray:
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+    def score_one(self, x) -> float:
+        """decision_function of a single row given as a flat sequence of feature values."""
+        x = np.asarray(x, dtype=np.float32).astype(float)
+        if x.shape != (self.n_features,):
+            raise ValueError(f"Expected {self.n_features} feature values, got shape {x.shape}.")
+        return float(self._score_row(x)) - self.offset
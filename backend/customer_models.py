@@ -0,0 +1,221 @@
+"""
+Per-customer baseline models.
+Customers with enough history get their own small IsolationForest over amount, so a $20k transfer
+can be normal for one customer and anomalous for another. Batches are partitioned by customer_id;
+large batches are scored across a process pool, each worker loading the published model bundle
+once per version. Rows of customers without a model go to the global model.
+Kept free of app imports (models, ml) so spawned worker processes start quickly.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from model_registry import ModelRegistry
+from sampling import StratifiedReservoir
+
+CUSTOMER_MODEL_MIN_SAMPLES = int(os.getenv("CUSTOMER_MODEL_MIN_SAMPLES", "50"))
+CUSTOMER_MODEL_MAX = int(os.getenv("CUSTOMER_MODEL_MAX", "10000"))
+# Models not used for this long are dropped and their customers fall back to the global model
+CUSTOMER_MODEL_IDLE_SECONDS = int(os.getenv("CUSTOMER_MODEL_IDLE_SECONDS", str(7 * 24 * 3600)))
+EVICT_INTERVAL_SECONDS = 3600
+CUSTOMER_MODEL_WORKERS = int(os.getenv("CUSTOMER_MODEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+CUSTOMER_MODEL_PARALLEL_MIN_ROWS = int(os.getenv("CUSTOMER_MODEL_PARALLEL_MIN_ROWS", "50000"))
+# Rows per customer kept when sampling retraining data; a model only looks at 64 of them per tree
+CUSTOMER_MODEL_SAMPLE_ROWS = int(os.getenv("CUSTOMER_MODEL_SAMPLE_ROWS", "1000"))
+# Total rows kept across all customers; with many customers each one keeps fewer than the above
+CUSTOMER_MODEL_SAMPLE_MAX_ROWS = int(os.getenv("CUSTOMER_MODEL_SAMPLE_MAX_ROWS", "500000"))
+
+_worker_models = {}  # bundle path -> {customer_id: model}, one entry per worker process
+
+def _new_customer_model(n_samples: int):
+    # Few, shallow trees: a per-customer baseline only has to model one amount distribution
+    return IsolationForest(n_estimators=32, max_samples=min(64, n_samples), contamination=0.05, random_state=42)
+
+def _fit_groups(groups):
+    """Fit one model per (customer_id, amounts) pair."""
+    models = {}
+    for customer_id, amounts in groups:
+        model = _new_customer_model(len(amounts))
+        model.fit(amounts.reshape(-1, 1))
+        models[customer_id] = model
+    return models
+
+def _score_groups(models, groups):
+    return [models[customer_id].decision_function(amounts.reshape(-1, 1)) for customer_id, amounts in groups]
+
+def _score_shard(bundle_path: str, groups):
+    models = _worker_models.get(bundle_path)
+    if models is None:
+        _worker_models.clear()
+        models = _worker_models[bundle_path] = joblib.load(bundle_path, mmap_mode="r")["model"]
+    return _score_groups(models, groups)
+
+def _shards(groups, parts: int):
+    """Partition (customer_id, ...) groups by a stable hash of customer_id."""
+    shards = [[] for _ in range(parts)]
+    for i, group in enumerate(groups):
+        shards[zlib.crc32(group[0].encode()) % parts].append(i)
+    return [shard for shard in shards if shard]
+
+class CustomerModels:
+    def __init__(self, registry: ModelRegistry = None, min_samples=None, max_customers=None,
+                 max_workers=None, parallel_min_rows=None):
+        self.registry = registry or ModelRegistry("customer_models")
+        self.min_samples = min_samples or CUSTOMER_MODEL_MIN_SAMPLES
+        self.max_customers = max_customers or CUSTOMER_MODEL_MAX
+        self.max_workers = max_workers or CUSTOMER_MODEL_WORKERS
+        self.parallel_min_rows = parallel_min_rows or CUSTOMER_MODEL_PARALLEL_MIN_ROWS
+        self.last_used = {}  # customer_id -> time of last scoring
+        self.last_evict = time.time()
+        self.pool = None
+        self.lock = threading.Lock()
+
+    @property
+    def models(self) -> dict:
+        return self._snapshot()[1]
+
+    def _snapshot(self):
+        """(version, models) read together, so pool workers load the bundle the models came from."""
+        if self.registry.refresh():
+            # Published by another worker process: its customers start out as recently used
+            self.last_used = dict.fromkeys(self.registry.model or {}, time.time())
+        with self.registry.lock:
+            return self.registry.version, self.registry.model or {}
+
+    def _executor(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.pool
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+
+    def _parallel(self, rows: int) -> bool:
+        return self.max_workers > 1 and rows >= self.parallel_min_rows
+
+    def load(self) -> bool:
+        loaded = self.registry.load()
+        if loaded:
+            now = time.time()
+            self.last_used = dict.fromkeys(self.models, now)
+        return loaded
+
+    def fit(self, df: pd.DataFrame) -> dict:
+        """
+        Fit a model for each customer with at least min_samples rows in df (keeping the
+        max_customers most recently active ones) and publish them as the next registry version.
+        When no customer qualifies, nothing is published and the current version stays loaded.
+        """
+        start = time.time()
+        customers = df["customer_id"].astype(str)
+        counts = customers.value_counts()
+        eligible = counts[counts >= self.min_samples]
+        if len(eligible) > self.max_customers:
+            recency = df["timestamp"].groupby(customers).max() if "timestamp" in df else counts
+            eligible = recency[eligible.index].nlargest(self.max_customers)
+        subset = customers.isin(eligible.index)
+        groups = [(cid, g.to_numpy(dtype=float)) for cid, g in df["amount"][subset].groupby(customers[subset])]
+
+        if self._parallel(int(subset.sum())):
+            pool = self._executor()
+            models = {}
+            for part in pool.map(_fit_groups, [[groups[i] for i in shard] for shard in _shards(groups, self.max_workers)]):
+                models.update(part)
+        else:
+            models = _fit_groups(groups)
+
+        train_samples = int(subset.sum())
+        if not models:
+            return {"version": self.registry.version, "customers": 0, "train_samples": 0,
+                    "latency_ms": (time.time() - start) * 1000}
+        version = self.registry.publish(models, customers=len(models), train_samples=train_samples)
+        self.last_used = dict.fromkeys(models, time.time())
+        return {"version": version, "customers": len(models), "train_samples": train_samples,
+                "latency_ms": (time.time() - start) * 1000}
+
+    def reservoir(self) -> StratifiedReservoir:
+        """
+        Sampler for fit() input streamed in chunks: up to CUSTOMER_MODEL_SAMPLE_ROWS rows per customer and
+        CUSTOMER_MODEL_SAMPLE_MAX_ROWS rows in total, split over the customers with at least min_samples
+        rows so far (one-off customers can't dilute it). While that split is at least min_samples each, the
+        sample makes the same customers eligible as the full data; beyond that, customers fall back to the
+        global model.
+        """
+        return StratifiedReservoir(budget=0, strata=["customer_id"],
+                                   min_per_stratum=max(CUSTOMER_MODEL_SAMPLE_ROWS, self.min_samples),
+                                   max_rows=CUSTOMER_MODEL_SAMPLE_MAX_ROWS, min_stratum_rows=self.min_samples)
+
+    def evict(self, max_idle_seconds: float = None) -> int:
+        """
+        Drop models of customers not scored for max_idle_seconds. Evicted customers are scored by
+        the global model until the next fit; worker processes keep their copy until the version changes.
+        """
+        max_idle_seconds = CUSTOMER_MODEL_IDLE_SECONDS if max_idle_seconds is None else max_idle_seconds
+        cutoff = time.time() - max_idle_seconds
+        with self.registry.lock:
+            models = self.registry.model
+            if not models:
+                return 0
+            cold = {cid for cid in models if self.last_used.get(cid, 0) < cutoff}
+            # Swap in a new dict so concurrent predict() calls keep a consistent view
+            self.registry.model = {cid: m for cid, m in models.items() if cid not in cold}
+        for cid in cold:
+            self.last_used.pop(cid, None)
+        return len(cold)
+
+    def predict(self, df: pd.DataFrame, fallback) -> np.ndarray:
+        """
+        Boolean anomaly flags for df, in row order. Rows of customers with a model are scored by it;
+        the rest are passed (as a DataFrame) to fallback, which returns their flags.
+        """
+        n = len(df)
+        flags = np.zeros(n, dtype=bool)
+        version, models = self._snapshot()
+        codes, uniques = pd.factorize(df["customer_id"].astype(str))
+        has_model = np.array([cid in models for cid in uniques], dtype=bool)[codes] if n else np.zeros(0, dtype=bool)
+
+        if has_model.any():
+            rows = np.flatnonzero(has_model)
+            rows = rows[np.argsort(codes[rows], kind="stable")]
+            splits = np.split(rows, np.flatnonzero(np.diff(codes[rows])) + 1)
+            amounts = df["amount"].to_numpy(dtype=float)
+            groups = [(uniques[codes[idx[0]]], amounts[idx]) for idx in splits]
+            for idx, scores in zip(splits, self._score(version, models, groups, len(rows))):
+                flags[idx] = scores < 0
+            now = time.time()
+            for cid, _ in groups:
+                self.last_used[cid] = now
+            if now - self.last_evict > EVICT_INTERVAL_SECONDS:
+                self.last_evict = now
+                self.evict()
+
+        if not has_model.all():
+            flags[~has_model] = np.asarray(fallback(df[~has_model]), dtype=bool)
+        return flags
+
+    def _score(self, version, models, groups, rows: int):
+        # Evicted customers are only missing from models; the bundle of the same version has them all
+        if not self._parallel(rows) or version is None:
+            return _score_groups(models, groups)
+        bundle_path = self.registry._file(version)
+        shards = _shards(groups, self.max_workers)
+        pool = self._executor()
+        futures = [pool.submit(_score_shard, bundle_path, [groups[i] for i in shard]) for shard in shards]
+        scores = [None] * len(groups)
+        for shard, future in zip(shards, futures):
+            for i, result in zip(shard, future.result()):
+                scores[i] = result
+        return scores
+
+customer_models = CustomerModels()
@@ -0,0 +1,374 @@
+"""
+Streaming drift detection on quantile sketches.
+KLLSketch keeps a few hundred weighted samples (a few KB) summarising any number of values, can be
+updated in batches and merged with sketches from other workers. DriftMonitor keeps a reference and a
+current-window sketch per feature and compares them with an approximate KS statistic and PSI.
+"""
+import math
+import os
+import pickle
+import threading
+import numpy as np
+
+DRIFT_SKETCH_K = int(os.getenv("DRIFT_SKETCH_K", "200"))
+# Rows per current window; a full window is checked, then folded into the reference
+DRIFT_WINDOW_ROWS = int(os.getenv("DRIFT_WINDOW_ROWS", "100000"))
+DRIFT_KS_THRESHOLD = float(os.getenv("DRIFT_KS_THRESHOLD", "0.1"))
+DRIFT_PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))
+DRIFT_SNAPSHOT = os.getenv("DRIFT_SNAPSHOT", "model_store/drift_monitor.pkl")
+
+class KLLSketch:
+    """
+    KLL quantile sketch. Level h holds items of weight 2**h; a level over capacity is sorted and every
+    other item (random offset) is promoted, so total weight always equals n. Rank error is about 1.7/k.
+    """
+    def __init__(self, k: int = None, seed=None):
+        self.k = k or DRIFT_SKETCH_K
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+        self._cache = None
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        # Lazy compaction: only while the sketch is over its total capacity, and always the lowest
+        # full level, so every level stays close to capacity and no more accuracy is lost than needed
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            level = next(h for h, items in enumerate(self.levels) if len(items) > self._capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # With an odd count the largest item stays behind so weights pair up exactly
+            keep = len(items) % 2
+            promoted = items[self.rng.integers(2):len(items) - keep:2]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            self.levels[level] = items[len(items) - keep:]
+        self._cache = None
+
+    def update(self, values) -> "KLLSketch":
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold another sketch (e.g. from another worker) into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _sorted(self):
+        if self._cache is None:
+            values = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+            order = np.argsort(values, kind="stable")
+            self._cache = (values[order], np.concatenate([[0.0], np.cumsum(weights[order])]))
+        return self._cache
+
+    @property
+    def items(self) -> np.ndarray:
+        return self._sorted()[0]
+
+    @property
+    def rank_error(self) -> float:
+        """Bound on the CDF error; 0 while nothing has been compacted yet."""
+        return 0.0 if len(self.levels) == 1 else 1.7 / self.k
+
+    @property
+    def nbytes(self) -> int:
+        return sum(items.nbytes for items in self.levels)
+
+    def cdf(self, x) -> np.ndarray:
+        """Estimated fraction of values <= x."""
+        values, cum_weights = self._sorted()
+        if self.n == 0:
+            return np.zeros(np.shape(x))
+        return cum_weights[np.searchsorted(values, x, side="right")] / cum_weights[-1]
+
+    def quantile(self, q) -> np.ndarray:
+        values, cum_weights = self._sorted()
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan)
+        idx = np.searchsorted(cum_weights[1:], np.asarray(q) * cum_weights[-1], side="left")
+        return values[np.minimum(idx, len(values) - 1)]
+
+def ks_statistic(a: KLLSketch, b: KLLSketch) -> float:
+    """Approximate two-sample KS statistic: max CDF gap over the retained items of both sketches."""
+    if a.n == 0 or b.n == 0:
+        return 0.0
+    points = np.concatenate([a.items, b.items])
+    return float(np.max(np.abs(a.cdf(points) - b.cdf(points))))
+
+def ks_pvalue(statistic: float, n1: int, n2: int) -> float:
+    """Asymptotic KS p-value. With large n it flags tiny shifts, so prefer thresholds on the statistic."""
+    from scipy.stats import kstwobign
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    return float(kstwobign.sf(statistic * math.sqrt(n1 * n2 / (n1 + n2))))
+
+def ks_test(a: KLLSketch, b: KLLSketch):
+    """
+    (statistic, p_value) of an approximate two-sample KS test. The p-value is computed on the statistic
+    minus both sketches' rank error, so sketch noise alone does not read as significant drift.
+    """
+    statistic = ks_statistic(a, b)
+    return statistic, ks_pvalue(max(0.0, statistic - a.rank_error - b.rank_error), a.n, b.n)
+
+def psi(reference: KLLSketch, current: KLLSketch, bins: int = 10) -> float:
+    """Population stability index over the reference's quantile bins."""
+    if reference.n == 0 or current.n == 0:
+        return 0.0
+    edges = np.unique(reference.quantile(np.linspace(0, 1, bins + 1)[1:-1]))
+    ref_p = np.diff(np.concatenate([[0.0], reference.cdf(edges), [1.0]]))
+    cur_p = np.diff(np.concatenate([[0.0], current.cdf(edges), [1.0]]))
+    ref_p, cur_p = np.maximum(ref_p, 1e-4), np.maximum(cur_p, 1e-4)
+    return float(np.sum((cur_p - ref_p) * np.log(cur_p / ref_p)))
+
+class DriftMonitor:
+    def __init__(self, features=("amount",), k=None, window_rows=None, ks_threshold=None, psi_threshold=None):
+        self.features = list(features)
+        self.k = k or DRIFT_SKETCH_K
+        self.window_rows = window_rows or DRIFT_WINDOW_ROWS
+        self.ks_threshold = ks_threshold or DRIFT_KS_THRESHOLD
+        self.psi_threshold = psi_threshold or DRIFT_PSI_THRESHOLD
+        self.reference = {f: KLLSketch(self.k) for f in self.features}
+        self.current = {f: KLLSketch(self.k) for f in self.features}
+        self.last_window = None  # check() result of the last completed window
+        self.lock = threading.Lock()
+
+    @property
+    def empty(self) -> bool:
+        return not any(s.n for s in list(self.reference.values()) + list(self.current.values()))
+
+    def update(self, df):
+        """Add a batch of transactions to the current window; a full window is checked and rolled."""
+        with self.lock:
+            for f in self.features:
+                if f in df:
+                    self.current[f].update(df[f].to_numpy(dtype=float))
+            if max(s.n for s in self.current.values()) >= self.window_rows:
+                self._roll()
+
+    def _check(self) -> dict:
+        result = {}
+        for f in self.features:
+            ref, cur = self.reference[f], self.current[f]
+            ks, p_value = ks_test(ref, cur)
+            stability = psi(ref, cur)
+            result[f] = {
+                "ks": ks, "p_value": p_value, "psi": stability,
+                "reference_n": ref.n, "current_n": cur.n,
+                "drift": bool(ref.n and cur.n and (ks > self.ks_threshold or stability > self.psi_threshold)),
+            }
+        return result
+
+    def check(self) -> dict:
+        """Compare the current window with the reference, per feature."""
+        with self.lock:
+            return self._check()
+
+    def _roll(self):
+        self.last_window = self._check()
+        for f in self.features:
+            self.reference[f].merge(self.current[f])
+            self.current[f] = KLLSketch(self.k)
+
+    def roll(self):
+        """Close the current window: record its check() result and fold it into the reference."""
+        with self.lock:
+            self._roll()
+
+    def merge(self, other: "DriftMonitor"):
+        """Fold in the sketches of a monitor from another worker."""
+        with self.lock:
+            for f in self.features:
+                if f in other.reference:
+                    self.reference[f].merge(other.reference[f])
+                    self.current[f].merge(other.current[f])
+
+    def snapshot(self, path: str = None) -> str:
+        """Atomically write the sketches to disk."""
+        path = path or DRIFT_SNAPSHOT
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.lock:
+            state = {"reference": self.reference, "current": self.current, "last_window": self.last_window}
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return path
+
+    def restore(self, path: str = None) -> bool:
+        """Load sketches written by snapshot(); returns False if there is no snapshot."""
+        path = path or DRIFT_SNAPSHOT
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        with self.lock:
+            self.reference.update(state["reference"])
+            self.current.update(state["current"])
+            self.last_window = state["last_window"]
+        return True
+
+class RunningMoments:
+    """Welford running count / mean / variance; batches are folded in with Chan's parallel update."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values) -> "RunningMoments":
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = float(values.mean())
+            self._merge(len(values), mean, float(np.sum((values - mean) ** 2)))
+        return self
+
+    def _merge(self, n, mean, m2):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        if other.n:
+            self._merge(other.n, other.mean, other.m2)
+        return self
+
+    @property
+    def var(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+class PageHinkley:
+    """
+    Two-sided Page-Hinkley test on a stream (fed standardized values). Alarms when the cumulative
+    deviation from the running mean, less delta per value, moves more than threshold away from its
+    extreme; the extreme's position is the estimated change point. Batches are processed with
+    cumulative sums, so the cost is a few vector passes per batch plus one re-scan per alarm.
+    """
+    def __init__(self, delta: float = 0.1, threshold: float = 50.0, min_instances: int = 30):
+        self.delta = delta
+        self.threshold = threshold
+        self.min_instances = min_instances
+        self.n_seen = 0  # values consumed overall, for change-point positions
+        self._reset()
+
+    def _reset(self):
+        self.n = 0
+        self.sum = 0.0
+        # Cumulative statistics, their extremes and where the extremes occurred (count, running sum)
+        self.up, self.up_min, self.up_at = 0.0, 0.0, (0, 0.0)
+        self.down, self.down_max, self.down_at = 0.0, 0.0, (0, 0.0)
+
+    def update(self, values) -> list:
+        """
+        Consume values; returns one dict per alarm with the stream position of the alarm and of the
+        estimated change point, the direction and the mean before / after the change point.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        alarms, start = [], 0
+        while start < len(values):
+            x = values[start:]
+            count = self.n + np.arange(1, len(x) + 1)
+            sums = self.sum + np.cumsum(x)
+            dev = x - sums / count
+            up = self.up + np.cumsum(dev - self.delta)
+            down = self.down + np.cumsum(dev + self.delta)
+            up_min = np.minimum(np.minimum.accumulate(up), self.up_min)
+            down_max = np.maximum(np.maximum.accumulate(down), self.down_max)
+            alarm = ((up - up_min > self.threshold) | (down_max - down > self.threshold)) & (count >= self.min_instances)
+            hits = np.flatnonzero(alarm)
+            end = hits[0] + 1 if len(hits) else len(x)
+            # Track where the extremes were reached within the consumed part of the batch
+            i = int(np.argmin(up[:end]))
+            if up[i] < self.up_min:
+                self.up_min, self.up_at = float(up[i]), (int(count[i]), float(sums[i]))
+            i = int(np.argmax(down[:end]))
+            if down[i] > self.down_max:
+                self.down_max, self.down_at = float(down[i]), (int(count[i]), float(sums[i]))
+            if not len(hits):
+                self.n, self.sum = int(count[-1]), float(sums[-1])
+                self.up, self.down = float(up[-1]), float(down[-1])
+                self.n_seen += len(x)
+                break
+            j = hits[0]
+            direction = "up" if up[j] - up_min[j] > self.threshold else "down"
+            at_n, at_sum = self.up_at if direction == "up" else self.down_at
+            n_after = int(count[j]) - at_n
+            alarms.append({
+                "position": int(self.n_seen + j),
+                "change_point": int(self.n_seen + j - n_after + 1),
+                "direction": direction,
+                "mean_before": at_sum / at_n if at_n else float("nan"),
+                "mean_after": (float(sums[j]) - at_sum) / n_after if n_after else float("nan"),
+            })
+            self.n_seen += j + 1
+            self._reset()
+            start += j + 1
+        return alarms
+
+class TumblingWindows:
+    """
+    Count, mean and standard deviation of consecutive fixed-length windows, tracked for several lengths
+    at once from running sums (constant memory). A completed window drifts when its mean is more than
+    shift_threshold reference standard deviations away from the reference mean, or its standard
+    deviation is off by more than a factor std_ratio. Values are expected standardized against the reference.
+    """
+    def __init__(self, lengths=(1_000, 10_000, 100_000), shift_threshold: float = 0.5, std_ratio: float = 1.5):
+        self.lengths = sorted(int(length) for length in lengths)
+        self.shift_threshold = shift_threshold
+        self.std_ratio = std_ratio
+        self.partial = {length: [0, 0.0, 0.0] for length in self.lengths}  # count, sum, sum of squares
+        self.n_seen = 0
+        self.last = {}  # length -> stats of the last completed window
+
+    def update(self, z) -> list:
+        """Consume standardized values; returns one dict per window length that completed drifting windows."""
+        z = np.asarray(z, dtype=float).ravel()
+        cs = np.concatenate([[0.0], np.cumsum(z)])
+        cs2 = np.concatenate([[0.0], np.cumsum(z * z)])
+        drifts = []
+        for length in self.lengths:
+            count, total, total_sq = self.partial[length]
+            ends = np.arange(length - count, len(z) + 1, length)
+            if len(ends):
+                starts = np.concatenate([[0], ends[:-1]])
+                sums = cs[ends] - cs[starts]
+                sums_sq = cs2[ends] - cs2[starts]
+                sums[0] += total
+                sums_sq[0] += total_sq
+                mean = sums / length
+                std = np.sqrt(np.maximum(sums_sq / length - mean * mean, 0.0) * length / (length - 1))
+                drifting = (np.abs(mean) > self.shift_threshold) | (std > self.std_ratio) | (std < 1 / self.std_ratio)
+                self.last[length] = {"end": self.n_seen + int(ends[-1]), "mean_shift": float(mean[-1]),
+                                     "std_ratio": float(std[-1]), "drift": bool(drifting[-1])}
+                if drifting.any():
+                    first = int(np.argmax(drifting))
+                    drifts.append({"window": length, "position": self.n_seen + int(ends[first]) - 1,
+                                   "mean_shift": float(mean[first]), "std_ratio": float(std[first]),
+                                   "drifting_windows": int(drifting.sum()), "windows": len(ends)})
+                tail = int(ends[-1])
+                self.partial[length] = [len(z) - tail, float(cs[-1] - cs[tail]), float(cs2[-1] - cs2[tail])]
+            else:
+                self.partial[length] = [count + len(z), total + float(cs[-1]), total_sq + float(cs2[-1])]
+        self.n_seen += len(z)
+        return drifts
+
+drift_monitor = DriftMonitor()
@@ -0,0 +1,73 @@
+"""
+SHAP helpers shared by ml.explain_anomaly_with_shap and ml_extended.shap_explain.
+Explainers are built once per fitted model and cached until the model is refit; backgrounds are
+sampled down to SHAP_BACKGROUND_ROWS; only anomalous (or top-k) rows are explained, in chunks.
+"""
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+SHAP_BACKGROUND_ROWS = int(os.getenv("SHAP_BACKGROUND_ROWS", "100"))
+SHAP_CHUNK_ROWS = int(os.getenv("SHAP_CHUNK_ROWS", "5000"))
+SHAP_EXPLAINER_CACHE = 8
+
+def _fitted_state(model):
+    """The object a refit replaces (trees, coefficients), used to tell model versions apart."""
+    for attr in ("estimators_", "tree_", "coef_"):
+        state = getattr(model, attr, None)
+        if state is not None:
+            return state
+    return None
+
+class ExplainerCache:
+    def __init__(self, maxsize=SHAP_EXPLAINER_CACHE):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()  # id(model) -> (model, fitted state, explainer)
+        self.lock = threading.Lock()
+
+    def get(self, model, build):
+        """Cached explainer for model, calling build() when the model is new or has been refit."""
+        key, state = id(model), _fitted_state(model)
+        with self.lock:
+            entry = self.cache.get(key)
+            # Entries hold the model and its fitted state, so identity checks cannot hit a recycled id
+            if entry is not None and entry[0] is model and entry[1] is state:
+                self.cache.move_to_end(key)
+                return entry[2]
+        explainer = build()
+        with self.lock:
+            self.cache[key] = (model, state, explainer)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        return explainer
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+def background(X, rows: int = None):
+    """Random sample of X to use as the explainer's background data."""
+    import shap
+    return shap.utils.sample(X, min(rows or SHAP_BACKGROUND_ROWS, len(X)), random_state=0)
+
+def anomaly_rows(scores, top_k: int = None) -> np.ndarray:
+    """
+    Positions to explain given anomaly scores (lower is more anomalous, negative is flagged):
+    the top_k lowest scores if top_k is given, else every flagged row.
+    """
+    scores = np.asarray(scores)
+    if top_k is not None:
+        return np.sort(np.argsort(scores, kind="stable")[:top_k])
+    return np.flatnonzero(scores < 0)
+
+def chunked(explain, X, chunk_rows: int = None) -> np.ndarray:
+    """Apply explain(part) to X in row chunks and stack the results."""
+    chunk_rows = chunk_rows or SHAP_CHUNK_ROWS
+    parts = [np.asarray(explain(X.iloc[start:start + chunk_rows])) for start in range(0, len(X), chunk_rows)]
+    if not parts:
+        return np.empty((0, X.shape[1]))
+    return np.concatenate(parts)
+
+explainer_cache = ExplainerCache()
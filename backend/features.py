@@ -0,0 +1,134 @@
+"""
+Feature engineering for the anomaly models.
+FeaturePipeline turns raw transactions into a numeric matrix: amount, the customer's historical
+mean/std of amount and the amount's z-score against it, seconds since the customer's previous
+transaction, hour of day and a hashed one-hot of type. Per-customer history lives in a
+CustomerFeatureStore (count, sum, sum of squares, last timestamp), so each batch only adds to it
+instead of recomputing from the customer's full history.
+"""
+import os
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+TYPE_BUCKETS = 8
+FEATURE_COLUMNS = (
+    ["amount", "cust_amount_mean", "cust_amount_std", "amount_z", "seconds_since_prev", "hour_of_day"]
+    + [f"type_h{i}" for i in range(TYPE_BUCKETS)]
+)
+# "customer" enables the pipeline for ml.py / ml_extended.py models; default is amount only
+FEATURE_PIPELINE = os.getenv("FEATURE_PIPELINE", "")
+
+_NAT = np.iinfo(np.int64).min
+
+class CustomerFeatureStore:
+    def __init__(self, max_customers=500_000):
+        self.max_customers = max_customers
+        self.customers = OrderedDict()  # customer_id -> [count, sum, sumsq, last_ts_ns]
+        self.lock = threading.Lock()
+
+    def get_many(self, customer_ids):
+        """Arrays (count, sum, sumsq, last_ts_ns) aligned with customer_ids; zeros/NaT for unknown customers."""
+        with self.lock:
+            rows = [self.customers.get(cid) or (0, 0.0, 0.0, _NAT) for cid in customer_ids]
+        if not rows:
+            return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+        count, total, sumsq, last_ts = zip(*rows)
+        return np.array(count, dtype=float), np.array(total), np.array(sumsq), np.array(last_ts, dtype=np.int64)
+
+    def add_many(self, customer_ids, count, total, sumsq, last_ts):
+        with self.lock:
+            for cid, c, s, sq, ts in zip(customer_ids, count, total, sumsq, last_ts):
+                state = self.customers.get(cid)
+                if state is None:
+                    self.customers[cid] = [int(c), float(s), float(sq), int(ts)]
+                else:
+                    state[0] += int(c)
+                    state[1] += float(s)
+                    state[2] += float(sq)
+                    state[3] = max(state[3], int(ts))
+                    self.customers.move_to_end(cid)
+            while len(self.customers) > self.max_customers:
+                self.customers.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.customers.clear()
+
+def _type_bucket(value) -> int:
+    return zlib.crc32(str(value).encode()) % TYPE_BUCKETS
+
+def _timestamps_ns(df: pd.DataFrame, n: int) -> np.ndarray:
+    if "timestamp" not in df:
+        return np.full(n, _NAT, dtype=np.int64)
+    ts = pd.to_datetime(df["timestamp"], errors="coerce")
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+    return ts.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+class FeaturePipeline:
+    def __init__(self, store: CustomerFeatureStore = None):
+        self.store = store or CustomerFeatureStore()
+        self.columns = FEATURE_COLUMNS
+
+    def transform(self, df: pd.DataFrame, update: bool = True) -> pd.DataFrame:
+        """
+        Compute FEATURE_COLUMNS for df (index preserved). History features for each row only use
+        the customer's earlier transactions: the cached store plus earlier rows of this batch.
+        With update=True the batch is added to the store afterwards.
+        """
+        n = len(df)
+        amount = pd.to_numeric(df["amount"], errors="coerce").to_numpy(dtype=float)
+        customers = df["customer_id"].astype(str) if "customer_id" in df else pd.Series([""] * n, index=df.index)
+        ts = _timestamps_ns(df, n)
+        codes, uniques = pd.factorize(customers, sort=False)
+        count0, sum0, sumsq0, last0 = self.store.get_many(list(uniques))
+
+        # Sort by customer, then time, so cumulative sums run over each customer's history in order
+        order = np.lexsort((ts, codes))
+        s_codes, s_amt, s_ts = codes[order], amount[order], ts[order]
+        by_customer = pd.Series(s_amt).groupby(s_codes)
+        prior_n = by_customer.cumcount().to_numpy() + count0[s_codes]
+        prior_sum = by_customer.cumsum().to_numpy() - s_amt + sum0[s_codes]
+        prior_sq = pd.Series(s_amt * s_amt).groupby(s_codes).cumsum().to_numpy() - s_amt * s_amt + sumsq0[s_codes]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(prior_n > 0, prior_sum / prior_n, s_amt)
+            std = np.sqrt(np.maximum(np.where(prior_n > 0, prior_sq / prior_n - mean * mean, 0.0), 0.0))
+            z = np.where(prior_n >= 2, (s_amt - mean) / (std + 1e-9), 0.0)
+
+        prev_ts = pd.Series(s_ts).groupby(s_codes).shift(1).to_numpy()
+        first = np.isnan(prev_ts)
+        prev_ts = np.where(first, last0[s_codes], prev_ts).astype(np.int64)
+        gap = np.where((prev_ts == _NAT) | (s_ts == _NAT), -1.0, (s_ts - prev_ts) / 1e9)
+
+        hour = np.where(s_ts == _NAT, -1, (s_ts // 3_600_000_000_000) % 24).astype(float)
+
+        features = np.empty((n, len(self.columns)))
+        sorted_cols = [s_amt, mean, std, z, gap, hour]
+        for i, col in enumerate(sorted_cols):
+            features[order, i] = col
+        features[:, len(sorted_cols):] = 0.0
+        if "type" in df:
+            types = df["type"].astype(str)
+            type_codes, type_uniques = pd.factorize(types)
+            buckets = np.array([_type_bucket(t) for t in type_uniques], dtype=int)
+            features[np.arange(n), len(sorted_cols) + buckets[type_codes]] = 1.0
+
+        if update and n:
+            grouped = pd.DataFrame({"c": codes, "a": amount, "sq": amount * amount, "t": ts}).groupby("c")
+            agg = grouped.agg(count=("a", "size"), total=("a", "sum"), sumsq=("sq", "sum"), last=("t", "max"))
+            self.store.add_many([uniques[i] for i in agg.index], agg["count"], agg["total"], agg["sumsq"], agg["last"])
+
+        return pd.DataFrame(features, columns=self.columns, index=df.index)
+
+def feature_matrix(df: pd.DataFrame, pipeline: FeaturePipeline = None, update: bool = True) -> pd.DataFrame:
+    """Model input for df: the pipeline's features when one is plugged in, else just amount."""
+    if pipeline is None:
+        return df[["amount"]]
+    return pipeline.transform(df, update=update)
+
+def default_pipeline():
+    return FeaturePipeline() if FEATURE_PIPELINE == "customer" else None
@@ -0,0 +1,182 @@
+"""
+Declarative fraud rules compiled into vectorized masks.
+Rules are plain dicts (see DEFAULT_RULES), optionally loaded from the JSON file in FRAUD_RULES_FILE:
+  - threshold: {"kind": "threshold", "column": "amount", "op": ">", "value": 10000}
+  - all:       {"kind": "all", "conditions": [<threshold>, ...]}  (every condition must hold)
+  - velocity:  {"kind": "velocity", "key": "customer_id", "window_seconds": 5, "max_count": 1}
+               more than max_count transactions of the same key within window_seconds
+Rules are checked in list order. The first rule that matches a row becomes its fraud_reason, and
+fraud_reasons lists every rule that matched. A rule is skipped when its columns are missing; a
+velocity rule whose key column is missing treats the whole frame as one key.
+"""
+import json
+import operator
+import os
+import numpy as np
+import pandas as pd
+
+FRAUD_RULES_FILE = os.getenv("FRAUD_RULES_FILE", "")
+
+DEFAULT_RULES = [
+    {"name": "high_amount", "kind": "threshold", "column": "amount", "op": ">", "value": 10000},
+    {"name": "rapid_sequence", "kind": "velocity", "key": "customer_id", "window_seconds": 5, "max_count": 1},
+]
+
+MAX_RULES = 63  # matched rules are tracked as bits of an int64
+_NAT = np.iinfo(np.int64).min
+_OPS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+    "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+}
+
+class _Frame:
+    """Per-evaluation view of df, caching what several rules share: timestamps, key codes, sort orders."""
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n = len(df)
+        self._ts = None
+        self._time_order = None
+        self._codes = {}
+        self._by_key = {}
+
+    @property
+    def ts(self) -> np.ndarray:
+        if self._ts is None:
+            ts = pd.to_datetime(self.df["timestamp"], errors="coerce")
+            if getattr(ts.dt, "tz", None) is not None:
+                ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+            self._ts = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        return self._ts
+
+    def codes(self, column: str):
+        """(codes, uniques) of a column; missing values get code -1."""
+        if column not in self._codes:
+            self._codes[column] = pd.factorize(self.df[column])
+        return self._codes[column]
+
+    def by_key(self, key: str):
+        """(order, sorted key codes, sorted timestamps) with rows grouped by key, then by time."""
+        if key not in self._by_key:
+            if self._time_order is None:
+                self._time_order = np.argsort(self.ts, kind="stable")
+            order = self._time_order
+            if key in self.df:
+                codes = self.codes(key)[0]
+                # Narrow codes so the stable sort can use radix sort for low-cardinality keys
+                codes = codes.astype(np.min_scalar_type(-max(len(self.codes(key)[1]), 1)))
+                order = order[np.argsort(codes[order], kind="stable")]
+                sorted_codes = codes[order]
+            else:
+                sorted_codes = np.zeros(self.n, dtype=np.int8)
+            self._by_key[key] = (order, sorted_codes, self.ts[order])
+        return self._by_key[key]
+
+def _compile_condition(rule: dict):
+    column, value = rule["column"], rule["value"]
+    try:
+        op = _OPS[rule["op"]]
+    except KeyError:
+        raise ValueError(f"Unknown operator {rule['op']!r} in fraud rule {rule.get('name', column)!r}")
+
+    def mask(frame: _Frame):
+        if column not in frame.df:
+            return None
+        series = frame.df[column]
+        if series.dtype == object:
+            # Compare each distinct value once (plus NaN for code -1), then broadcast by code
+            codes, uniques = frame.codes(column)
+            per_value = np.asarray(op(pd.Series(list(uniques) + [np.nan], dtype=object), value), dtype=bool)
+            return per_value[codes]
+        return np.asarray(op(series, value), dtype=bool)
+    return mask
+
+def _compile_all(rule: dict):
+    conditions = [_compile_condition(c) for c in rule["conditions"]]
+
+    def mask(frame: _Frame):
+        result = None
+        for condition in conditions:
+            m = condition(frame)
+            if m is None:
+                return None
+            result = m if result is None else result & m
+        return result
+    return mask
+
+def _compile_velocity(rule: dict):
+    key = rule.get("key", "customer_id")
+    window_ns = int(rule["window_seconds"] * 1e9)
+    k = int(rule.get("max_count", 1))
+    if k < 1:
+        raise ValueError(f"max_count must be at least 1 in fraud rule {rule['name']!r}")
+
+    def mask(frame: _Frame):
+        if "timestamp" not in frame.df:
+            return None
+        order, codes, ts = frame.by_key(key)
+        hit = np.zeros(frame.n, dtype=bool)
+        if frame.n > k:
+            # The window ending at row i holds more than k transactions iff the k-th previous
+            # transaction of the same key is less than window_ns older
+            recent = (codes[k:] == codes[:-k]) & (codes[k:] >= 0) & (ts[:-k] != _NAT) & (ts[k:] - ts[:-k] < window_ns)
+            hit[order[k:]] = recent
+        return hit
+    return mask
+
+_COMPILERS = {"threshold": _compile_condition, "all": _compile_all, "velocity": _compile_velocity}
+
+class FraudRuleEngine:
+    def __init__(self, rules: list = None):
+        rules = DEFAULT_RULES if rules is None else rules
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"At most {MAX_RULES} fraud rules are supported.")
+        self.rules = rules
+        self.names = [rule["name"] for rule in rules]
+        self.masks = []
+        for rule in rules:
+            kind = rule.get("kind", "threshold")
+            if kind not in _COMPILERS:
+                raise ValueError(f"Unknown kind {kind!r} in fraud rule {rule['name']!r}")
+            self.masks.append(_COMPILERS[kind](rule))
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean matrix of shape (rules, rows): which rule matched which row."""
+        frame = _Frame(df)
+        matched = np.zeros((len(self.masks), len(df)), dtype=bool)
+        for i, mask in enumerate(self.masks):
+            m = mask(frame)
+            if m is not None:
+                matched[i] = m
+        return matched
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Copy of df with is_fraud, fraud_reason (first matching rule, "" if none) and
+        fraud_reasons (comma-separated names of all matching rules).
+        """
+        df = df.copy()
+        matched = self.evaluate(df)
+        is_fraud = matched.any(axis=0)
+        names = np.array(self.names + [""], dtype=object)
+        first = np.where(is_fraud, matched.argmax(axis=0), len(self.names)) if len(self.names) else np.zeros(len(df), dtype=int)
+        # Rows share few distinct rule combinations: build each reason list once, then index into them
+        bits = np.zeros(len(df), dtype=np.int64)
+        for i, row in enumerate(matched):
+            bits |= row.astype(np.int64) << i
+        combos, inverse = np.unique(bits, return_inverse=True)
+        reasons = np.array([",".join(n for i, n in enumerate(self.names) if combo >> i & 1) for combo in combos], dtype=object)
+        df["is_fraud"] = is_fraud
+        df["fraud_reason"] = names[first]
+        df["fraud_reasons"] = reasons[inverse.reshape(-1)]
+        return df
+
+def default_engine() -> FraudRuleEngine:
+    return FraudRuleEngine.from_file(FRAUD_RULES_FILE) if FRAUD_RULES_FILE else FraudRuleEngine()
+
+fraud_engine = default_engine()
@@ -8,8 +8,35 @@ from utils.telemetry import request_latency
 # Enterprise modules
 from enterprise import automation_engine, integration_hub, compliance_engine, streaming_processor
 import ml
+from online_detector import online_detector
+from customer_models import customer_models
+from utils.tracking import tracker
+from drift import drift_monitor
+from ml_extended import ensemble
+from utils import pdf_extract
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the latest pre-trained global, per-customer and ensemble models so uploads are scored without refitting,
+    # and resume the online detector's per-customer baselines and the drift sketches from their last snapshots
+    ml.anomaly_model.load()
+    customer_models.load()
+    ensemble.load()
+    pdf_extract.start()
+    online_detector.restore()
+    drift_monitor.restore()
+    yield
+    customer_models.shutdown()
+    pdf_extract.shutdown()
+    ml.scoring_batcher.close()
+    tracker.close()
+    if online_detector.customers:
+        online_detector.snapshot()
+    if not drift_monitor.empty:
+        drift_monitor.snapshot()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,35 @@
+"""
+Operational commands run against the configured database (DATABASE_URL).
+
+Usage (from backend/):
+    python manage.py create-dedup-index [--remove-duplicates]
+"""
+import argparse
+import sys
+import database
+from utils.ingest import NATURAL_KEY_INDEX, create_natural_key_index
+
+def create_dedup_index(args) -> int:
+    db = database.SessionLocal()
+    try:
+        removed = create_natural_key_index(db, remove_duplicates=args.remove_duplicates)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(f"{NATURAL_KEY_INDEX} is in place ({removed} duplicate transactions removed).")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    dedup = commands.add_parser("create-dedup-index", help="create the unique index INGEST_ROW_DEDUP relies on")
+    dedup.add_argument("--remove-duplicates", action="store_true",
+                       help="delete existing duplicate transactions first (keeps the lowest id of each)")
+    dedup.set_defaults(run=create_dedup_index)
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
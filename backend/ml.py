@@ -1,9 +1,21 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from datetime import datetime
-import mlflow
 from opentelemetry import trace
 from random import uniform
+from model_registry import ModelRegistry
+from utils.tracking import tracker
+from features import default_pipeline, feature_matrix
+from customer_models import customer_models
+from compact_forest import CompactIsolationForest
+from batcher import MicroBatcher
+from sampling import StratifiedReservoir, sample_positions
+import drift
+import fraud_rules
 from utils.telemetry import (
     record_financial_anomaly_severity_score,
     record_trading_volume_deviation_percentage,
@@ -12,120 +24,283 @@ from utils.telemetry import (
 
 tracer = trace.get_tracer(__name__)
 
+ANOMALY_FEATURES = ["amount"]
+# Pre-trained IsolationForest, loaded at app startup; detect_anomalies scores against it when present
+anomaly_model = ModelRegistry("isolation_forest")
+# Member models of ensemble_model_predict run concurrently on this pool
+ENSEMBLE_MAX_WORKERS = int(os.getenv("ENSEMBLE_MAX_WORKERS", str(min(8, os.cpu_count() or 1))))
+ensemble_pool = ThreadPoolExecutor(max_workers=ENSEMBLE_MAX_WORKERS, thread_name_prefix="ensemble")
+# Larger drift comparisons go through quantile sketches instead of an exact KS test
+DRIFT_EXACT_MAX_ROWS = int(os.getenv("DRIFT_EXACT_MAX_ROWS", "100000"))
+# Per-customer feature pipeline (FEATURE_PIPELINE=customer); None keeps the amount-only models
+feature_pipeline = default_pipeline()
+# Batches up to this size are scored with the array-backed copy of the model (faster below ~1.5k rows)
+COMPACT_FOREST_MAX_ROWS = int(os.getenv("COMPACT_FOREST_MAX_ROWS", "1000"))
+_compact_model = (None, None)  # (registry model, its CompactIsolationForest export)
+
+def anomaly_features(df: pd.DataFrame, update: bool = True) -> pd.DataFrame:
+    """Model input for df; update=True also folds df into the pipeline's per-customer history."""
+    if feature_pipeline is None:
+        return df[ANOMALY_FEATURES]
+    return feature_matrix(df, feature_pipeline, update=update)
+
 def check_fraud_rules(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["is_fraud"] = False
-    df["fraud_reason"] = ""
-    if "timestamp" in df.columns:
-        df = df.sort_values("timestamp")
-        time_deltas = df["timestamp"].diff().dt.total_seconds()
-        df.loc[time_deltas < 5, ["is_fraud", "fraud_reason"]] = [True, "rapid_sequence"]
-    if "amount" in df.columns:
-        df.loc[df["amount"] > 10000, ["is_fraud", "fraud_reason"]] = [True, "high_amount"]
-    return df
+    """
+    Flag rows matching the configured fraud rules (see fraud_rules.DEFAULT_RULES / FRAUD_RULES_FILE).
+    Adds is_fraud, fraud_reason (first matching rule) and fraud_reasons (all matching rules).
+    """
+    return fraud_rules.fraud_engine.apply(df)
+
+def _new_isolation_forest():
+    return IsolationForest(contamination=0.05, random_state=42)
+
+def _fit_predict(df: pd.DataFrame) -> np.ndarray:
+    """Fit a fresh IsolationForest on (a bounded sample of) df and flag anomalies among all its rows."""
+    features = anomaly_features(df)
+    model = _new_isolation_forest().fit(features.iloc[sample_positions(df)])
+    return model.predict(features) == -1
+
+def train_anomaly_model(df) -> dict:
+    """
+    Fit a new IsolationForest and publish it as the next registry version.
+    df is a DataFrame or an iterable of DataFrame chunks (e.g. streamed from the DB); either way the
+    model is fitted on a stratified sample of at most TRAIN_SAMPLE_ROWS (+ per-stratum minimum) rows.
+    """
+    with tracer.start_as_current_span("train_anomaly_model"):
+        import time
+        start = time.time()
+        model = _new_isolation_forest()
+        if isinstance(df, pd.DataFrame):
+            # Features over the whole frame keep each sampled row's in-batch customer history
+            source_rows = len(df)
+            X = anomaly_features(df, update=False).iloc[sample_positions(df)]
+        else:
+            reservoir = StratifiedReservoir()
+            for chunk in df:
+                reservoir.add(chunk)
+            source_rows = reservoir.rows
+            X = anomaly_features(reservoir.sample(), update=False)
+        # Fitted on a plain array so scoring skips DataFrame feature-name validation
+        model.fit(X.to_numpy(dtype=float))
+        # The compact export is stored with the model, so workers memory-map its arrays instead of rebuilding it
+        version = anomaly_model.publish(model, artifacts={"compact": CompactIsolationForest.from_sklearn(model)},
+                                        features=list(X.columns), train_samples=len(X), source_rows=source_rows)
+        tracker.log_model(model, anomaly_model.name, version)
+        tracker.log_metrics({"train_samples": len(X), "source_rows": source_rows}, params={"contamination": 0.05})
+        return {"status": "retrained", "version": version, "train_samples": len(X), "source_rows": source_rows,
+                "latency_ms": (time.time() - start) * 1000}
+
+def score(df: pd.DataFrame, model=None):
+    """
+    Score-only path against the loaded model (or the given one): one decision_function pass, no fitting.
+    Returns (scores, is_anomaly); lower scores are more anomalous, negative ones are anomalies
+    (same rule as IsolationForest.predict). Raises ModelNotLoaded when no model is loaded.
+    """
+    model = model if model is not None else anomaly_model.current()
+    X = anomaly_features(df).to_numpy(dtype=float)
+    if 0 < len(X) <= COMPACT_FOREST_MAX_ROWS:
+        scores = compact_anomaly_model(model).decision_function(X)
+    else:
+        scores = model.decision_function(X)
+    return scores, scores < 0
+
+def compact_anomaly_model(model=None) -> CompactIsolationForest:
+    """
+    Array-backed export of the loaded model: the one published alongside it when there is one,
+    otherwise built once whenever a new version is loaded.
+    """
+    global _compact_model
+    model = model if model is not None else anomaly_model.current()
+    source, compact = _compact_model
+    if source is not model:
+        with anomaly_model.lock:
+            published = anomaly_model.artifacts.get("compact") if anomaly_model.model is model else None
+        compact = published or CompactIsolationForest.from_sklearn(model)
+        _compact_model = (model, compact)
+    return compact
+
+# Concurrent small scoring calls (uploads, streamed batches, real-time events) share one model call
+scoring_batcher = MicroBatcher(lambda df: score(df), name="anomaly_model")
+
+def _global_anomalies(df: pd.DataFrame):
+    if anomaly_model.available():
+        _, is_anomaly = scoring_batcher(df)
+        return is_anomaly
+    # No trained model yet: fall back to fitting on the batch itself
+    return _fit_predict(df)
 
 def detect_anomalies(df: pd.DataFrame) -> pd.Series:
     from utils.sla import sla_tracker
     import time
     start = time.time()
-    features = df[["amount"]]
-    model = IsolationForest(contamination=0.05, random_state=42)
-    preds = model.fit_predict(features)
+    if customer_models.models and "customer_id" in df:
+        is_anomaly = customer_models.predict(df, fallback=_global_anomalies)
+    else:
+        is_anomaly = _global_anomalies(df)
     latency_ms = (time.time() - start) * 1000
     sla_tracker.record(latency_ms)
-    # -1 indicates anomaly
-    return preds == -1
+    drift.drift_monitor.update(df)
+    return is_anomaly
 
 # For future use: DataFrame with fraud columns and anomaly
-import mlflow
 
-def automated_model_retraining(trigger_reason: str = "performance_degradation"):
+def automated_model_retraining(trigger_reason: str = "performance_degradation", df: pd.DataFrame = None):
     """
-    Stub for automated retraining pipeline.
+    Retraining pipeline entry point.
     Args:
         trigger_reason: str, e.g., 'performance_degradation', 'drift_detected'
+        df: training data; when given, a new anomaly model version is trained and published
     Returns:
         dict with retrain status
     """
-    # In a real implementation, this would queue a retraining job and update model registry
     import datetime
-    return {
+    result = {
         "status": "retraining_triggered",
         "trigger_reason": trigger_reason,
         "timestamp": datetime.datetime.now().isoformat()
     }
+    if df is not None:
+        result.update(train_anomaly_model(df))
+    return result
 
 # === Enterprise Enhancements (stubs) ===
-def ensemble_model_predict(models, X):
+def _member_outputs(models, method: str, X):
+    if len(models) == 1:
+        return [getattr(models[0], method)(X)]
+    return list(ensemble_pool.map(lambda model: getattr(model, method)(X), models))
+
+def ensemble_model_predict(models, X, weights=None, voting: str = "hard"):
     """
-    Combine predictions from multiple models using majority voting.
+    Combine predictions from multiple models, one label per sample.
     Args:
-        models: list of fitted model objects with .predict(X)
+        models: list of fitted model objects with .predict(X) (and .predict_proba(X) for soft voting)
         X: features DataFrame or array
+        weights: optional per-model vote weights (default: equal)
+        voting: "hard" for a (weighted) majority of predicted labels, ties going to the smallest label;
+            "soft" for the argmax of the (weighted) mean predict_proba, members sharing classes_
     Returns:
-        Ensemble prediction (majority vote per sample)
-    """
-    import numpy as np
-    votes = np.array([model.predict(X) for model in models])  # shape (n_models, n_samples)
-    from scipy.stats import mode
-    ensemble_preds, _ = mode(votes, axis=0, keepdims=False)
-    result = ensemble_preds[0]
-    # Ensure output is always a list of length equal to len(X)
-    if isinstance(result, np.ndarray):
-        out = result.tolist()
+        list of ensemble predictions, len(X) long
+    Members predict concurrently on a thread pool; most sklearn predictors release the GIL.
+    """
+    if not models:
+        raise ValueError("ensemble_model_predict needs at least one model.")
+    weights = np.ones(len(models)) if weights is None else np.asarray(weights, dtype=float)
+    if len(weights) != len(models):
+        raise ValueError("weights must have one entry per model.")
+    if voting == "soft":
+        probs = np.tensordot(weights, np.stack([np.asarray(p) for p in _member_outputs(models, "predict_proba", X)]), axes=1)
+        classes = getattr(models[0], "classes_", np.arange(probs.shape[1]))
+        return np.asarray(classes)[probs.argmax(axis=1)].tolist()
+    if voting != "hard":
+        raise ValueError(f"Unknown voting {voting!r}; expected 'hard' or 'soft'.")
+    votes = np.stack([np.asarray(p).ravel() for p in _member_outputs(models, "predict", X)])  # (n_models, n_samples)
+    n_samples = votes.shape[1]
+    if np.issubdtype(votes.dtype, np.integer) and votes.size and votes.max() - votes.min() < 16:
+        # Usual case (0/1 or -1/1 labels): offset labels to int8 codes and sum the weighted votes per label
+        low = votes.min()
+        labels = np.arange(low, votes.max() + 1)
+        codes = (votes - low).astype(np.int8)
+        counts = np.stack([weights @ (codes == i) for i in range(len(labels))])
     else:
-        out = [int(result)] * len(X)
-    return out
+        labels, codes = np.unique(votes, return_inverse=True)
+        # counts[label, sample]: total weight of the members voting label for sample
+        counts = np.bincount(
+            (codes.reshape(votes.shape) * n_samples + np.arange(n_samples)).ravel(),
+            weights=np.repeat(weights, n_samples),
+            minlength=len(labels) * n_samples,
+        ).reshape(len(labels), n_samples)
+    return labels[counts.argmax(axis=0)].tolist()
+
+def _drift_sample(data):
+    if isinstance(data, drift.KLLSketch):
+        return data
+    # For demo: compare 'amount' column if present
+    return data['amount'].values if 'amount' in data else np.array(data)
 
 def detect_model_drift(reference_data, new_data):
     """
     Detect drift between reference and new data using the Kolmogorov-Smirnov test.
     Args:
-        reference_data: pd.DataFrame or np.array (baseline)
-        new_data: pd.DataFrame or np.array (latest)
+        reference_data: pd.DataFrame, np.array or drift.KLLSketch (baseline)
+        new_data: pd.DataFrame, np.array or drift.KLLSketch (latest)
     Returns:
         drift_detected: bool
         p_value: float
+    Small samples get an exact ks_2samp; sketches and samples over DRIFT_EXACT_MAX_ROWS are compared
+    through KLL sketches (approximate KS statistic, asymptotic p-value) so memory stays bounded.
     """
     from scipy.stats import ks_2samp
-    import numpy as np
-    # For demo: compare 'amount' column if present
-    ref = reference_data['amount'].values if 'amount' in reference_data else np.array(reference_data)
-    new = new_data['amount'].values if 'amount' in new_data else np.array(new_data)
-    stat, p_value = ks_2samp(ref, new)
+    ref, new = _drift_sample(reference_data), _drift_sample(new_data)
+    sketched = isinstance(ref, drift.KLLSketch) or isinstance(new, drift.KLLSketch)
+    if sketched or len(ref) + len(new) > DRIFT_EXACT_MAX_ROWS:
+        ref = ref if isinstance(ref, drift.KLLSketch) else drift.KLLSketch().update(ref)
+        new = new if isinstance(new, drift.KLLSketch) else drift.KLLSketch().update(new)
+        stat, p_value = drift.ks_test(ref, new)
+    else:
+        stat, p_value = ks_2samp(ref, new)
     drift_detected = p_value < 0.05
     # For test stubs: if input is a list, return only boolean for backward compatibility
     if isinstance(reference_data, list) and isinstance(new_data, list):
         return bool(drift_detected)
     return drift_detected, p_value
 
-def explain_anomaly_with_shap(model, X):
+def explain_anomaly_with_shap(model, X, top_k: int = None):
     """
     Generate SHAP explanations for anomaly predictions.
     Args:
         model: fitted sklearn-compatible model
         X: features DataFrame
+        top_k: for outlier detectors, explain the top_k most anomalous rows instead of all flagged rows
     Returns:
-        shap_values: list or array of SHAP values per sample
+        dict of mean |SHAP value| per feature over the explained rows
+    The explainer is cached per fitted model (tree models use TreeExplainer, others a sampled
+    background); outlier detectors (IsolationForest) only explain the rows they flag, in chunks.
     """
     # Defensive: if model or X is None or not valid, return empty dict for stub test
     if model is None or X is None or (hasattr(X, '__len__') and len(X) == 0):
         return {}
     try:
         import shap
-        explainer = shap.Explainer(model, X)
-        shap_values = explainer(X)
-        return {str(f): float(abs(shap_values.values[:, i]).mean()) for i, f in enumerate(X.columns)}
+        from sklearn.base import is_outlier_detector
+        from explain import anomaly_rows, background, chunked, explainer_cache
+        def build():
+            # Tree ensembles (IsolationForest, forests) get the fast path-dependent TreeExplainer
+            if hasattr(model, "estimators_") or hasattr(model, "tree_"):
+                return shap.TreeExplainer(model)
+            return shap.Explainer(model, background(X))
+        explainer = explainer_cache.get(model, build)
+        if is_outlier_detector(model):
+            X = X.iloc[anomaly_rows(model.decision_function(X), top_k)]
+        values = np.abs(chunked(lambda part: explainer(part).values, X))
+        return {str(f): float(values[:, i].mean()) if len(values) else 0.0 for i, f in enumerate(X.columns)}
     except Exception as e:
         return {"error": str(e)}
 
 def real_time_scoring_pipeline(event):
     """
     Entry point for real-time scoring (to be triggered by streaming processor).
-    TODO: Implement streaming data scoring and alerting.
+    Scores a single {"customer_id", "amount"} event with the online per-customer detector and
+    folds it into that customer's baseline. Events without a finite amount are ignored (returns None).
+    When the global model is loaded, the event is also scored by it (model_score / model_anomaly)
+    through the micro-batcher, together with any other events arriving at the same time.
     """
-    # Placeholder: no-op
-    pass
+    from online_detector import online_detector
+    if not isinstance(event, dict) or event.get("amount") is None:
+        return None
+    try:
+        amount = float(event["amount"])
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(amount):
+        # "nan" / "inf" parse as floats but would poison the running baselines
+        return None
+    customer_id = str(event.get("customer_id", ""))
+    result = {"customer_id": customer_id, "amount": amount, **online_detector.update(customer_id, amount)}
+    if anomaly_model.available():
+        row = {k: event[k] for k in ("timestamp", "type") if k in event}
+        scores, flags = scoring_batcher(pd.DataFrame([dict(row, customer_id=customer_id, amount=amount)]))
+        result["model_score"], result["model_anomaly"] = float(scores[0]), bool(flags[0])
+    return result
 
 def financial_anomaly_severity_score(transactions: list) -> float:
     """
@@ -178,17 +353,20 @@ def compliance_risk_score(transactions: list) -> float:
         return score
 
 def detect_anomalies_with_fraud(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fraud rules plus IsolationForest anomalies, scored against the registry model when one is loaded
+    (fitted on the batch otherwise). Experiment tracking only enqueues to the background tracker;
+    the model artifact is uploaded once per registry version, never for per-batch fits.
+    """
     df = check_fraud_rules(df)
-    features = df[["amount"]]
-    import mlflow
-    # Patch: use nested=True if a run is already active
-    active_run = mlflow.active_run()
-    with mlflow.start_run(nested=bool(active_run)):
-        model = IsolationForest(contamination=0.05, random_state=42)
-        model.fit(features)
-        mlflow.log_param("contamination", 0.05)
-        mlflow.log_metric("train_samples", len(features))
-        mlflow.sklearn.log_model(model, "model")
-        preds = model.predict(features)
-    df["is_anomaly"] = (preds == -1) | df["is_fraud"]
+    if anomaly_model.available():
+        # One snapshot, so the logged artifact is the version that scored this batch
+        with anomaly_model.lock:
+            model, version = anomaly_model.model, anomaly_model.version
+        _, is_anomaly = score(df, model)
+        tracker.log_model(model, anomaly_model.name, version)
+    else:
+        is_anomaly = _fit_predict(df)
+    tracker.log_metrics({"batch_rows": len(df), "anomalies": int(is_anomaly.sum())}, params={"contamination": 0.05})
+    df["is_anomaly"] = is_anomaly | df["is_fraud"]
     return df
@@ -4,79 +4,239 @@ from sklearn.ensemble import IsolationForest, RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score
 from opentelemetry import trace
-from utils.sla import sla_tracker
+from utils.sla import training_tracker
+from utils.telemetry import training_duration
+from features import default_pipeline, feature_matrix
+from explain import anomaly_rows, chunked, explainer_cache
+from sampling import sample_positions
+from compact_forest import CompactIsolationForest
+from model_registry import ModelRegistry
 import shap
 import threading
 import time
+from collections import deque
+from drift import PageHinkley, RunningMoments, TumblingWindows
 
 tracer = trace.get_tracer(__name__)
 
+class ModelBundle:
+    """One generation of ensemble members. Never refitted in place once published."""
+    def __init__(self, isolation=None, rf=None, lr=None, fitted=False, version=0):
+        self.isolation = isolation if isolation is not None else IsolationForest(contamination=0.05, random_state=42)
+        self.rf = rf if rf is not None else RandomForestClassifier(n_estimators=10, random_state=42)
+        self.lr = lr if lr is not None else LogisticRegression(max_iter=200)
+        self.fitted = fitted  # rf and lr have been fitted on labelled data
+        self.version = version
+
 # Demo ensemble model orchestrator
 class EnsembleOrchestrator:
-    def __init__(self):
-        self.isolation = IsolationForest(contamination=0.05, random_state=42)
-        self.rf = RandomForestClassifier(n_estimators=10, random_state=42)
-        self.lr = LogisticRegression(max_iter=200)
-        self.fitted = False
-        self.lock = threading.Lock()
+    """
+    Copy-on-write: fit() trains a fresh ModelBundle without holding any lock and then swaps the
+    reference, so predictions keep using the previous bundle (read once, lock-free) during a retrain.
+    With a registry, every bundle is also published there, and bundles published by other worker
+    processes are swapped in on access (memory-mapped; the isolation forest as its compact export).
+    """
+    def __init__(self, feature_pipeline=None, registry: ModelRegistry = None):
+        self.feature_pipeline = feature_pipeline
+        self.registry = registry
+        self._bundle = ModelBundle()
+        self.lock = threading.Lock()  # serializes swaps only
+
+    @property
+    def bundle(self) -> ModelBundle:
+        registry = self.registry
+        if registry is not None and registry.refresh():
+            self._adopt(registry.model, registry.version)
+        return self._bundle
 
-    def fit(self, df: pd.DataFrame):
-        X = df[["amount"]]
-        y = df["is_anomaly"] if "is_anomaly" in df else None
+    @bundle.setter
+    def bundle(self, bundle: ModelBundle):
+        self._bundle = bundle
+
+    def _adopt(self, members: dict, version: int):
         with self.lock:
-            self.isolation.fit(X)
-            if y is not None:
-                self.rf.fit(X, y)
-                self.lr.fit(X, y)
-            self.fitted = True
+            if version is not None and version > self._bundle.version:
+                self._bundle = ModelBundle(version=version, **members)
 
-    def predict(self, df: pd.DataFrame):
-        X = df[["amount"]]
+    def load(self) -> bool:
+        """Swap in the latest bundle published to the registry (if any)."""
+        if self.registry is None or not self.registry.load():
+            return False
+        self._adopt(self.registry.model, self.registry.version)
+        return True
+
+    @property
+    def isolation(self):
+        return self.bundle.isolation
+
+    @property
+    def rf(self):
+        return self.bundle.rf
+
+    @property
+    def lr(self):
+        return self.bundle.lr
+
+    @property
+    def fitted(self) -> bool:
+        return self.bundle.fitted
+
+    def features(self, df: pd.DataFrame, update: bool = False) -> pd.DataFrame:
+        return feature_matrix(df, self.feature_pipeline, update=update)
+
+    def fit(self, df: pd.DataFrame) -> ModelBundle:
+        # Large frames are fitted on a stratified sample of at most TRAIN_SAMPLE_ROWS (+ per-stratum) rows
+        rows = sample_positions(df)
+        X = self.features(df).iloc[rows]
+        y = df["is_anomaly"].iloc[rows] if "is_anomaly" in df else None
+        current = self.bundle
+        bundle = ModelBundle()
+        bundle.isolation.fit(X)
+        if y is not None:
+            bundle.rf.fit(X, y)
+            bundle.lr.fit(X, y)
+            bundle.fitted = True
+        else:
+            # Unlabelled data only refreshes the isolation forest; keep the current classifiers
+            bundle.rf, bundle.lr, bundle.fitted = current.rf, current.lr, current.fitted
+        version = None
+        if self.registry is not None:
+            members = {"isolation": CompactIsolationForest.from_sklearn(bundle.isolation),
+                       "rf": bundle.rf, "lr": bundle.lr, "fitted": bundle.fitted}
+            version = self.registry.publish(members, features=list(X.columns), train_samples=len(X))
         with self.lock:
-            scores = self.isolation.decision_function(X)
-            rf_pred = self.rf.predict_proba(X)[:,1] if self.fitted else np.zeros(len(X))
-            lr_pred = self.lr.predict_proba(X)[:,1] if self.fitted else np.zeros(len(X))
-            # Simple ensemble: average
-            ensemble_score = (scores + rf_pred + lr_pred) / 3
-            return ensemble_score > 0.5
+            bundle.version = version or self._bundle.version + 1
+            self._bundle = bundle
+        return bundle
 
-ensemble = EnsembleOrchestrator()
+    def predict(self, df: pd.DataFrame):
+        X = self.features(df, update=True)
+        bundle = self.bundle
+        scores = bundle.isolation.decision_function(X)
+        rf_pred = bundle.rf.predict_proba(X)[:,1] if bundle.fitted else np.zeros(len(X))
+        lr_pred = bundle.lr.predict_proba(X)[:,1] if bundle.fitted else np.zeros(len(X))
+        # Simple ensemble: average
+        ensemble_score = (scores + rf_pred + lr_pred) / 3
+        return ensemble_score > 0.5
+
+ensemble = EnsembleOrchestrator(feature_pipeline=default_pipeline(), registry=ModelRegistry("ensemble"))
 
-# Real-time drift detection (simple mean/variance demo)
+# Incremental drift detection on amounts against a reference distribution
 class DriftDetector:
-    def __init__(self):
-        self.ref_mean = None
-        self.ref_std = None
-        self.threshold = 3  # z-score threshold
+    """
+    Values are standardized against reference running moments (set by update_reference, or taken from
+    the first min_reference values seen) and clipped, so heavy-tailed amounts do not read as drift.
+    Page-Hinkley on that stream reports when the mean changed and by how much; tumbling windows of
+    several lengths report how far recent windows sit from the (equally clipped) reference.
+    State is constant-size; batches are processed with vector operations.
+    """
+    def __init__(self, window_lengths=(1_000, 10_000, 100_000), shift_threshold=0.25, std_ratio=1.5,
+                 ph_delta=0.1, ph_threshold=50.0, clip=3.0, min_reference=100, max_events=100):
+        self.window_lengths = window_lengths
+        self.shift_threshold = shift_threshold
+        self.std_ratio = std_ratio
+        self.ph_delta = ph_delta
+        self.ph_threshold = ph_threshold
+        self.clip = clip  # standardized values are clipped before Page-Hinkley so single outliers are not drift
+        self.min_reference = min_reference
+        self.events = deque(maxlen=max_events)
         self.lock = threading.Lock()
+        self._reset(RunningMoments())
+
+    def _reset(self, reference: RunningMoments):
+        self.reference = reference
+        self.clipped = RunningMoments()  # moments of the reference's clipped standardized values
+        self.stream = RunningMoments()  # everything consumed since the reference was set
+        self.page_hinkley = PageHinkley(self.ph_delta, self.ph_threshold)
+        self.windows = TumblingWindows(self.window_lengths, self.shift_threshold, self.std_ratio)
+
+    @property
+    def ref_mean(self):
+        return self.reference.mean if self.reference.n else None
+
+    @property
+    def ref_std(self):
+        return self.reference.std if self.reference.n else None
 
     def update_reference(self, df: pd.DataFrame):
         with self.lock:
-            self.ref_mean = df["amount"].mean()
-            self.ref_std = df["amount"].std()
+            values = df["amount"].to_numpy(dtype=float)
+            self._reset(RunningMoments().update(values))
+            self.clipped.update(self._standardize(values))
 
-    def detect(self, df: pd.DataFrame):
+    def _standardize(self, values):
+        scale = self.reference.std or 1.0
+        return np.clip((values - self.reference.mean) / scale, -self.clip, self.clip)
+
+    def update(self, values) -> list:
+        """Consume one value or a batch; returns the drift events it triggered (also kept in .events)."""
+        values = np.atleast_1d(np.asarray(values, dtype=float)).ravel()
+        values = values[~np.isnan(values)]
         with self.lock:
-            if self.ref_mean is None or self.ref_std is None:
-                return False
-            z_scores = np.abs((df["amount"] - self.ref_mean) / (self.ref_std + 1e-6))
-            return (z_scores > self.threshold).any()
+            if self.reference.n < self.min_reference:
+                take = self.min_reference - self.reference.n
+                self.reference.update(values[:take])
+                self.clipped.update(self._standardize(values[:take]))
+                values = values[take:]
+            if not len(values):
+                return []
+            self.stream.update(values)
+            scale = self.reference.std or 1.0
+            z = self._standardize(values)
+            now = time.time()
+            events = []
+            for alarm in self.page_hinkley.update(z):
+                events.append(dict(alarm, detector="page_hinkley", at=now, shift=alarm["mean_after"] - alarm["mean_before"],
+                                   mean_before=self.reference.mean + scale * alarm["mean_before"],
+                                   mean_after=self.reference.mean + scale * alarm["mean_after"]))
+            for drift in self.windows.update((z - self.clipped.mean) / (self.clipped.std or 1.0)):
+                events.append(dict(drift, detector="window", at=now))
+            self.events.extend(events)
+            return events
+
+    def detect(self, df: pd.DataFrame) -> bool:
+        """Feed a batch of transactions; True if it triggered a change or a drifting window."""
+        return bool(self.update(df["amount"].to_numpy(dtype=float)))
+
+    def report(self) -> dict:
+        """Reference and stream moments, the last window of each length and recent drift events."""
+        with self.lock:
+            return {
+                "reference": {"n": self.reference.n, "mean": self.reference.mean, "std": self.reference.std},
+                "stream": {"n": self.stream.n, "mean": self.stream.mean, "std": self.stream.std},
+                "windows": {str(length): stats for length, stats in self.windows.last.items()},
+                "events": list(self.events),
+            }
 
 drift_detector = DriftDetector()
 
 # SHAP explainability for RandomForest (demo)
-def shap_explain(df: pd.DataFrame):
-    X = df[["amount"]]
-    explainer = shap.TreeExplainer(ensemble.rf)
-    shap_values = explainer.shap_values(X)
-    return shap_values[1] if isinstance(shap_values, list) else shap_values
+def _anomaly_class(shap_values):
+    # Older shap returns one array per class, newer a (rows, features, classes) array
+    if isinstance(shap_values, list):
+        return shap_values[1]
+    shap_values = np.asarray(shap_values)
+    return shap_values[..., 1] if shap_values.ndim == 3 else shap_values
+
+def shap_explain(df: pd.DataFrame, top_k: int = None, all_rows: bool = False):
+    """
+    RandomForest SHAP values (anomaly class) for the rows the IsolationForest flags, the top_k most
+    anomalous rows, or every row with all_rows=True. Returns (row positions, values).
+    """
+    X = ensemble.features(df)
+    # One bundle for both steps, so a concurrent retrain cannot mix model generations
+    bundle = ensemble.bundle
+    rows = np.arange(len(X)) if all_rows else anomaly_rows(bundle.isolation.decision_function(X), top_k)
+    explainer = explainer_cache.get(bundle.rf, lambda: shap.TreeExplainer(bundle.rf))
+    return rows, chunked(lambda part: _anomaly_class(explainer.shap_values(part)), X.iloc[rows])
 
 # Automated retraining pipeline (demo)
 def auto_retrain(df: pd.DataFrame):
     with tracer.start_as_current_span("auto_retrain"):
         start = time.time()
-        ensemble.fit(df)
+        bundle = ensemble.fit(df)
         drift_detector.update_reference(df)
         latency_ms = (time.time() - start) * 1000
-        sla_tracker.record(latency_ms)
-        return {"status": "retrained", "latency_ms": latency_ms}
+        training_tracker.record(latency_ms)
+        training_duration.record(latency_ms, attributes={"model": "ensemble"})
+        return {"status": "retrained", "version": bundle.version, "latency_ms": latency_ms}
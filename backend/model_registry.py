@@ -0,0 +1,133 @@
+"""
+Versioned on-disk model store.
+Each model name gets a directory of joblib bundles (v0001.joblib, v0002.joblib, ...); the highest
+version is the current one. Bundles hold the fitted estimator plus metadata (features, train size)
+and optional artifacts (e.g. an array-backed scoring copy of the model).
+Bundles are loaded with mmap_mode="r", so every worker process maps the same on-disk arrays instead
+of holding its own copy, and each worker picks up versions published by other workers on its own:
+refresh() stats the model directory at most every MODEL_RELOAD_SECONDS and loads a newer version.
+"""
+import os
+import re
+import threading
+import time
+import joblib
+
+MODEL_DIR = os.getenv("MODEL_DIR", "model_store")
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() not in ("0", "false", "off", "no")
+# 0 turns the check for versions published by other processes off
+MODEL_RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", "5"))
+_VERSION_FILE = re.compile(r"^v(\d+)\.joblib$")
+
+class ModelNotLoaded(RuntimeError):
+    pass
+
+class ModelRegistry:
+    def __init__(self, name: str, model_dir: str = None, mmap: bool = None, reload_seconds: float = None):
+        self.name = name
+        self.model_dir = model_dir or MODEL_DIR
+        self.mmap = MODEL_MMAP if mmap is None else mmap
+        self.reload_seconds = MODEL_RELOAD_SECONDS if reload_seconds is None else reload_seconds
+        self.model = None
+        self.version = None
+        self.meta = {}
+        self.artifacts = {}
+        self.lock = threading.Lock()
+        self._checked_at = 0.0
+        self._dir_mtime = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.model_dir, self.name)
+
+    def _file(self, version: int) -> str:
+        return os.path.join(self.path, f"v{version:04d}.joblib")
+
+    def versions(self) -> list:
+        if not os.path.isdir(self.path):
+            return []
+        found = (_VERSION_FILE.match(f) for f in os.listdir(self.path))
+        return sorted(int(m.group(1)) for m in found if m)
+
+    def load(self, version: int = None) -> bool:
+        """Load the given (default: latest) version. Returns False when nothing has been saved yet."""
+        versions = self.versions()
+        if not versions:
+            return False
+        version = version or versions[-1]
+        # Arrays stay read-only views of the file (page cache shared by every process mapping it)
+        bundle = joblib.load(self._file(version), mmap_mode="r" if self.mmap else None)
+        with self.lock:
+            self.model = bundle.pop("model")
+            self.artifacts = bundle.pop("artifacts", None) or {}
+            self.meta = bundle
+            self.version = version
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Load the latest version if another process published one since the last check. Cheap enough
+        for hot paths: a clock read per call, plus one directory stat every reload_seconds.
+        """
+        if self.reload_seconds <= 0:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_seconds:
+            return False
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._dir_mtime:
+            return False
+        self._dir_mtime = mtime
+        versions = self.versions()
+        if not versions or versions[-1] <= (self.version or 0):
+            return False
+        return self.load(versions[-1])
+
+    def publish(self, model, artifacts: dict = None, **meta) -> int:
+        """Persist a fitted model (plus artifacts) as the next version and make it current."""
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock:
+            while True:
+                versions = self.versions()
+                version = (versions[-1] if versions else 0) + 1
+                bundle_meta = dict(meta, version=version, trained_at=time.time())
+                tmp = f"{self._file(version)}.{os.getpid()}.tmp"
+                try:
+                    # Uncompressed, so that loads can memory-map the arrays
+                    joblib.dump(dict(bundle_meta, model=model, artifacts=artifacts or {}), tmp)
+                    # Readers never see a partially written bundle, and linking fails instead of
+                    # overwriting when another process claimed this version first: try the next one
+                    os.link(tmp, self._file(version))
+                    break
+                except FileExistsError:
+                    continue
+                finally:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+            self.model, self.meta, self.version, self.artifacts = model, bundle_meta, version, artifacts or {}
+        return version
+
+    def current(self):
+        """Return the loaded model; raises ModelNotLoaded if none is loaded."""
+        self.refresh()
+        model = self.model
+        if model is None:
+            raise ModelNotLoaded(f"No trained {self.name} model is loaded.")
+        return model
+
+    def available(self) -> bool:
+        """Whether a model is loaded (after picking up any newer published version)."""
+        self.refresh()
+        return self.model is not None
+
+    def unload(self):
+        with self.lock:
+            self.model, self.meta, self.version, self.artifacts = None, {}, None, {}
+
+    def info(self) -> dict:
+        with self.lock:
+            return dict(self.meta, name=self.name, version=self.version, loaded=self.model is not None)
@@ -0,0 +1,107 @@
+"""
+Online anomaly detector for single-event scoring.
+Keeps an exponentially weighted mean/variance of amount per customer (plus a global baseline for
+customers still warming up). Scoring and updating are O(1) per event and need no refitting.
+"""
+import math
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+ONLINE_DETECTOR_SNAPSHOT = os.getenv("ONLINE_DETECTOR_SNAPSHOT", "model_store/online_detector.pkl")
+
+class OnlineAnomalyDetector:
+    def __init__(self, alpha=0.05, threshold=4.0, warmup=5, clip=3.0, max_customers=100_000):
+        self.alpha = alpha              # weight of the newest event in the running moments
+        self.threshold = threshold      # |z| above this is anomalous
+        self.warmup = warmup            # events before a customer's own baseline is trusted
+        self.clip = clip                # updates are winsorized at mean +/- clip*std so outliers barely move the baseline
+        self.max_customers = max_customers
+        self.customers = OrderedDict()  # customer_id -> [count, mean, var]
+        self.global_state = [0, 0.0, 0.0]
+        self.lock = threading.Lock()
+
+    def _update_state(self, state, amount):
+        count, mean, var = state
+        if count == 0:
+            state[0], state[1], state[2] = 1, amount, 0.0
+            return
+        if count >= self.warmup and var > 0:
+            bound = self.clip * math.sqrt(var)
+            amount = min(max(amount, mean - bound), mean + bound)
+        # Plain running moments while warming up, exponentially weighted afterwards
+        alpha = max(self.alpha, 1.0 / (count + 1))
+        diff = amount - mean
+        incr = alpha * diff
+        state[0] = count + 1
+        state[1] = mean + incr
+        state[2] = (1 - alpha) * (var + diff * incr)
+
+    def _zscore(self, state, amount):
+        count, mean, var = state
+        if count < 2:
+            return 0.0
+        return abs(amount - mean) / math.sqrt(var + 1e-9)
+
+    def _baseline(self, customer_id):
+        state = self.customers.get(customer_id)
+        if state is not None and state[0] >= self.warmup:
+            return state
+        return self.global_state
+
+    def score(self, customer_id, amount: float) -> float:
+        """|z| of amount against the customer's baseline, without updating state."""
+        with self.lock:
+            return self._zscore(self._baseline(customer_id), amount)
+
+    def update(self, customer_id, amount: float) -> dict:
+        """Score one event, then fold it into the customer's and the global baseline."""
+        amount = float(amount)
+        if not math.isfinite(amount):
+            raise ValueError(f"amount must be finite, got {amount}")
+        with self.lock:
+            z = self._zscore(self._baseline(customer_id), amount)
+            state = self.customers.get(customer_id)
+            if state is None:
+                state = self.customers[customer_id] = [0, 0.0, 0.0]
+                if len(self.customers) > self.max_customers:
+                    self.customers.popitem(last=False)
+            else:
+                self.customers.move_to_end(customer_id)
+            self._update_state(state, amount)
+            self._update_state(self.global_state, amount)
+        return {"score": z, "is_anomaly": z > self.threshold}
+
+    def snapshot(self, path: str = None) -> str:
+        """Atomically write the detector state to disk."""
+        path = path or ONLINE_DETECTOR_SNAPSHOT
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.lock:
+            state = {
+                "params": {"alpha": self.alpha, "threshold": self.threshold, "warmup": self.warmup,
+                           "clip": self.clip, "max_customers": self.max_customers},
+                "customers": list(self.customers.items()),
+                "global_state": list(self.global_state),
+            }
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return path
+
+    def restore(self, path: str = None) -> bool:
+        """Load state written by snapshot(); returns False if there is no snapshot."""
+        path = path or ONLINE_DETECTOR_SNAPSHOT
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        with self.lock:
+            for key, value in state["params"].items():
+                setattr(self, key, value)
+            self.customers = OrderedDict(state["customers"])
+            self.global_state = list(state["global_state"])
+        return True
+
+online_detector = OnlineAnomalyDetector()
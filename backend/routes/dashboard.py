@@ -120,3 +120,61 @@ def dashboard_stats(db: Session = Depends(get_db), current_user=Depends(get_curr
             "compliance_risk_score": comp_risk
         }
 
+
+@router.get("/model")
+def anomaly_model_info(current_user=Depends(get_current_user)):
+    """
+    Version and metadata of the anomaly model used to score uploads.
+    """
+    return ml.anomaly_model.info()
+
+@router.get("/model/drift")
+def anomaly_model_drift(current_user=Depends(get_current_user)):
+    """
+    Approximate KS / PSI drift of the current scoring window against the long-run reference,
+    plus the result recorded for the last completed window.
+    """
+    from drift import drift_monitor
+    return {"current": drift_monitor.check(), "last_window": drift_monitor.last_window}
+
+@router.get("/model/batching")
+def anomaly_model_batching(current_user=Depends(get_current_user)):
+    """
+    Micro-batching settings and recent batch size / queue delay statistics of the scoring path.
+    """
+    return ml.scoring_batcher.stats()
+
+@router.post("/model/retrain")
+def retrain_anomaly_model(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """
+    Train new global and per-customer anomaly model versions on stored transactions and make them current.
+    """
+    with tracer.start_as_current_span("retrain_anomaly_model"):
+        from fastapi import HTTPException
+        from customer_models import customer_models
+        if db.query(Transaction.id).first() is None:
+            raise HTTPException(status_code=400, detail="No transactions to train on.")
+        # One streamed pass over the table: only bounded samples are held in memory and fitted on
+        customer_sample = customer_models.reservoir()
+
+        def chunks():
+            for chunk in _transaction_chunks(db):
+                customer_sample.add(chunk)
+                yield chunk
+        result = ml.train_anomaly_model(chunks())
+        result["customer_models"] = customer_models.fit(customer_sample.sample())
+        return result
+
+def _transaction_chunks(db: Session, chunk_rows: int = 50_000):
+    """Stored transactions as DataFrames of up to chunk_rows rows, fetched incrementally."""
+    import pandas as pd
+    columns = ["timestamp", "amount", "type", "customer_id"]
+    query = db.query(Transaction.timestamp, Transaction.amount, Transaction.type, Transaction.customer_id)
+    rows = []
+    for row in query.yield_per(chunk_rows):
+        rows.append(tuple(row))
+        if len(rows) == chunk_rows:
+            yield pd.DataFrame(rows, columns=columns)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=columns)
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 import pandas as pd
 from opentelemetry import trace
-from ml_extended import ensemble, drift_detector, shap_explain, auto_retrain
+from ml_extended import ensemble, drift_detector, shap_explain
+from utils.retrain_jobs import retrain_jobs
+from utils.sla import training_tracker
 from routes.auth_utils import get_current_user
 from sqlalchemy.orm import Session
 from database import SessionLocal
@@ -28,19 +31,45 @@ def ensemble_predict(file: UploadFile = File(...), current_user=Depends(get_curr
 def drift_detect(file: UploadFile = File(...), current_user=Depends(get_current_user)):
     with tracer.start_as_current_span("drift_detect"):
         df = pd.read_csv(file.file)
-        drift = drift_detector.detect(df)
-        return {"drift_detected": bool(drift)}
+        events = drift_detector.update(df["amount"].to_numpy(dtype=float))
+        return {"drift_detected": bool(events), "events": events}
+
+@router.get("/drift")
+def drift_report(current_user=Depends(get_current_user)):
+    """
+    Reference / stream moments, the last window of each length and recent drift events.
+    """
+    return drift_detector.report()
 
 @router.post("/shap_explain")
-def shap_explain_api(file: UploadFile = File(...), current_user=Depends(get_current_user)):
+def shap_explain_api(file: UploadFile = File(...), top_k: Optional[int] = None, all_rows: bool = False,
+                     current_user=Depends(get_current_user)):
     with tracer.start_as_current_span("shap_explain"):
         df = pd.read_csv(file.file)
-        shap_vals = shap_explain(df)
-        return {"shap_values": shap_vals.tolist()}
+        rows, shap_vals = shap_explain(df, top_k=top_k, all_rows=all_rows)
+        return {"rows": rows.tolist(), "shap_values": shap_vals.tolist()}
 
-@router.post("/auto_retrain")
+@router.post("/auto_retrain", status_code=202)
 def auto_retrain_api(file: UploadFile = File(...), db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """
+    Queue a retrain on the uploaded CSV and return its job (202). While a retrain is already queued,
+    the upload replaces that job's data and the job is returned with "coalesced": true.
+    Poll GET /dashboard/ml_extended/auto_retrain/{job_id} for the result.
+    """
     with tracer.start_as_current_span("auto_retrain_api"):
         df = pd.read_csv(file.file)
-        result = auto_retrain(df)
-        return result
+        return retrain_jobs.submit(df)
+
+@router.get("/auto_retrain")
+def auto_retrain_status(current_user=Depends(get_current_user)):
+    """
+    Running / queued retrain job ids, the latest job and training latency stats.
+    """
+    return dict(retrain_jobs.status(), training_latency=training_tracker.stats())
+
+@router.get("/auto_retrain/{job_id}")
+def auto_retrain_job(job_id: str, current_user=Depends(get_current_user)):
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retrain job not found.")
+    return job
@@ -3,13 +3,16 @@ from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import Transaction
 from schemas import TransactionOut
-import ml
 import pandas as pd
-from io import StringIO
 from datetime import datetime
 from utils.telemetry import anomaly_counter
 from utils.alerts import send_email_alert
-from fastapi import BackgroundTasks
+from utils.ingest import IngestError, ingest_file
+from utils.ingest_jobs import ingest_jobs, JobQueueFull
+from utils.ingest_dedup import content_hash, upload_index
+from utils.ingest_stream import ingest_ndjson
+from fastapi import BackgroundTasks, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from opentelemetry import trace
 tracer = trace.get_tracer(__name__)
 
@@ -25,113 +28,58 @@ def get_db():
 from routes.auth_utils import get_current_user
 
 @router.post("/upload", response_model=dict)
-async def upload_transactions(file: UploadFile = File(...), db: Session = Depends(get_db), current_user=Depends(get_current_user), background_tasks: BackgroundTasks = None):
+async def upload_transactions(response: Response, file: UploadFile = File(...), db: Session = Depends(get_db), current_user=Depends(get_current_user), background_tasks: BackgroundTasks = None, stream: bool = False, chunksize: int = None, background: bool = False):
     with tracer.start_as_current_span("upload_transactions"):
         """
         Upload a CSV or PDF containing transactions. Validates input, runs anomaly detection, and stores results.
         Returns number of inserted transactions, anomalies, and any row errors.
+        With stream=true, CSVs are parsed, scored and inserted in chunks of `chunksize` rows (committed per chunk).
+        With background=true, the file is queued as an ingest job and a job id is returned immediately (202);
+        poll GET /transactions/jobs/{job_id} for progress.
+        A file whose content was already ingested returns the original result flagged "duplicate".
+        Stream uploads are not atomic: when a chunk fails after earlier ones were committed, the 400
+        detail is {"message", "inserted", "anomalies", "errors", "chunks", "rows_processed"} for those.
         """
-        import pdfplumber
-        import mimetypes
-        import os
-        import tempfile
-        import pandas as pd
-        from fastapi import status
+        digest = await run_in_threadpool(content_hash, file.file)
+        original = await run_in_threadpool(upload_index.lookup, db, digest)
+        if original is not None:
+            return dict(original, duplicate=True)
 
-        filename = file.filename.lower()
-        content_type = file.content_type or mimetypes.guess_type(filename)[0]
-        df = None
-        errors = []
-
-        # Read and parse file
-        try:
-            if filename.endswith('.csv') or (content_type and 'csv' in content_type):
-                try:
-                    content = await file.read()
-                    content = content.decode('utf-8')
-                except Exception:
-                    raise HTTPException(status_code=400, detail="Could not decode CSV file. Ensure it's UTF-8 encoded.")
-                try:
-                    df = pd.read_csv(StringIO(content))
-                except Exception:
-                    raise HTTPException(status_code=400, detail="Could not parse CSV. Ensure it is a valid CSV file.")
-            elif filename.endswith('.pdf') or (content_type and 'pdf' in content_type):
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                    tmp.write(await file.read())
-                    tmp_path = tmp.name
-                try:
-                    with pdfplumber.open(tmp_path) as pdf:
-                        tables = []
-                        for page in pdf.pages:
-                            for table in page.extract_tables():
-                                tables.append(table)
-                except Exception:
-                    os.remove(tmp_path)
-                    raise HTTPException(status_code=400, detail="Could not parse PDF. Ensure it contains extractable tables.")
-                os.remove(tmp_path)
-                for table in tables:
-                    if table and table[0]:
-                        headers = [h.strip().lower() for h in table[0]]
-                        if set(['timestamp', 'amount', 'type', 'customer_id']).issubset(headers):
-                            df = pd.DataFrame(table[1:], columns=table[0])
-                            break
-                if df is None:
-                    raise HTTPException(status_code=400, detail="No valid transaction table found in PDF.")
-            else:
-                raise HTTPException(status_code=400, detail="File must be CSV or PDF.")
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"File processing error: {str(e)}")
-
-        # Ensure required columns
-        required = {'timestamp', 'amount', 'type', 'customer_id'}
-        df.columns = [c.strip().lower() for c in df.columns]
-        if not required.issubset(df.columns):
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {required - set(df.columns)}.")
-
-        # Validate and convert columns
-        def safe_parse(row, idx):
+        if background:
             try:
-                ts = pd.to_datetime(row['timestamp'])
-                amt = float(row['amount'])
-                typ = str(row['type'])
-                cid = str(row['customer_id'])
-                return {'timestamp': ts, 'amount': amt, 'type': typ, 'customer_id': cid}, None
-            except Exception as e:
-                return None, f"Row {idx+1}: {str(e)}"
+                job = await run_in_threadpool(ingest_jobs.submit, file.file, file.filename, file.content_type, stream, chunksize, digest)
+            except JobQueueFull as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            response.status_code = 202
+            return job
 
-        valid_rows = []
-        for idx, row in df.iterrows():
-            parsed, err = safe_parse(row, idx)
-            if parsed:
-                valid_rows.append(parsed)
-            else:
-                errors.append(err)
+        # Parsing, scoring and DB writes are blocking; keep them off the event loop
+        try:
+            result = await run_in_threadpool(ingest_file, db, file.file, file.filename, file.content_type, stream, chunksize)
+        except IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e) if e.partial is None else dict(e.partial, message=str(e)))
+        await run_in_threadpool(upload_index.record, db, digest, file.filename, result)
+        return result
 
-        if not valid_rows:
-            raise HTTPException(status_code=400, detail="No valid rows found in file.")
+@router.post("/stream", response_model=dict)
+async def stream_transactions(request: Request, db: Session = Depends(get_db), current_user=Depends(get_current_user), batch_size: int = None):
+    with tracer.start_as_current_span("stream_transactions"):
+        """
+        Ingest a newline-delimited JSON body of transactions ({"timestamp", "amount", "type", "customer_id"} per line).
+        The body is consumed incrementally and scored/inserted in micro-batches of `batch_size` lines.
+        Returns received/inserted/anomaly counts and per-line validation errors.
+        """
+        return await ingest_ndjson(db, request.stream(), batch_size=batch_size)
 
-        clean_df = pd.DataFrame(valid_rows)
-        # Run anomaly detection
-        anomalies = ml.detect_anomalies(clean_df)
-        clean_df['is_anomaly'] = anomalies
-        # Store in DB
-        for _, row in clean_df.iterrows():
-            tx = Transaction(
-                timestamp=row['timestamp'],
-                amount=row['amount'],
-                type=row['type'],
-                customer_id=row['customer_id'],
-                is_anomaly=bool(row['is_anomaly'])
-            )
-            db.add(tx)
-        db.commit()
-        return {
-            "inserted": len(clean_df),
-            "anomalies": sum(anomalies),
-            "errors": errors
-        }
+@router.get("/jobs/{job_id}", response_model=dict)
+def get_ingest_job(job_id: str, current_user=Depends(get_current_user)):
+    """
+    Report status, progress, row counts and errors of a background ingest job.
+    """
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found.")
+    return job
 
 from fastapi import Query
 
@@ -0,0 +1,132 @@
+"""
+Bounded training samples from arbitrarily large transaction sets.
+StratifiedReservoir consumes DataFrame chunks (a DB cursor, an upload) in one pass. Every row gets a
+seeded random key; the sample is the TRAIN_SAMPLE_ROWS rows with the smallest keys overall (a uniform
+sample, so strata keep their proportions) plus the TRAIN_SAMPLE_MIN_PER_STRATUM smallest-key rows of
+every stratum (so rare transaction types or segments are never missing). With max_rows, the per-stratum
+quota shrinks as strata appear so that all strata together keep at most max_rows rows (at least one
+each); with min_stratum_rows, only strata with that many rows seen so far share max_rows, and smaller
+ones keep what they have until they reach it. Memory and the cost of fitting on the sample stay bounded however many rows are streamed through.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+TRAIN_SAMPLE_ROWS = int(os.getenv("TRAIN_SAMPLE_ROWS", "100000"))
+TRAIN_SAMPLE_MIN_PER_STRATUM = int(os.getenv("TRAIN_SAMPLE_MIN_PER_STRATUM", "100"))
+TRAIN_SAMPLE_SEED = int(os.getenv("TRAIN_SAMPLE_SEED", "42"))
+# Columns defining strata; columns missing from the data are ignored
+TRAIN_SAMPLE_STRATA = [c.strip() for c in os.getenv("TRAIN_SAMPLE_STRATA", "type,segment").split(",") if c.strip()]
+
+_KEY, _STRATUM, _POS = "_sample_key", "_sample_stratum", "_sample_pos"
+
+class StratifiedReservoir:
+    def __init__(self, budget: int = None, strata=None, min_per_stratum: int = None, seed: int = None,
+                 max_rows: int = None, min_stratum_rows: int = 0):
+        self.budget = TRAIN_SAMPLE_ROWS if budget is None else budget  # 0: only the per-stratum rows
+        self.strata = list(TRAIN_SAMPLE_STRATA if strata is None else strata)
+        self.min_per_stratum = TRAIN_SAMPLE_MIN_PER_STRATUM if min_per_stratum is None else min_per_stratum
+        self.max_rows = max_rows  # cap on the per-stratum rows of all strata together; None: no cap
+        self.min_stratum_rows = min_stratum_rows  # strata with fewer rows seen don't share max_rows
+        self.rng = np.random.default_rng(TRAIN_SAMPLE_SEED if seed is None else seed)
+        self.stratum_ids = {}  # stratum values -> id
+        self.rows = 0
+        self.parts = []  # pooled candidate rows; concatenated only when trimming
+        self.pooled = 0
+        # A row can only make the sample if its key is below the global or its stratum's cut-off
+        self.global_cutoff = 1.0 if self.budget else 0.0
+        self.stratum_cutoff = np.zeros(0)
+        self.stratum_rows = np.zeros(0, dtype=np.int64)
+
+    def _stratum_codes(self, chunk: pd.DataFrame) -> np.ndarray:
+        columns = [c for c in self.strata if c in chunk]
+        if not columns:
+            codes, uniques = np.zeros(len(chunk), dtype=np.intp), [()]
+        else:
+            codes, uniques = pd.MultiIndex.from_frame(chunk[columns].astype(str)).factorize()
+        ids = np.array([self.stratum_ids.setdefault(tuple(u), len(self.stratum_ids)) for u in uniques], dtype=np.intp)
+        if len(self.stratum_ids) > len(self.stratum_cutoff):
+            grow = len(self.stratum_ids) - len(self.stratum_cutoff)
+            self.stratum_cutoff = np.concatenate([self.stratum_cutoff, np.ones(grow)])
+            self.stratum_rows = np.concatenate([self.stratum_rows, np.zeros(grow, dtype=np.int64)])
+        return ids[codes]
+
+    def add(self, chunk: pd.DataFrame) -> "StratifiedReservoir":
+        n = len(chunk)
+        if n == 0:
+            return self
+        keys = self.rng.random(n)
+        strata = self._stratum_codes(chunk)
+        self.stratum_rows += np.bincount(strata, minlength=len(self.stratum_rows))
+        keep = (keys < self.global_cutoff) | (keys < self.stratum_cutoff[strata])
+        part = chunk[keep].assign(**{_KEY: keys[keep], _STRATUM: strata[keep], _POS: self.rows + np.flatnonzero(keep)})
+        self.rows += n
+        self.parts.append(part)
+        self.pooled += len(part)
+        # Trimming is amortized: only once the pool holds twice what the sample can use
+        if self.pooled > 2 * (self.budget + self.quota() * len(self.stratum_ids)):
+            self._trim()
+        return self
+
+    def quota(self) -> int:
+        """Rows currently kept per stratum (on top of the global budget)."""
+        if self.max_rows is None:
+            return self.min_per_stratum
+        sharing = int(np.count_nonzero(self.stratum_rows >= self.min_stratum_rows))
+        if not sharing:
+            return self.min_per_stratum
+        return max(1, min(self.min_per_stratum, self.max_rows // sharing))
+
+    def _trim(self):
+        # Keys are fixed per row, so a smaller quota keeps a subset of what a larger one kept
+        quota = self.quota()
+        pool = pd.concat(self.parts, ignore_index=True) if len(self.parts) > 1 else self.parts[0]
+        pool = pool.sort_values(_KEY, kind="stable", ignore_index=True)
+        keys, strata = pool[_KEY].to_numpy(), pool[_STRATUM].to_numpy()
+        rank_in_stratum = pool.groupby(_STRATUM, sort=False).cumcount().to_numpy()
+        pool = pool[(np.arange(len(pool)) < self.budget) | (rank_in_stratum < quota)]
+        self.parts, self.pooled = [pool], len(pool)
+        if self.budget and len(keys) >= self.budget:
+            self.global_cutoff = keys[self.budget - 1]
+        full = (rank_in_stratum == quota - 1)
+        self.stratum_cutoff[strata[full]] = keys[full]
+
+    def _pool(self):
+        if not self.parts:
+            return None
+        self._trim()
+        return self.parts[0]
+
+    def sample(self) -> pd.DataFrame:
+        """The sampled rows, in arrival order, with a fresh index."""
+        pool = self._pool()
+        if pool is None:
+            return pd.DataFrame()
+        return pool.sort_values(_POS).drop(columns=[_KEY, _STRATUM, _POS]).reset_index(drop=True)
+
+    def positions(self) -> np.ndarray:
+        """Arrival positions (over all rows added so far) of the sampled rows, ascending."""
+        pool = self._pool()
+        if pool is None:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(pool[_POS].to_numpy())
+
+    def stats(self) -> dict:
+        return {"rows_seen": self.rows, "strata": len(self.stratum_ids), "pooled": self.pooled,
+                "per_stratum": self.quota()}
+
+def sample_positions(df: pd.DataFrame, budget: int = None, seed: int = None) -> np.ndarray:
+    """Row positions of df to train on: all of them when df fits the budget, else a stratified sample."""
+    budget = TRAIN_SAMPLE_ROWS if budget is None else budget
+    if len(df) <= budget:
+        return np.arange(len(df))
+    return StratifiedReservoir(budget=budget, seed=seed).add(df).positions()
+
+def sample_training_data(source, budget: int = None, seed: int = None) -> pd.DataFrame:
+    """Training sample from a DataFrame or an iterable of DataFrame chunks."""
+    if isinstance(source, pd.DataFrame):
+        return source.iloc[sample_positions(source, budget, seed)]
+    reservoir = StratifiedReservoir(budget=budget, seed=seed)
+    for chunk in source:
+        reservoir.add(chunk)
+    return reservoir.sample()
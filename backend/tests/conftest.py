@@ -1,3 +1,4 @@
+import os
 import pytest
 
 # --- AUTOUSE PATCH FOR ANOMALY DETECTION ---
@@ -8,6 +9,38 @@ def patch_detect_anomalies(monkeypatch):
         return [False] * len(df)
     monkeypatch.setattr(ml, "detect_anomalies", mock_detect)
 
+# Each test gets a fresh database, so forget file hashes ingested by earlier tests
+@pytest.fixture(autouse=True)
+def clear_upload_index():
+    from utils.ingest_dedup import upload_index
+    upload_index.clear()
+    yield
+    upload_index.clear()
+
+# Snapshots and model bundles go to a per-test directory instead of model_store/ in the working tree,
+# so the app lifespan neither restores state from earlier runs nor leaves files behind
+@pytest.fixture(autouse=True)
+def isolate_model_store(tmp_path, monkeypatch):
+    import drift
+    import ml
+    import ml_extended
+    import model_registry
+    import online_detector
+    from customer_models import customer_models
+    model_dir = str(tmp_path / "model_store")
+    monkeypatch.setattr(model_registry, "MODEL_DIR", model_dir)
+    monkeypatch.setattr(ml.anomaly_model, "model_dir", model_dir)
+    monkeypatch.setattr(customer_models.registry, "model_dir", model_dir)
+    monkeypatch.setattr(ml_extended.ensemble, "registry", model_registry.ModelRegistry("ensemble", model_dir=model_dir))
+    monkeypatch.setattr(online_detector, "ONLINE_DETECTOR_SNAPSHOT", os.path.join(model_dir, "online_detector.pkl"))
+    monkeypatch.setattr(drift, "DRIFT_SNAPSHOT", os.path.join(model_dir, "drift_monitor.pkl"))
+
+# No MLflow runs from the suite: tracking would write ./mlruns in the working tree
+@pytest.fixture(autouse=True)
+def disable_experiment_tracking(monkeypatch):
+    from utils.tracking import tracker
+    monkeypatch.setattr(tracker, "enabled", False)
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
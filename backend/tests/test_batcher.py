@@ -0,0 +1,87 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+import ml
+from batcher import MicroBatcher
+from model_registry import ModelRegistry
+
+class Recorder:
+    """Scoring function that doubles amount and remembers the batch sizes it was called with."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, df):
+        self.calls.append(len(df))
+        amount = df["amount"].to_numpy(dtype=float)
+        return amount * 2, amount > 10
+
+def submit_concurrently(batcher, frames):
+    results = [None] * len(frames)
+    barrier = threading.Barrier(len(frames))
+
+    def run(i):
+        barrier.wait()
+        results[i] = batcher(frames[i], timeout=5)
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(frames))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_coalesces_requests_and_returns_each_callers_slice():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_wait_ms=200, max_batch_rows=1000)
+    frames = [pd.DataFrame({"amount": [i, i + 20]}) for i in range(8)]
+    results = submit_concurrently(batcher, frames)
+    for i, (doubled, flags) in enumerate(results):
+        assert list(doubled) == [2 * i, 2 * (i + 20)]
+        assert list(flags) == [False, True]
+    assert sum(fn.calls) == 16
+    assert len(fn.calls) < 8
+    stats = batcher.stats()
+    assert stats["requests"] == 8 and stats["rows"] == 16
+    assert stats["max_batch_rows_seen"] == max(fn.calls)
+    batcher.close()
+
+def test_batches_never_exceed_max_rows():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_wait_ms=100, max_batch_rows=5)
+    frames = [pd.DataFrame({"amount": [1.0, 2.0]}) for _ in range(6)]
+    submit_concurrently(batcher, frames)
+    assert max(fn.calls) <= 5 and sum(fn.calls) == 12
+    # A request that fills a batch on its own is scored without waiting
+    batcher(pd.DataFrame({"amount": np.ones(5)}))
+    assert fn.calls[-1] == 5
+    batcher.close()
+
+def test_errors_reach_every_caller_in_the_batch():
+    def fail(df):
+        raise ValueError("boom")
+    batcher = MicroBatcher(fail, max_wait_ms=50)
+    with pytest.raises(ValueError):
+        batcher(pd.DataFrame({"amount": [1.0]}), timeout=5)
+    assert batcher.stats()["errors"] == 1
+    batcher.close()
+
+def test_different_columns_are_scored_separately():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_wait_ms=200)
+    frames = [pd.DataFrame({"amount": [1.0]}), pd.DataFrame({"amount": [30.0], "type": ["x"]})] * 2
+    results = submit_concurrently(batcher, frames)
+    assert [list(r[0]) for r in results] == [[2.0], [60.0], [2.0], [60.0]]
+    batcher.close()
+
+def test_zero_wait_scores_inline():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_wait_ms=0)
+    doubled, _ = batcher(pd.DataFrame({"amount": [3.0]}))
+    assert list(doubled) == [6.0] and batcher.thread is None
+
+def test_real_time_pipeline_adds_model_score(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml, "anomaly_model", ModelRegistry("isolation_forest", model_dir=str(tmp_path)))
+    ml.train_anomaly_model(pd.DataFrame({"amount": np.random.default_rng(0).normal(100, 10, 500)}))
+    result = ml.real_time_scoring_pipeline({"customer_id": "rt", "amount": 50000})
+    assert result["model_anomaly"] is True
+    assert result["model_score"] < 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import IsolationForest
+import ml
+from compact_forest import CompactIsolationForest
+from model_registry import ModelRegistry
+
+@pytest.mark.parametrize("n_features,max_features", [(1, 1.0), (4, 1.0), (4, 0.5)])
+def test_scores_match_sklearn(n_features, max_features):
+    rng = np.random.default_rng(0)
+    model = IsolationForest(contamination=0.05, random_state=42, max_features=max_features)
+    model.fit(rng.normal(size=(2000, n_features)))
+    compact = CompactIsolationForest.from_sklearn(model)
+    X = rng.normal(scale=2, size=(500, n_features))
+    X[::37, 0] = np.nan
+    np.testing.assert_allclose(compact.decision_function(X), model.decision_function(X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(compact.score_samples(X), model.score_samples(X), rtol=0, atol=1e-12)
+    assert (compact.predict(X) == model.predict(X)).all()
+    assert compact.score_one(X[1]) == pytest.approx(model.decision_function(X[1:2])[0], abs=1e-12)
+
+def test_rejects_wrong_feature_count():
+    model = IsolationForest(random_state=0).fit(np.random.default_rng(0).normal(size=(100, 2)))
+    compact = CompactIsolationForest.from_sklearn(model)
+    with pytest.raises(ValueError):
+        compact.decision_function(np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        compact.score_one([1.0])
+
+def test_score_uses_compact_model_per_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml, "anomaly_model", ModelRegistry("isolation_forest", model_dir=str(tmp_path)))
+    rng = np.random.default_rng(1)
+    ml.train_anomaly_model(pd.DataFrame({"amount": rng.normal(100, 10, 500)}))
+    batch = pd.DataFrame({"amount": [100.0, 50000.0]})
+    scores, flags = ml.score(batch)
+    np.testing.assert_allclose(scores, ml.anomaly_model.model.decision_function(batch[["amount"]].to_numpy()), atol=1e-12)
+    assert list(flags) == [False, True]
+    first = ml.compact_anomaly_model()
+    assert ml.compact_anomaly_model() is first
+    ml.train_anomaly_model(pd.DataFrame({"amount": rng.normal(100, 10, 500)}))
+    assert ml.compact_anomaly_model() is not first
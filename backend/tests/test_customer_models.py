@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ml
+from ml import detect_anomalies
+from customer_models import CustomerModels
+from model_registry import ModelRegistry
+
+def _history(rng, customer_id, mean, n=200):
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="h"),
+        "amount": rng.normal(mean, mean * 0.05, n),
+        "type": "debit",
+        "customer_id": customer_id,
+    })
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(0)
+    return pd.concat([_history(rng, "small", 100), _history(rng, "large", 20000), _history(rng, "rare", 50, n=5)])
+
+@pytest.fixture
+def models(tmp_path):
+    cm = CustomerModels(registry=ModelRegistry("customer_models", model_dir=str(tmp_path)), min_samples=50, max_workers=1)
+    yield cm
+    cm.shutdown()
+
+def _batch():
+    return pd.DataFrame({"amount": [20000.0, 100.0, 20000.0, 120.0], "customer_id": ["small", "small", "large", "unknown"]})
+
+def test_fit_skips_customers_without_enough_history(models, history):
+    result = models.fit(history)
+    assert result["customers"] == 2
+    assert sorted(models.models) == ["large", "small"]
+    assert models.registry.meta["train_samples"] == 400
+
+def test_fit_without_eligible_customers_keeps_the_current_version(models, history):
+    version = models.fit(history)["version"]
+    result = models.fit(history[history["customer_id"] == "rare"])
+    assert result["customers"] == 0
+    assert result["version"] == version
+    assert models.registry.versions() == [version]
+    assert sorted(models.models) == ["large", "small"]
+
+def test_scores_against_each_customers_baseline(models, history):
+    models.fit(history)
+    fallback_rows = []
+
+    def fallback(df):
+        fallback_rows.append(df)
+        return np.ones(len(df), dtype=bool)
+
+    flags = models.predict(_batch(), fallback)
+    # $20k is anomalous for "small" but normal for "large"; "unknown" goes to the global model
+    assert flags.tolist() == [True, False, False, True]
+    assert fallback_rows[0]["customer_id"].tolist() == ["unknown"]
+
+def test_process_pool_matches_in_process_scoring(models, history):
+    models.fit(history)
+    batch = pd.concat([_batch()] * 50, ignore_index=True)
+    expected = models.predict(batch, lambda df: np.zeros(len(df), dtype=bool))
+    models.max_workers, models.parallel_min_rows = 2, 1
+    assert models.predict(batch, lambda df: np.zeros(len(df), dtype=bool)).tolist() == expected.tolist()
+
+def test_pool_scoring_uses_the_version_its_models_came_from(models, history, tmp_path):
+    models.fit(history)
+    other = CustomerModels(registry=ModelRegistry("customer_models", model_dir=str(tmp_path)), min_samples=50, max_workers=1)
+    other.fit(_history(np.random.default_rng(1), "other", 500))
+    score = models._score
+
+    def reload_then_score(*args):
+        # Another worker's version is loaded between reading the models and scoring them
+        models.registry.load()
+        return score(*args)
+
+    models._score = reload_then_score
+    models.registry.reload_seconds = 0
+    models.max_workers, models.parallel_min_rows = 2, 1
+    batch = pd.concat([_batch()] * 50, ignore_index=True)
+    flags = models.predict(batch, lambda df: np.zeros(len(df), dtype=bool))
+    assert flags[:4].tolist() == [True, False, False, False]
+    assert models.registry.version == 2
+
+def test_evicts_cold_customers(models, history):
+    models.fit(history)
+    models.last_used["large"] -= 3600
+    assert models.evict(max_idle_seconds=60) == 1
+    assert list(models.models) == ["small"]
+    flags = models.predict(_batch(), lambda df: np.zeros(len(df), dtype=bool))
+    assert flags.tolist() == [True, False, False, False]
+
+def test_max_customers_keeps_most_recent(tmp_path, history):
+    history.loc[history["customer_id"] == "large", "timestamp"] += pd.Timedelta(days=30)
+    cm = CustomerModels(registry=ModelRegistry("customer_models", model_dir=str(tmp_path)),
+                        min_samples=50, max_customers=1, max_workers=1)
+    cm.fit(history)
+    assert list(cm.models) == ["large"]
+
+def test_detect_anomalies_uses_customer_models(monkeypatch, models, history):
+    models.fit(history)
+    monkeypatch.setattr(ml, "customer_models", models)
+    monkeypatch.setattr(ml, "_global_anomalies", lambda df: np.zeros(len(df), dtype=bool))
+    assert detect_anomalies(_batch()).tolist() == [True, False, False, False]
@@ -0,0 +1,123 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ks_2samp
+import ml
+from drift import DriftMonitor, KLLSketch, ks_statistic, psi
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+def test_sketch_quantiles_within_error_and_bounded_memory(rng):
+    values = rng.lognormal(5, 1.5, 500_000)
+    sketch = KLLSketch(k=200, seed=1)
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+    assert sketch.n == len(values)
+    qs = np.linspace(0.05, 0.95, 19)
+    assert np.max(np.abs(sketch.cdf(np.quantile(values, qs)) - qs)) < 0.02
+    assert sketch.nbytes < 8 * 1024
+
+def test_merged_sketches_match_single_sketch(rng):
+    values = rng.normal(size=200_000)
+    parts = [KLLSketch(seed=i).update(chunk) for i, chunk in enumerate(np.array_split(values, 4))]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(pickle.loads(pickle.dumps(part)))
+    assert merged.n == len(values)
+    assert abs(float(merged.quantile(0.5)) - np.median(values)) < 0.05
+
+def test_approximate_ks_and_psi(rng):
+    ref, same, shifted = rng.normal(size=100_000), rng.normal(size=100_000), rng.normal(0.5, 1, 100_000)
+    sk = lambda v: KLLSketch(seed=3).update(v)
+    exact = ks_2samp(ref, shifted).statistic
+    assert abs(ks_statistic(sk(ref), sk(shifted)) - exact) < 0.03
+    assert ks_statistic(sk(ref), sk(same)) < 0.03
+    assert psi(sk(ref), sk(same)) < 0.05
+    assert psi(sk(ref), sk(shifted)) > 0.2
+
+def test_monitor_rolls_windows_into_reference(rng):
+    monitor = DriftMonitor(window_rows=10_000)
+    monitor.update(pd.DataFrame({"amount": rng.normal(100, 10, 10_000)}))
+    assert monitor.reference["amount"].n == 10_000 and monitor.current["amount"].n == 0
+    monitor.update(pd.DataFrame({"amount": rng.normal(100, 10, 5_000)}))
+    assert monitor.check()["amount"]["drift"] is False
+    monitor.update(pd.DataFrame({"amount": rng.normal(200, 10, 5_000)}))
+    assert monitor.last_window["amount"]["drift"] is True
+    assert monitor.reference["amount"].n == 20_000
+
+def test_monitor_snapshot_roundtrip(tmp_path, rng):
+    monitor = DriftMonitor(window_rows=1000)
+    monitor.update(pd.DataFrame({"amount": rng.normal(size=1000)}))
+    monitor.update(pd.DataFrame({"amount": rng.normal(size=500)}))
+    path = monitor.snapshot(str(tmp_path / "drift.pkl"))
+    restored = DriftMonitor(window_rows=1000)
+    assert restored.restore(path)
+    assert restored.reference["amount"].n == 1000 and restored.current["amount"].n == 500
+
+def test_detect_model_drift_uses_sketches_for_large_inputs(rng):
+    ref = pd.DataFrame({"amount": rng.normal(size=200_000)})
+    drifted, p_value = ml.detect_model_drift(ref, pd.DataFrame({"amount": rng.normal(1, 1, 200_000)}))
+    assert drifted and p_value < 0.05
+    sketch = KLLSketch().update(rng.normal(size=50_000))
+    drifted, _ = ml.detect_model_drift(sketch, KLLSketch().update(rng.normal(size=50_000)))
+    assert not drifted
+
+def test_running_moments_match_numpy_across_batches(rng):
+    from drift import RunningMoments
+    values = rng.normal(1e6, 3, 100_000)
+    moments = RunningMoments()
+    for chunk in np.array_split(values, 7):
+        moments.update(chunk)
+    other = RunningMoments().update(values[:10]).merge(RunningMoments().update(values[10:]))
+    assert moments.n == other.n == len(values)
+    assert moments.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert moments.var == pytest.approx(values.var(ddof=1), rel=1e-9)
+    assert other.std == pytest.approx(values.std(ddof=1), rel=1e-9)
+
+def test_page_hinkley_locates_change_point_across_batches(rng):
+    from drift import PageHinkley
+    values = np.concatenate([rng.normal(0, 1, 50_000), rng.normal(1, 1, 50_000)])
+    detector = PageHinkley()
+    alarms = [a for chunk in np.array_split(values, 13) for a in detector.update(chunk)]
+    assert len(alarms) >= 1
+    first = alarms[0]
+    assert first["direction"] == "up"
+    assert 50_000 <= first["position"] < 50_200
+    assert abs(first["change_point"] - 50_000) < 100
+    assert first["mean_after"] - first["mean_before"] > 0.5
+
+def test_tumbling_windows_match_direct_computation(rng):
+    from drift import TumblingWindows
+    z = rng.normal(0, 1, 25_500)
+    z[20_000:] += 1.0
+    windows = TumblingWindows(lengths=(1_000, 5_000))
+    drifts = [d for chunk in np.array_split(z, 9) for d in windows.update(chunk)]
+    assert windows.last[5_000]["mean_shift"] == pytest.approx(z[20_000:25_000].mean())
+    assert windows.last[1_000]["std_ratio"] == pytest.approx(z[24_000:25_000].std(ddof=1))
+    assert windows.partial[1_000][0] == 500
+    assert min(d["position"] for d in drifts if d["window"] == 1_000) == 20_999
+
+def test_drift_detector_reports_shift_and_stays_quiet_without_one(rng):
+    from ml_extended import DriftDetector
+    detector = DriftDetector()
+    detector.update_reference(pd.DataFrame({"amount": rng.lognormal(4, 1, 20_000)}))
+    assert detector.update(rng.lognormal(4, 1, 500_000)) == []
+    events = detector.update(rng.lognormal(4, 1, 100_000) * 2)
+    windows = [e for e in events if e["detector"] == "window"]
+    assert {e["window"] for e in windows} == {1_000, 10_000, 100_000}
+    assert all(e["mean_shift"] > 0.25 for e in windows)
+    report = detector.report()
+    assert report["stream"]["n"] == 600_000
+    assert report["windows"]["100000"]["drift"] is True
+    assert len(report["events"]) == len(events)
+
+def test_drift_detector_builds_reference_from_first_values():
+    from ml_extended import DriftDetector
+    detector = DriftDetector(min_reference=100)
+    for value in range(150):
+        assert detector.update(float(value % 10)) == []
+    assert detector.reference.n == 100 and detector.stream.n == 50
+    assert detector.detect(pd.DataFrame({"amount": [4.5] * 10})) is False
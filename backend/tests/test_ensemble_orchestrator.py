@@ -0,0 +1,75 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import ml_extended
+from ml_extended import EnsembleOrchestrator
+
+def labelled(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(4, 1, rows)
+    return pd.DataFrame({"amount": amount, "is_anomaly": (amount > np.quantile(amount, 0.95)).astype(int)})
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    orch = EnsembleOrchestrator()
+    orch.fit(labelled(500))
+    monkeypatch.setattr(ml_extended, "ensemble", orch)
+    return orch
+
+def test_fit_swaps_in_a_new_bundle(orchestrator):
+    before = orchestrator.bundle
+    result = ml_extended.auto_retrain(labelled(500, seed=1))
+    assert result["version"] == before.version + 1
+    assert orchestrator.bundle is not before
+    # The old bundle is never touched, so a reader still holding it sees a consistent generation
+    assert before.isolation is not orchestrator.isolation
+    assert len(orchestrator.predict(labelled(20))) == 20
+
+def test_unlabelled_fit_keeps_classifiers(orchestrator):
+    rf = orchestrator.rf
+    orchestrator.fit(labelled(300).drop(columns="is_anomaly"))
+    assert orchestrator.rf is rf and orchestrator.fitted
+
+def test_predict_latency_stays_flat_during_retrain(orchestrator):
+    batch = labelled(50, seed=2)
+    baseline = []
+    for _ in range(20):
+        start = time.perf_counter()
+        orchestrator.predict(batch)
+        baseline.append(time.perf_counter() - start)
+
+    big = labelled(100_000, seed=3)
+    retrain = threading.Thread(target=ml_extended.auto_retrain, args=(big,))
+    start_retrain = time.perf_counter()
+    retrain.start()
+    during = []
+    while retrain.is_alive():
+        start = time.perf_counter()
+        orchestrator.predict(batch)
+        during.append(time.perf_counter() - start)
+    retrain.join()
+    retrain_s = time.perf_counter() - start_retrain
+
+    assert orchestrator.bundle.version == 2
+    # Predictions kept flowing the whole time; none waited for the retrain to finish
+    assert len(during) >= 5
+    assert max(during) < retrain_s / 2
+    assert np.median(during) < max(10 * np.median(baseline), 0.05)
+
+def test_bundles_published_by_another_process_are_swapped_in(tmp_path):
+    from compact_forest import CompactIsolationForest
+    from model_registry import ModelRegistry
+    trainer = EnsembleOrchestrator(registry=ModelRegistry("ensemble", model_dir=str(tmp_path)))
+    worker = EnsembleOrchestrator(registry=ModelRegistry("ensemble", model_dir=str(tmp_path), reload_seconds=0.01))
+    df = labelled(500)
+    trainer.fit(df)
+    assert trainer.bundle.version == 1
+    time.sleep(0.02)
+    assert worker.bundle.version == 1 and worker.fitted
+    assert isinstance(worker.isolation, CompactIsolationForest)
+    assert (worker.predict(df) == trainer.predict(df)).all()
+    trainer.fit(labelled(500, seed=1))
+    time.sleep(0.02)
+    assert worker.bundle.version == 2
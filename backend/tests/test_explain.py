@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+import ml
+import ml_extended
+from explain import ExplainerCache, anomaly_rows, chunked
+from ml_extended import EnsembleOrchestrator
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    amounts = np.concatenate([rng.normal(100, 5, 500), [5000.0, 9000.0]])
+    return pd.DataFrame({"amount": amounts, "is_anomaly": (amounts > 1000).astype(int)})
+
+def test_explainer_cached_until_refit():
+    from sklearn.ensemble import RandomForestClassifier
+    cache, built = ExplainerCache(), []
+    rf = RandomForestClassifier(n_estimators=5, random_state=0).fit([[1], [2], [3]], [0, 1, 0])
+    build = lambda: built.append(1) or object()
+    first = cache.get(rf, build)
+    assert cache.get(rf, build) is first
+    rf.fit([[1], [2], [3]], [1, 0, 1])
+    assert cache.get(rf, build) is not first
+    assert len(built) == 2
+
+def test_anomaly_rows_and_chunking():
+    assert anomaly_rows([0.1, -0.2, 0.3, -0.5]).tolist() == [1, 3]
+    assert anomaly_rows([0.1, -0.2, 0.3, -0.5], top_k=3).tolist() == [0, 1, 3]
+    X = pd.DataFrame({"a": np.arange(10.0)})
+    calls = []
+    out = chunked(lambda part: calls.append(len(part)) or part.to_numpy() * 2, X, chunk_rows=4)
+    assert calls == [4, 4, 2]
+    assert out[:, 0].tolist() == list(np.arange(10.0) * 2)
+
+def test_shap_explain_only_explains_anomalies(monkeypatch, data):
+    ens = EnsembleOrchestrator()
+    ens.fit(data)
+    monkeypatch.setattr(ml_extended, "ensemble", ens)
+    rows, values = ml_extended.shap_explain(data)
+    assert 500 in rows and 501 in rows
+    assert len(rows) < len(data) and values.shape == (len(rows), 1)
+    rows, values = ml_extended.shap_explain(data, top_k=2)
+    assert rows.tolist() == [500, 501]
+    rows, values = ml_extended.shap_explain(data, all_rows=True)
+    assert values.shape == (len(data), 1)
+    # all three calls reused one explainer
+    assert sum(entry[0] is ens.rf for entry in ml_extended.explainer_cache.cache.values()) == 1
+
+def test_explain_anomaly_with_shap_uses_flagged_rows(data):
+    from sklearn.ensemble import IsolationForest
+    X = data.assign(hour=np.arange(len(data)) % 24)[["amount", "hour"]]
+    model = IsolationForest(random_state=0).fit(X)
+    result = ml.explain_anomaly_with_shap(model, X, top_k=2)
+    # the two extreme amounts are the most anomalous rows, so amount dominates their explanation
+    assert set(result) == {"amount", "hour"}
+    assert result["amount"] > result["hour"]
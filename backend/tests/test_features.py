@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ml
+from ml import detect_anomalies
+from features import FEATURE_COLUMNS, FeaturePipeline, _type_bucket
+from ml_extended import EnsembleOrchestrator
+
+def _frame():
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime([
+            "2024-01-01 10:00:00", "2024-01-01 09:00:00", "2024-01-01 10:00:30", "2024-01-01 11:00:00",
+        ]),
+        "amount": [200.0, 100.0, 50.0, 300.0],
+        "type": ["debit", "debit", "credit", "debit"],
+        "customer_id": ["a", "a", "b", "a"],
+    })
+
+def test_features_use_only_earlier_transactions():
+    feats = FeaturePipeline().transform(_frame())
+    assert list(feats.columns) == FEATURE_COLUMNS
+    # row 1 is customer a's first transaction (earliest timestamp): no history yet
+    assert feats.loc[1, "cust_amount_mean"] == 100.0
+    assert feats.loc[1, "seconds_since_prev"] == -1
+    assert feats.loc[0, "cust_amount_mean"] == 100.0
+    assert feats.loc[0, "seconds_since_prev"] == 3600
+    assert feats.loc[3, "cust_amount_mean"] == 150.0
+    assert feats.loc[3, "cust_amount_std"] == pytest.approx(50.0)
+    assert feats.loc[3, "amount_z"] == pytest.approx(3.0)
+    assert feats.loc[2, "hour_of_day"] == 10
+    assert feats.loc[2, f"type_h{_type_bucket('credit')}"] == 1.0
+    assert feats.filter(like="type_h").sum(axis=1).tolist() == [1.0] * 4
+
+def test_incremental_batches_match_single_pass():
+    df = _frame().sort_values("timestamp").reset_index(drop=True)
+    whole = FeaturePipeline().transform(df)
+    pipeline = FeaturePipeline()
+    parts = pd.concat([pipeline.transform(df.iloc[:2]), pipeline.transform(df.iloc[2:])])
+    pd.testing.assert_frame_equal(whole, parts)
+    assert pipeline.store.customers["a"][:3] == [3, 600.0, 140000.0]
+
+def test_transform_without_update_leaves_store_untouched():
+    pipeline = FeaturePipeline()
+    pipeline.transform(_frame(), update=False)
+    assert not pipeline.store.customers
+
+def test_amount_only_frames_are_supported():
+    feats = FeaturePipeline().transform(pd.DataFrame({"amount": [1.0, 2.0, 3.0]}))
+    assert feats["hour_of_day"].tolist() == [-1, -1, -1]
+    assert feats.filter(like="type_h").to_numpy().sum() == 0
+
+def test_ml_models_use_plugged_in_pipeline(monkeypatch, tmp_path):
+    from model_registry import ModelRegistry
+    monkeypatch.setattr(ml, "anomaly_model", ModelRegistry("isolation_forest", model_dir=str(tmp_path)))
+    monkeypatch.setattr(ml, "feature_pipeline", FeaturePipeline())
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=200, freq="h"),
+        "amount": rng.normal(100, 5, 200),
+        "type": "debit",
+        "customer_id": rng.choice(["a", "b"], 200),
+    })
+    result = ml.train_anomaly_model(train)
+    assert ml.anomaly_model.meta["features"] == FEATURE_COLUMNS
+    assert result["train_samples"] == 200
+    flags = detect_anomalies(train.tail(5))
+    assert len(flags) == 5
+
+def test_ensemble_with_pipeline():
+    ens = EnsembleOrchestrator(feature_pipeline=FeaturePipeline())
+    df = _frame().assign(is_anomaly=[0, 0, 1, 0])
+    ens.fit(df)
+    assert len(ens.predict(df)) == 4
@@ -0,0 +1,53 @@
+import json
+import pandas as pd
+import pytest
+from fraud_rules import FraudRuleEngine
+
+def _frame():
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime([
+            "2024-01-01 00:00:00", "2024-01-01 00:00:02", "2024-01-01 00:00:03",
+            "2024-01-01 00:00:04", "2024-01-01 00:10:00",
+        ]),
+        "amount": [100.0, 200.0, 15000.0, 300.0, 8000.0],
+        "type": ["debit", "debit", "wire", "credit", "wire"],
+        "customer_id": ["a", "b", "a", "b", "a"],
+    })
+
+def test_rapid_sequence_is_per_customer():
+    result = FraudRuleEngine().apply(_frame())
+    # rows 0 and 1 are 2s apart but belong to different customers
+    assert result["is_fraud"].tolist() == [False, False, True, True, False]
+    assert result.loc[3, "fraud_reason"] == "rapid_sequence"
+
+def test_all_matched_reasons_are_reported():
+    result = FraudRuleEngine().apply(_frame())
+    assert result.loc[2, "fraud_reason"] == "high_amount"
+    assert result.loc[2, "fraud_reasons"] == "high_amount,rapid_sequence"
+    assert result.loc[0, "fraud_reasons"] == ""
+
+def test_combo_and_velocity_count_rules():
+    engine = FraudRuleEngine([
+        {"name": "large_wire", "kind": "all", "conditions": [
+            {"column": "type", "op": "==", "value": "wire"}, {"column": "amount", "op": ">", "value": 5000}]},
+        {"name": "burst", "kind": "velocity", "key": "customer_id", "window_seconds": 900, "max_count": 2},
+        {"name": "risky_type", "kind": "threshold", "column": "type", "op": "in", "value": ["credit"]},
+    ])
+    result = engine.apply(_frame())
+    assert result["fraud_reasons"].tolist() == ["", "", "large_wire", "risky_type", "large_wire,burst"]
+
+def test_rules_with_missing_columns_are_skipped():
+    result = FraudRuleEngine().apply(pd.DataFrame({"amount": [5, 20000]}))
+    assert result["is_fraud"].tolist() == [False, True]
+
+def test_rules_load_from_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"name": "small", "column": "amount", "op": "<", "value": 150}]))
+    result = FraudRuleEngine.from_file(str(path)).apply(_frame())
+    assert result["fraud_reason"].tolist() == ["small", "", "", "", ""]
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        FraudRuleEngine([{"name": "x", "column": "amount", "op": "~", "value": 1}])
+    with pytest.raises(ValueError):
+        FraudRuleEngine([{"name": "x", "kind": "regex"}])
@@ -0,0 +1,226 @@
+import pandas as pd
+from utils.ingest import validate_transactions
+
+def make_df():
+    return pd.DataFrame({
+        "timestamp": ["2023-01-01", "not-a-date", " 2023-01-03 ", "2023/01/04 10:00", None],
+        "amount": ["100.0", "5", "invalid", "7.5", "1"],
+        "type": ["deposit", "deposit", "wire", "ach", "ach"],
+        "customer_id": [123, 124, 125, 126, 127],
+    })
+
+def test_validate_transactions_splits_valid_and_invalid_rows():
+    clean_df, errors = validate_transactions(make_df())
+    assert list(clean_df["amount"]) == [100.0, 7.5]
+    assert list(clean_df["customer_id"]) == ["123", "126"]
+    assert clean_df["timestamp"].iloc[1] == pd.Timestamp("2023-01-04 10:00")
+    assert errors == [
+        "Row 2: Unknown datetime string format, unable to parse: not-a-date",
+        "Row 3: could not convert string to float: 'invalid'",
+        "Row 5: missing timestamp",
+    ]
+
+def test_validate_transactions_row_offset():
+    _, errors = validate_transactions(make_df(), row_offset=10)
+    assert errors[0].startswith("Row 12:")
+
+def test_validate_transactions_typed_columns():
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(["2023-01-01", "2023-01-02"]),
+        "amount": [1.0, 2.0],
+        "type": ["a", "b"],
+        "customer_id": ["1", "2"],
+    })
+    clean_df, errors = validate_transactions(df)
+    assert errors == []
+    assert len(clean_df) == 2
+
+def test_validate_transactions_mixed_type_columns():
+    df = pd.DataFrame({
+        "timestamp": ["2023-01-01", " 2023-01-02 ", "2023-01-03"],
+        "amount": [1.5, " 2 ", 3],
+        "type": ["a", "b", "c"],
+        "customer_id": ["1", "2", "3"],
+    })
+    clean_df, errors = validate_transactions(df)
+    assert errors == []
+    assert list(clean_df["amount"]) == [1.5, 2.0, 3.0]
+
+def make_session():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from database import Base
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+def test_bulk_insert_transactions_executemany_batches():
+    from models import Transaction
+    from utils.ingest import bulk_insert_transactions
+    db = make_session()
+    clean_df, _ = validate_transactions(make_df())
+    clean_df["is_anomaly"] = [True, False]
+    inserted = bulk_insert_transactions(db, pd.concat([clean_df] * 3), batch_size=4)
+    db.commit()
+    assert inserted == 6
+    assert db.query(Transaction).count() == 6
+    assert db.query(Transaction).filter(Transaction.is_anomaly == True).count() == 3
+
+def test_bulk_insert_transactions_unknown_method():
+    import pytest
+    from utils.ingest import bulk_insert_transactions
+    clean_df, _ = validate_transactions(make_df())
+    clean_df["is_anomaly"] = False
+    with pytest.raises(ValueError):
+        bulk_insert_transactions(make_session(), clean_df, method="bogus")
+
+def make_typed_df():
+    return pd.DataFrame({
+        "Timestamp": pd.to_datetime(["2023-01-01 10:00", "2023-01-02 11:30", None]),
+        "amount": [100.0, 2500.5, 3.0],
+        "type": ["deposit", "wire", "ach"],
+        "customer_id": ["123", "124", "125"],
+    })
+
+def test_ingest_file_parquet():
+    import io
+    from models import Transaction
+    from utils.ingest import ingest_file
+    buf = io.BytesIO()
+    make_typed_df().to_parquet(buf)
+    buf.seek(0)
+    db = make_session()
+    result = ingest_file(db, buf, "upload.parquet")
+    assert result["inserted"] == 2
+    assert result["errors"] == ["Row 3: missing timestamp"]
+    assert db.query(Transaction).filter(Transaction.amount == 2500.5).one().type == "wire"
+
+def test_ingest_file_parquet_decimal_amounts():
+    import io
+    from decimal import Decimal
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from models import Transaction
+    from utils.ingest import ingest_file, read_columnar
+    df = make_typed_df()
+    table = pa.Table.from_pandas(df.assign(amount=[Decimal("100.00"), Decimal("2500.50"), Decimal("3.00")]), preserve_index=False)
+    assert pa.types.is_decimal(table.schema.field("amount").type)
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    buf.seek(0)
+    assert read_columnar(buf, "parquet")["amount"].dtype == float
+    for stream in (False, True):
+        buf.seek(0)
+        db = make_session()
+        result = ingest_file(db, buf, "upload.parquet", stream=stream)
+        assert result["inserted"] == 2
+        assert db.query(Transaction).filter(Transaction.type == "wire").one().amount == 2500.5
+
+def test_ingest_file_processing_error_is_an_ingest_error(monkeypatch):
+    import io
+    import pytest
+    import utils.ingest
+    from utils.ingest import ingest_file, IngestError
+
+    def broken(df):
+        raise RuntimeError("scoring failed")
+
+    monkeypatch.setattr(utils.ingest.ml, "detect_anomalies", broken)
+    buf = io.BytesIO()
+    make_typed_df().to_parquet(buf)
+    buf.seek(0)
+    with pytest.raises(IngestError, match="File processing error: scoring failed"):
+        ingest_file(make_session(), buf, "upload.parquet")
+
+def test_ingest_file_arrow_stream_chunks():
+    import io
+    import pyarrow as pa
+    from utils.ingest import ingest_file
+    table = pa.Table.from_pandas(make_typed_df(), preserve_index=False)
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=1):
+            writer.write_batch(batch)
+    buf.seek(0)
+    result = ingest_file(make_session(), buf, "upload.arrows", stream=True)
+    assert result["inserted"] == 2
+    assert result["chunks"] == 3
+    assert result["errors"] == ["Row 3: missing timestamp"]
+
+def test_ingest_file_arrow_ipc_file_format():
+    import io
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    from utils.ingest import ingest_file
+    table = pa.Table.from_pandas(make_typed_df(), preserve_index=False)
+    ipc_file = io.BytesIO()
+    with pa.ipc.new_file(ipc_file, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=1):
+            writer.write_batch(batch)
+    feather_file = io.BytesIO()
+    feather.write_feather(table, feather_file)
+    for payload in (ipc_file.getvalue(), feather_file.getvalue()):
+        for stream in (False, True):
+            result = ingest_file(make_session(), io.BytesIO(payload), "upload.arrow", stream=stream)
+            assert result["inserted"] == 2
+            assert result["errors"] == ["Row 3: missing timestamp"]
+
+def test_ingest_file_bad_parquet():
+    import io
+    import pytest
+    from utils.ingest import ingest_file, IngestError
+    with pytest.raises(IngestError, match="Could not parse Parquet file"):
+        ingest_file(make_session(), io.BytesIO(b"not parquet"), "upload.parquet")
+
+CSV_BYTES = b"timestamp,amount,type,customer_id\n2023-01-01,100.0,deposit,123\n2023-01-02,oops,deposit,123\n2023-01-03,7.0,wire,124\n"
+
+def test_ingest_file_gzip_csv_by_extension_and_magic():
+    import gzip
+    import io
+    from utils.ingest import ingest_file
+    payload = gzip.compress(CSV_BYTES)
+    for name in ("upload.csv.gz", "upload.bin"):
+        result = ingest_file(make_session(), io.BytesIO(payload), name, "application/octet-stream")
+        assert result["inserted"] == 2
+        assert result["errors"] == ["Row 2: could not convert string to float: 'oops'"]
+
+def test_ingest_file_zstd_csv_stream():
+    import io
+    import zstandard
+    from utils.ingest import ingest_file
+    payload = zstandard.ZstdCompressor().compress(CSV_BYTES)
+    result = ingest_file(make_session(), io.BytesIO(payload), "upload.csv.zst", stream=True, chunksize=1)
+    assert result["inserted"] == 2
+    assert result["chunks"] == 3
+
+def test_ingest_file_corrupt_gzip():
+    import gzip
+    import io
+    import pytest
+    from utils.ingest import ingest_file, IngestError
+    payload = gzip.compress(CSV_BYTES)[:30]
+    with pytest.raises(IngestError, match="Could not decompress gzip upload"):
+        ingest_file(make_session(), io.BytesIO(payload), "upload.csv.gz")
+
+def test_ingest_file_stream_failure_reports_committed_chunks():
+    import io
+    import pyarrow as pa
+    import pytest
+    from models import Transaction
+    from utils.ingest import ingest_file, IngestError
+    table = pa.Table.from_pandas(make_typed_df(), preserve_index=False)
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=1):
+            writer.write_batch(batch)
+    payload = buf.getvalue()[:-40]  # last record batch cut short
+    db = make_session()
+    with pytest.raises(IngestError, match="File processing error") as excinfo:
+        ingest_file(db, io.BytesIO(payload), "upload.arrows", stream=True)
+    # Stream uploads commit per chunk: the batches before the broken one stay inserted
+    assert excinfo.value.partial["inserted"] == 2
+    assert db.query(Transaction).count() == 2
+    with pytest.raises(IngestError) as excinfo:
+        ingest_file(make_session(), io.BytesIO(payload), "upload.arrows")
+    assert excinfo.value.partial is None
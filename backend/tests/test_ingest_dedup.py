@@ -0,0 +1,88 @@
+import io
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import Transaction
+from utils.ingest import bulk_insert_transactions
+from utils.ingest_dedup import UploadIndex, content_hash
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+def test_content_hash_streams_and_rewinds():
+    f = io.BytesIO(b"a" * 3_000_000)
+    digest = content_hash(f, chunk_size=1024)
+    assert f.tell() == 0
+    assert digest == content_hash(io.BytesIO(b"a" * 3_000_000))
+    assert digest != content_hash(io.BytesIO(b"b"))
+
+def test_upload_index_persists_and_caches():
+    db = make_session()
+    index = UploadIndex(maxsize=1)
+    assert index.lookup(db, "abc") is None
+    index.record(db, "abc", "a.csv", {"inserted": 2, "anomalies": 0, "errors": []}, job_id="job1")
+    index.record(db, "def", "b.csv", {"inserted": 1, "anomalies": 1, "errors": []})
+    assert list(index.cache) == ["def"]
+    # evicted from the LRU, served from the table
+    assert index.lookup(db, "abc") == {"inserted": 2, "anomalies": 0, "errors": [], "job_id": "job1"}
+    # recording the same hash twice is harmless
+    index.record(db, "abc", "a.csv", {"inserted": 2, "anomalies": 0, "errors": []})
+
+def test_bulk_insert_skips_duplicate_rows():
+    import pytest
+    from utils.ingest import IngestError, create_natural_key_index
+    db = make_session()
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(["2023-01-01", "2023-01-01", "2023-01-02"]),
+        "amount": [10.0, 10.0, 20.0],
+        "type": ["deposit"] * 3,
+        "customer_id": ["1"] * 3,
+        "is_anomaly": [False] * 3,
+    })
+    # The index is created by `manage.py create-dedup-index`, never on the request path
+    with pytest.raises(IngestError, match="create-dedup-index"):
+        bulk_insert_transactions(db, df, dedupe_rows=True)
+    create_natural_key_index(db)
+    assert bulk_insert_transactions(db, df, dedupe_rows=True) == 2
+    assert bulk_insert_transactions(db, df, dedupe_rows=True) == 0
+    db.commit()
+    assert db.query(Transaction).count() == 2
+
+def test_create_dedup_index_handles_existing_duplicates():
+    import pytest
+    from utils.ingest import create_natural_key_index
+    db = make_session()
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(["2023-01-01", "2023-01-01", "2023-01-01", "2023-01-02"]),
+        "amount": [10.0, 10.0, 10.0, 20.0],
+        "type": ["deposit"] * 4,
+        "customer_id": ["1"] * 4,
+        "is_anomaly": [False] * 4,
+    })
+    bulk_insert_transactions(db, df)
+    db.commit()
+    with pytest.raises(ValueError, match="2 duplicate transactions"):
+        create_natural_key_index(db)
+    assert create_natural_key_index(db, remove_duplicates=True) == 2
+    assert sorted(t.id for t in db.query(Transaction)) == [1, 4]
+    assert create_natural_key_index(db) == 0
+
+def test_reupload_of_stored_rows_is_idempotent(monkeypatch):
+    import utils.ingest
+    from utils.ingest import create_natural_key_index, ingest_file
+    monkeypatch.setattr(utils.ingest, "INGEST_ROW_DEDUP", True)
+    monkeypatch.setattr(utils.ingest.ml, "detect_anomalies", lambda df: [True] * len(df))
+    db = make_session()
+    create_natural_key_index(db)
+    first = ingest_file(db, io.BytesIO(b"timestamp,amount,type,customer_id\n2023-01-01,10,deposit,1\n2023-01-02,20,wire,1\n"), "a.csv")
+    assert (first["inserted"], first["anomalies"], first["duplicates"]) == (2, 2, 0)
+    # Same rows, different bytes: succeeds without inserting or re-reporting anything
+    again = b"customer_id,type,amount,timestamp\n1,deposit,10.0,2023-01-01\n1,wire,20.00,2023-01-02\n"
+    for stream in (False, True):
+        result = ingest_file(db, io.BytesIO(again), "b.csv", stream=stream)
+        assert (result["inserted"], result["anomalies"], result["duplicates"]) == (0, 0, 2)
+    assert db.query(Transaction).count() == 2
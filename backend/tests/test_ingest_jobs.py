@@ -0,0 +1,87 @@
+import io
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base
+from models import Transaction
+from utils.ingest_jobs import IngestJobManager, JobQueueFull
+
+CSV = b"timestamp,amount,type,customer_id\n2023-01-01,100.0,deposit,123\n2023-01-02,bad,deposit,123\n2023-01-03,5.0,wire,124"
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+def test_job_completes_with_counts(session_factory):
+    manager = IngestJobManager(max_workers=1, session_factory=session_factory)
+    job = manager.submit(io.BytesIO(CSV), "test.csv", "text/csv", stream=True, chunksize=2)
+    assert job["status"] == "queued"
+    done = manager.wait(job["job_id"], timeout=10)
+    assert done["status"] == "completed"
+    assert done["inserted"] == 2
+    assert done["rows_processed"] == 3
+    assert done["errors"] == ["Row 2: could not convert string to float: 'bad'"]
+    assert session_factory().query(Transaction).count() == 2
+
+def test_job_failure_reports_detail(session_factory):
+    manager = IngestJobManager(max_workers=1, session_factory=session_factory)
+    job = manager.submit(io.BytesIO(b"invalid"), "test.txt", "text/plain")
+    done = manager.wait(job["job_id"], timeout=10)
+    assert done["status"] == "failed"
+    assert "File must be CSV or PDF" in done["detail"]
+
+def test_job_queue_limit(session_factory):
+    manager = IngestJobManager(max_workers=1, max_queued=0, session_factory=session_factory)
+    with pytest.raises(JobQueueFull):
+        manager.submit(io.BytesIO(CSV), "test.csv", "text/csv")
+
+def test_job_history_is_bounded(session_factory):
+    manager = IngestJobManager(max_workers=1, history=2, session_factory=session_factory)
+    ids = []
+    for _ in range(3):
+        job = manager.submit(io.BytesIO(CSV), "test.csv", "text/csv")
+        manager.wait(job["job_id"], timeout=10)
+        ids.append(job["job_id"])
+    assert manager.get(ids[0]) is None
+    assert manager.get(ids[2])["status"] == "completed"
+
+class SlowFile(io.BytesIO):
+    def read(self, *args):
+        import time
+        time.sleep(0.01)
+        return super().read(*args)
+
+def test_queue_limit_and_history_under_concurrent_submits(session_factory, monkeypatch):
+    import threading
+    import utils.ingest_jobs as ingest_jobs_module
+    release = threading.Event()
+
+    def blocked_ingest(db, *args, **kwargs):
+        release.wait(10)
+        return {"inserted": 0, "anomalies": 0, "errors": []}
+
+    monkeypatch.setattr(ingest_jobs_module, "ingest_file", blocked_ingest)
+    manager = IngestJobManager(max_workers=1, max_queued=2, history=1, session_factory=session_factory)
+    accepted, rejected = [], []
+
+    def submit():
+        try:
+            accepted.append(manager.submit(SlowFile(CSV), "test.csv", "text/csv"))
+        except JobQueueFull:
+            rejected.append(True)
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(accepted) == 2 and len(rejected) == 6
+    # history=1, but unfinished jobs are never evicted
+    assert all(manager.get(job["job_id"]) is not None for job in accepted)
+    release.set()
+    for job in accepted:
+        assert manager.wait(job["job_id"], timeout=10)["status"] == "completed"
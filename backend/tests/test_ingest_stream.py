@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pytest
+import utils.ingest_stream as ingest_stream
+
+def ndjson_chunks(n, chunk_size=50):
+    body = "".join(json.dumps({"timestamp": "2023-01-01T00:00:00", "amount": i, "type": "ach", "customer_id": "7"}) + "\n" for i in range(n)).encode()
+
+    async def gen():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+    return gen()
+
+def test_ingest_ndjson_applies_backpressure(monkeypatch):
+    read = [0]
+    written = [0]
+    lead = []
+
+    async def one_line_per_chunk():
+        for i in range(60):
+            read[0] += 1
+            yield (json.dumps({"timestamp": "2023-01-01T00:00:00", "amount": i, "type": "ach", "customer_id": "7"}) + "\n").encode()
+
+    def slow_write(db, rows):
+        import time
+        time.sleep(0.01)
+        lead.append(read[0] - written[0])
+        written[0] += len(rows)
+        return {"inserted": len(rows), "anomalies": 0}
+
+    monkeypatch.setattr(ingest_stream, "write_batch", slow_write)
+    result = asyncio.run(ingest_stream.ingest_ndjson(None, one_line_per_chunk(), batch_size=5, queue_depth=1))
+    assert result["inserted"] == 60
+    assert result["batches"] == 12
+    # reader never gets more than batch being written + queued batch + batch being filled ahead
+    assert max(lead) <= 5 * 3 + 1
+
+def test_ingest_ndjson_surfaces_writer_failure(monkeypatch):
+    def failing_write(db, rows):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(ingest_stream, "write_batch", failing_write)
+    with pytest.raises(RuntimeError, match="db down"):
+        asyncio.run(ingest_stream.ingest_ndjson(None, ndjson_chunks(100), batch_size=5, queue_depth=1))
+
+def test_ingest_ndjson_reassembles_lines_split_across_chunks(monkeypatch):
+    rows = []
+
+    def collect(db, batch):
+        rows.extend(batch)
+        return {"inserted": len(batch), "anomalies": 0}
+
+    monkeypatch.setattr(ingest_stream, "write_batch", collect)
+    # 1-byte chunks, a long line spanning thousands of them, and a last line without a newline
+    long_type = "x" * 5000
+    body = ("\n" + json.dumps({"timestamp": "2023-01-01T00:00:00", "amount": 1, "type": long_type, "customer_id": "7"})
+            + "\n\n" + json.dumps({"timestamp": "2023-01-01T00:00:00", "amount": 2, "type": "ach", "customer_id": "8"})).encode()
+
+    async def gen():
+        for i in range(len(body)):
+            yield body[i:i + 1]
+
+    result = asyncio.run(ingest_stream.ingest_ndjson(None, gen(), batch_size=10))
+    assert result["received"] == 2 and result["errors"] == []
+    assert [(r[1], r[2], r[3]) for r in rows] == [(1.0, long_type, "7"), (2.0, "ach", "8")]
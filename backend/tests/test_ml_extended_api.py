@@ -52,7 +52,15 @@ def test_shap_explain(client):
     assert "shap_values" in response.json()
 
 def test_auto_retrain(client):
+    from utils.retrain_jobs import retrain_jobs
     files = {"file": ("test.csv", make_csv_bytes(), "text/csv")}
     response = client.post("/dashboard/ml_extended/auto_retrain", files=files)
-    assert response.status_code == 200
-    assert response.json().get("status") == "retrained"
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    retrain_jobs.wait(job_id, timeout=30)
+    job = client.get(f"/dashboard/ml_extended/auto_retrain/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["result"].get("status") == "retrained"
+    status = client.get("/dashboard/ml_extended/auto_retrain").json()
+    assert status["training_latency"]["count"] >= 1
+    assert client.get("/dashboard/ml_extended/auto_retrain/missing").status_code == 404
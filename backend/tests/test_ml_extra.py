@@ -122,3 +122,33 @@ def test_explain_anomaly_with_shap_nonempty():
 
 def test_real_time_scoring_pipeline_nonempty():
     ml.real_time_scoring_pipeline({"event": "foo", "payload": 123})
+
+class FixedModel:
+    classes_ = [0, 1]
+
+    def __init__(self, labels, proba=None):
+        self.labels, self.proba = labels, proba
+
+    def predict(self, X):
+        return self.labels
+
+    def predict_proba(self, X):
+        return self.proba
+
+def test_ensemble_model_predict_votes_per_sample():
+    models = [FixedModel([1, 0, -1]), FixedModel([1, -1, -1]), FixedModel([0, -1, 1])]
+    assert ml.ensemble_model_predict(models, [[1], [2], [3]]) == [1, -1, -1]
+
+def test_ensemble_model_predict_weighted_and_soft():
+    models = [FixedModel([1, 1], [[0.4, 0.6], [0.1, 0.9]]), FixedModel([0, 0], [[0.9, 0.1], [0.6, 0.4]])]
+    # tie goes to the smallest label unless weights break it
+    assert ml.ensemble_model_predict(models, [[1], [2]]) == [0, 0]
+    assert ml.ensemble_model_predict(models, [[1], [2]], weights=[2, 1]) == [1, 1]
+    assert ml.ensemble_model_predict(models, [[1], [2]], voting="soft") == [0, 1]
+
+def test_ensemble_model_predict_rejects_bad_arguments():
+    import pytest
+    with pytest.raises(ValueError):
+        ml.ensemble_model_predict([], [[1]])
+    with pytest.raises(ValueError):
+        ml.ensemble_model_predict([FixedModel([1])], [[1]], voting="median")
@@ -0,0 +1,116 @@
+import os
+import pandas as pd
+import pytest
+import ml
+# Bound at import time: conftest replaces ml.detect_anomalies with a mock for every test
+from ml import detect_anomalies
+from model_registry import ModelRegistry, ModelNotLoaded
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    reg = ModelRegistry("isolation_forest", model_dir=str(tmp_path))
+    monkeypatch.setattr(ml, "anomaly_model", reg)
+    return reg
+
+def test_publish_and_load_versions(tmp_path):
+    reg = ModelRegistry("demo", model_dir=str(tmp_path))
+    assert reg.load() is False
+    assert reg.publish({"weights": 1}, features=["amount"]) == 1
+    assert reg.publish({"weights": 2}, features=["amount"]) == 2
+    assert reg.versions() == [1, 2]
+    fresh = ModelRegistry("demo", model_dir=str(tmp_path))
+    assert fresh.load() is True
+    assert fresh.current() == {"weights": 2}
+    assert fresh.info()["version"] == 2
+    fresh.load(version=1)
+    assert fresh.current() == {"weights": 1}
+
+def test_current_without_model(tmp_path):
+    with pytest.raises(ModelNotLoaded):
+        ModelRegistry("demo", model_dir=str(tmp_path)).current()
+
+def test_detect_anomalies_uses_trained_model(registry):
+    import numpy as np
+    train = pd.DataFrame({"amount": np.random.default_rng(0).normal(100, 10, 500)})
+    result = ml.train_anomaly_model(train)
+    assert result["version"] == 1
+    scores, flags = ml.score(pd.DataFrame({"amount": [100, 50000]}))
+    assert list(flags) == [False, True]
+    assert scores[1] < scores[0]
+    # a single-row batch is judged against the trained model, not against itself
+    assert list(detect_anomalies(pd.DataFrame({"amount": [50000]}))) == [True]
+
+def test_automated_model_retraining_with_data(registry):
+    result = ml.automated_model_retraining("drift_detected", df=pd.DataFrame({"amount": [1.0, 2.0, 3.0, 4.0]}))
+    assert result["status"] == "retrained"
+    assert result["trigger_reason"] == "drift_detected"
+    assert registry.version == 1
+
+def test_load_memory_maps_arrays(tmp_path):
+    import numpy as np
+    reg = ModelRegistry("demo", model_dir=str(tmp_path))
+    reg.publish({"weights": np.arange(1000.0)}, artifacts={"table": np.ones(1000)})
+    fresh = ModelRegistry("demo", model_dir=str(tmp_path))
+    fresh.load()
+    assert isinstance(fresh.current()["weights"], np.memmap)
+    assert isinstance(fresh.artifacts["table"], np.memmap)
+    assert "artifacts" not in fresh.info()
+    unmapped = ModelRegistry("demo", model_dir=str(tmp_path), mmap=False)
+    unmapped.load()
+    assert not isinstance(unmapped.current()["weights"], np.memmap)
+
+def _publish_many(model_dir, writer, start, count):
+    start.wait()
+    registry = ModelRegistry("demo", model_dir=model_dir)
+    for i in range(count):
+        registry.publish({"writer": writer, "i": i})
+
+def test_concurrent_publishes_from_two_processes_get_distinct_versions(tmp_path):
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    procs = [ctx.Process(target=_publish_many, args=(str(tmp_path), writer, start, 100)) for writer in range(2)]
+    for p in procs:
+        p.start()
+    start.set()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+    reader = ModelRegistry("demo", model_dir=str(tmp_path), reload_seconds=0)
+    assert reader.versions() == list(range(1, 201))
+    published = []
+    for version in reader.versions():
+        reader.load(version)
+        published.append((reader.model["writer"], reader.model["i"]))
+        assert reader.meta["version"] == version
+    # Every publish kept its own file: none was overwritten by the other process
+    assert sorted(published) == [(writer, i) for writer in range(2) for i in range(100)]
+    assert not [f for f in os.listdir(reader.path) if f.endswith(".tmp")]
+
+def test_refresh_picks_up_versions_published_elsewhere(tmp_path):
+    import time
+    writer = ModelRegistry("demo", model_dir=str(tmp_path))
+    reader = ModelRegistry("demo", model_dir=str(tmp_path), reload_seconds=0.01)
+    assert reader.available() is False
+    writer.publish({"weights": 1})
+    time.sleep(0.02)
+    assert reader.current() == {"weights": 1}
+    writer.publish({"weights": 2})
+    # Checks are rate-limited: nothing changes until reload_seconds have passed
+    assert reader.refresh() is False and reader.version == 1
+    time.sleep(0.02)
+    assert reader.refresh() is True and reader.current() == {"weights": 2}
+    time.sleep(0.02)
+    assert reader.refresh() is False
+    disabled = ModelRegistry("demo", model_dir=str(tmp_path), reload_seconds=0)
+    assert disabled.available() is False
+
+def test_trained_model_ships_its_compact_export(registry):
+    import numpy as np
+    ml.train_anomaly_model(pd.DataFrame({"amount": np.random.default_rng(0).normal(100, 10, 300)}))
+    worker = ModelRegistry("isolation_forest", model_dir=registry.model_dir)
+    worker.load()
+    compact = worker.artifacts["compact"]
+    assert isinstance(compact.threshold, np.memmap)
+    X = np.array([[100.0], [50000.0]])
+    assert np.allclose(compact.decision_function(X), worker.current().decision_function(X))
@@ -0,0 +1,68 @@
+import math
+import pytest
+import ml
+import online_detector as od
+from online_detector import OnlineAnomalyDetector
+
+@pytest.fixture
+def detector(monkeypatch):
+    det = OnlineAnomalyDetector(alpha=0.1, threshold=4.0, warmup=5)
+    monkeypatch.setattr(od, "online_detector", det)
+    return det
+
+def test_flags_outlier_against_customer_baseline():
+    det = OnlineAnomalyDetector(warmup=5)
+    for amount in [100, 102, 98, 101, 99, 100, 103, 97]:
+        assert det.update("alice", amount)["is_anomaly"] is False
+    assert det.update("alice", 5000)["is_anomaly"] is True
+    # a large but habitual amount is normal for another customer
+    for amount in [20000, 20500, 19500, 20100, 19900, 20000]:
+        det.update("bob", amount)
+    assert det.score("bob", 20200) < det.threshold
+    assert det.score("alice", 20200) > det.threshold
+
+def test_outlier_barely_moves_baseline():
+    det = OnlineAnomalyDetector(warmup=5)
+    for amount in [100, 101, 99, 100, 100, 101, 99]:
+        det.update("c", amount)
+    mean_before = det.customers["c"][1]
+    det.update("c", 1_000_000)
+    assert abs(det.customers["c"][1] - mean_before) < 5
+
+def test_evicts_least_recent_customers():
+    det = OnlineAnomalyDetector(max_customers=2)
+    for cid in ["a", "b", "a", "c"]:
+        det.update(cid, 10)
+    assert list(det.customers) == ["a", "c"]
+
+def test_snapshot_and_restore(tmp_path):
+    det = OnlineAnomalyDetector(threshold=3.5)
+    for amount in [10, 11, 12, 13, 14, 15]:
+        det.update("x", amount)
+    path = det.snapshot(str(tmp_path / "online.pkl"))
+    restored = OnlineAnomalyDetector()
+    assert restored.restore(path) is True
+    assert restored.threshold == 3.5
+    assert restored.customers["x"] == det.customers["x"]
+    assert restored.score("x", 50) == det.score("x", 50)
+    assert OnlineAnomalyDetector().restore(str(tmp_path / "missing.pkl")) is False
+
+def test_real_time_scoring_pipeline_scores_events(detector):
+    for amount in [50, 52, 48, 51, 49, 50]:
+        ml.real_time_scoring_pipeline({"customer_id": "c1", "amount": amount})
+    result = ml.real_time_scoring_pipeline({"customer_id": "c1", "amount": 900})
+    assert result["is_anomaly"] is True
+    assert result["customer_id"] == "c1"
+    assert ml.real_time_scoring_pipeline({"customer_id": "c1", "amount": "n/a"}) is None
+
+def test_non_finite_amounts_are_rejected(detector):
+    for amount in [50, 52, 48, 51, 49, 50]:
+        ml.real_time_scoring_pipeline({"customer_id": "c1", "amount": amount})
+    for amount in ["nan", "inf", float("-inf")]:
+        assert ml.real_time_scoring_pipeline({"customer_id": "c2", "amount": amount}) is None
+        with pytest.raises(ValueError):
+            detector.update("c2", amount)
+    assert "c2" not in detector.customers
+    assert all(map(math.isfinite, detector.global_state))
+    # A new customer is still judged against an intact global baseline
+    assert ml.real_time_scoring_pipeline({"customer_id": "c3", "amount": 900})["is_anomaly"] is True
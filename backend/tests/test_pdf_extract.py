@@ -0,0 +1,56 @@
+from io import BytesIO
+from utils.pdf_extract import find_transaction_table, _page_ranges
+
+def make_pdf(table_page: int, pages: int = 6) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, PageBreak, Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
+    buf = BytesIO()
+    story = []
+    style = TableStyle([("GRID", (0, 0), (-1, -1), 0.5, (0, 0, 0))])
+    for page in range(pages):
+        if page == table_page:
+            rows = [["timestamp", "amount", "type", "customer_id"],
+                    ["2023-01-01", "100.0", "deposit", "123"],
+                    ["2023-01-02", "250.0", "wire", "124"]]
+        else:
+            rows = [["summary", "value"], [f"page {page}", "n/a"]]
+        story.append(Paragraph(f"Statement page {page + 1}", getSampleStyleSheet()["Normal"]))
+        story.append(Table(rows, style=style))
+        story.append(PageBreak())
+    SimpleDocTemplate(buf, pagesize=letter).build(story)
+    return buf.getvalue()
+
+def test_page_ranges_cover_all_pages():
+    assert _page_ranges(10, 4) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert _page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+def test_find_transaction_table_serial():
+    df = find_transaction_table(make_pdf(table_page=2), max_workers=1)
+    assert list(df.columns) == ["timestamp", "amount", "type", "customer_id"]
+    assert len(df) == 2
+
+def test_find_transaction_table_parallel():
+    df = find_transaction_table(make_pdf(table_page=4), max_workers=2, min_parallel_pages=2)
+    assert list(df["amount"]) == ["100.0", "250.0"]
+
+def test_find_transaction_table_missing():
+    assert find_transaction_table(make_pdf(table_page=-1, pages=3), max_workers=2, min_parallel_pages=2) is None
+
+def test_parallel_scan_reuses_the_pool_and_cleans_up(monkeypatch, tmp_path):
+    import tempfile
+    from utils import pdf_extract
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    pdf = make_pdf(table_page=0, pages=8)
+    try:
+        assert find_transaction_table(pdf, max_workers=2, min_parallel_pages=2) is not None
+        pool = pdf_extract._pool
+        assert find_transaction_table(pdf, max_workers=2, min_parallel_pages=2) is not None
+        assert pdf_extract._pool is pool
+    finally:
+        pdf_extract.shutdown()
+    import time
+    deadline = time.time() + 10
+    while list(tmp_path.iterdir()) and time.time() < deadline:
+        time.sleep(0.05)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,55 @@
+import threading
+import time
+import pandas as pd
+from utils.retrain_jobs import RetrainJobManager
+from utils.sla import sla_tracker, training_tracker
+
+def test_job_runs_in_background_and_reports_result():
+    manager = RetrainJobManager(train_fn=lambda df: {"status": "retrained", "rows": len(df)})
+    job = manager.submit(pd.DataFrame({"amount": [1.0, 2.0]}))
+    assert job["status"] == "queued" and job["coalesced"] is False
+    done = manager.wait(job["job_id"], timeout=10)
+    assert done["status"] == "completed"
+    assert done["result"] == {"status": "retrained", "rows": 2}
+    assert done["duration_ms"] is not None
+    assert manager.status()["running"] is None
+
+def test_requests_coalesce_into_the_queued_job():
+    release = threading.Event()
+    trained = []
+
+    def train(df):
+        release.wait(10)
+        trained.append(len(df))
+        return {"status": "retrained"}
+    manager = RetrainJobManager(train_fn=train)
+    first = manager.submit(pd.DataFrame({"amount": [1.0]}))
+    # Wait until the first job has started, so the next request queues behind it
+    while manager.status()["running"] != first["job_id"]:
+        time.sleep(0.001)
+    second = manager.submit(pd.DataFrame({"amount": [1.0] * 2}))
+    third = manager.submit(pd.DataFrame({"amount": [1.0] * 3}))
+    assert second["coalesced"] is False
+    assert third["coalesced"] is True and third["job_id"] == second["job_id"]
+    assert manager.status()["pending"] == second["job_id"]
+    release.set()
+    manager.wait(second["job_id"], timeout=10)
+    # Two fits, not three, and the queued one used the newest data
+    assert trained == [1, 3]
+    assert manager.get(second["job_id"])["requests"] == 2
+
+def test_failure_reports_detail():
+    def fail(df):
+        raise ValueError("bad data")
+    manager = RetrainJobManager(train_fn=fail)
+    done = manager.wait(manager.submit(pd.DataFrame({"amount": [1.0]}))["job_id"], timeout=10)
+    assert done["status"] == "failed"
+    assert "bad data" in done["detail"]
+
+def test_training_latency_is_kept_out_of_request_sla():
+    from ml_extended import auto_retrain
+    requests_before = sla_tracker.stats()["count"]
+    trainings_before = training_tracker.stats()["count"]
+    auto_retrain(pd.DataFrame({"amount": [100.0, 200.0, 300.0], "is_anomaly": [0, 1, 0]}))
+    assert sla_tracker.stats()["count"] == requests_before
+    assert training_tracker.stats()["count"] == min(trainings_before + 1, training_tracker.latencies.maxlen)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import ml
+from customer_models import CustomerModels
+from model_registry import ModelRegistry
+from sampling import StratifiedReservoir, sample_positions, sample_training_data
+
+def chunks(n_chunks=5, rows=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_chunks):
+        yield pd.DataFrame({
+            "amount": rng.normal(100, 10, rows),
+            "type": rng.choice(["card", "wire", "rare"], rows, p=[0.7, 0.2995, 0.0005]),
+            "customer_id": rng.integers(0, 50, rows).astype(str),
+        })
+
+def test_sample_is_bounded_and_keeps_rare_strata():
+    reservoir = StratifiedReservoir(budget=5000, min_per_stratum=20, seed=1)
+    for chunk in chunks():
+        reservoir.add(chunk)
+    sample = reservoir.sample()
+    counts = sample["type"].value_counts()
+    assert reservoir.rows == 100_000
+    assert 5000 <= len(sample) <= 5000 + 3 * 20
+    assert counts["rare"] >= 20
+    # The uniform part keeps the common strata close to their share of the data
+    assert abs(counts["card"] / len(sample) - 0.7) < 0.03
+    assert list(sample.columns) == ["amount", "type", "customer_id"]
+
+def test_sampling_is_reproducible_for_a_seed():
+    first = sample_training_data(chunks(), budget=1000, seed=7)
+    again = sample_training_data(chunks(), budget=1000, seed=7)
+    other = sample_training_data(chunks(), budget=1000, seed=8)
+    pd.testing.assert_frame_equal(first, again)
+    assert not first["amount"].equals(other["amount"])
+
+def test_small_frames_are_used_whole():
+    df = next(chunks(1, rows=500))
+    assert (sample_positions(df, budget=1000) == np.arange(500)).all()
+    positions = sample_positions(df, budget=100, seed=3)
+    assert len(positions) >= 100 and (np.diff(positions) > 0).all()
+
+def test_customer_reservoir_keeps_every_eligible_customer(tmp_path):
+    models = CustomerModels(registry=ModelRegistry("customer_models", model_dir=str(tmp_path)), min_samples=50)
+    reservoir = models.reservoir()
+    for chunk in chunks(2, rows=5000):
+        reservoir.add(chunk)
+    sample = reservoir.sample()
+    assert sample["customer_id"].nunique() == 50
+    assert sample["customer_id"].value_counts().min() >= 50
+
+def test_per_stratum_rows_are_capped_in_total():
+    # budget=0 with one stratum per customer: the pool must not grow with the rows streamed through
+    reservoir = StratifiedReservoir(budget=0, strata=["customer_id"], min_per_stratum=1000, max_rows=2000, seed=1)
+    rng = np.random.default_rng(0)
+    pooled = []
+    for _ in range(10):
+        reservoir.add(pd.DataFrame({"amount": rng.normal(size=20_000),
+                                    "customer_id": rng.integers(0, 200, 20_000).astype(str)}))
+        pooled.append(reservoir.stats()["pooled"])
+    assert reservoir.rows == 200_000
+    assert reservoir.quota() == 10
+    assert max(pooled) <= 2 * 2000 + 20_000
+    sample = reservoir.sample()
+    assert len(sample) == 2000
+    assert (sample["customer_id"].value_counts() == 10).all()
+
+def test_one_off_customers_do_not_dilute_the_customer_sample(tmp_path, monkeypatch):
+    import customer_models
+    monkeypatch.setattr(customer_models, "CUSTOMER_MODEL_SAMPLE_MAX_ROWS", 50_000)
+    models = CustomerModels(registry=ModelRegistry("customer_models", model_dir=str(tmp_path)),
+                            min_samples=50, max_workers=1)
+    rng = np.random.default_rng(0)
+    regular = np.repeat(np.arange(50), 2000)
+    # Split over every customer seen, 50k rows would leave each fewer than min_samples
+    one_off = 50 + np.repeat(np.arange(2000), 2)
+    ids = np.concatenate([regular, one_off])[rng.permutation(len(regular) + len(one_off))]
+    reservoir = models.reservoir()
+    for start in range(0, len(ids), 10_000):
+        part = ids[start:start + 10_000]
+        reservoir.add(pd.DataFrame({"amount": rng.normal(100, 10, len(part)), "customer_id": part.astype(str)}))
+    assert reservoir.quota() == 1000
+    assert models.fit(reservoir.sample())["customers"] == 50
+
+def test_train_anomaly_model_from_chunks(tmp_path, monkeypatch):
+    import sampling
+    monkeypatch.setattr(sampling, "TRAIN_SAMPLE_ROWS", 2000)
+    monkeypatch.setattr(ml, "anomaly_model", ModelRegistry("isolation_forest", model_dir=str(tmp_path)))
+    result = ml.train_anomaly_model(chunks(3, rows=10_000))
+    assert result["source_rows"] == 30_000
+    assert 2000 <= result["train_samples"] <= 2000 + 3 * sampling.TRAIN_SAMPLE_MIN_PER_STRATUM
+    assert ml.anomaly_model.meta["source_rows"] == 30_000
+    _, flags = ml.score(pd.DataFrame({"amount": [100.0, 5000.0]}))
+    assert list(flags) == [False, True]
@@ -0,0 +1,114 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+import ml
+from model_registry import ModelRegistry
+from utils.tracking import ExperimentTracker
+
+class FakeClient:
+    def __init__(self):
+        self.batches, self.artifacts, self.runs = [], [], 0
+
+    def get_experiment_by_name(self, name):
+        return None
+
+    def create_experiment(self, name):
+        return "1"
+
+    def create_run(self, experiment_id, run_name=None):
+        self.runs += 1
+        info = type("Info", (), {"run_id": f"run-{self.runs}"})
+        return type("Run", (), {"info": info})
+
+    def log_batch(self, run_id, metrics=(), params=()):
+        self.batches.append((run_id, list(metrics), list(params)))
+
+    def log_artifacts(self, run_id, path, artifact_path):
+        self.artifacts.append(artifact_path)
+
+    def set_tag(self, run_id, key, value):
+        pass
+
+    def set_terminated(self, run_id):
+        pass
+
+@pytest.fixture
+def tracker(monkeypatch):
+    t = ExperimentTracker(enabled=True, flush_seconds=60, client=FakeClient())
+    monkeypatch.setattr(ml, "tracker", t)
+    return t
+
+def test_metrics_are_batched_until_flush(tracker):
+    for i in range(5):
+        tracker.log_metrics({"batch_rows": i}, params={"contamination": 0.05})
+    assert tracker.client.batches == []
+    tracker.flush()
+    assert len(tracker.client.batches) == 1
+    _, metrics, params = tracker.client.batches[0]
+    assert [m.value for m in metrics] == [0, 1, 2, 3, 4]
+    assert [(p.key, p.value) for p in params] == [("contamination", "0.05")]
+    # params are only sent once per run
+    tracker.log_metrics({"batch_rows": 9}, params={"contamination": 0.05})
+    tracker.flush()
+    assert tracker.client.batches[1][2] == []
+    assert tracker.client.runs == 1
+
+def test_changed_param_starts_new_run(tracker):
+    tracker.log_metrics({"x": 1}, params={"contamination": 0.05})
+    tracker.flush()
+    tracker.log_metrics({"x": 1}, params={"contamination": 0.1})
+    tracker.flush()
+    assert tracker.client.runs == 2
+
+def test_model_logged_once_per_version(tracker, monkeypatch, tmp_path):
+    import mlflow.sklearn
+    monkeypatch.setattr(mlflow.sklearn, "save_model", lambda model, path: None)
+    monkeypatch.setattr(ml, "anomaly_model", ModelRegistry("isolation_forest", model_dir=str(tmp_path)))
+    rng = np.random.default_rng(0)
+    ml.train_anomaly_model(pd.DataFrame({"amount": rng.normal(100, 5, 200)}))
+    df = pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=3, freq="min"), "amount": [100.0, 101.0, 50000.0]})
+    for _ in range(3):
+        result = ml.detect_anomalies_with_fraud(df)
+    tracker.flush()
+    assert result["is_anomaly"].tolist() == [False, False, True]
+    assert tracker.client.artifacts == ["isolation_forest-v1"]
+
+def test_logged_version_is_the_one_that_scored(tracker, monkeypatch, tmp_path):
+    import mlflow.sklearn
+    saved = []
+    monkeypatch.setattr(mlflow.sklearn, "save_model", lambda model, path: saved.append(model))
+    registry = ModelRegistry("isolation_forest", model_dir=str(tmp_path), reload_seconds=0)
+    monkeypatch.setattr(ml, "anomaly_model", registry)
+    rng = np.random.default_rng(0)
+    ml.train_anomaly_model(pd.DataFrame({"amount": rng.normal(100, 5, 200)}))
+    v1 = registry.model
+    ModelRegistry("isolation_forest", model_dir=str(tmp_path)).publish(object())
+    score = ml.score
+
+    def reload_then_score(*args):
+        # Another process's version is loaded while the batch is being scored
+        registry.load()
+        return score(*args)
+
+    monkeypatch.setattr(ml, "score", reload_then_score)
+    ml.detect_anomalies_with_fraud(pd.DataFrame({"amount": [100.0, 101.0, 50000.0]}))
+    tracker.flush()
+    assert tracker.client.artifacts == ["isolation_forest-v1"]
+    assert saved == [v1]
+
+def test_disabled_tracker_queues_nothing():
+    t = ExperimentTracker(enabled=False, client=FakeClient())
+    assert t.log_metrics({"x": 1}) is False
+    assert t.log_model(object(), "m", 1) is False
+    t.flush()
+    assert t.thread is None
+
+def test_full_queue_drops_instead_of_blocking():
+    t = ExperimentTracker(enabled=True, max_queued=1, flush_seconds=60, client=FakeClient())
+    blocker = threading.Event()
+    t.client.log_batch = lambda *a, **kw: blocker.wait()
+    results = [t.log_metrics({"x": i}) for i in range(2000)]
+    assert not all(results)
+    assert t.dropped > 0
+    blocker.set()
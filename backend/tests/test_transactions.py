@@ -241,3 +241,72 @@ def test_pdf_processing_edge_cases(client):
         "Missing required columns" in response.json()["detail"]
     )
 
+
+def test_streaming_upload_aggregates_chunks(client):
+    rows = "\n".join(f"2023-01-{d:02d},{d * 10}.0,deposit,123" for d in range(1, 8))
+    csv_data = "timestamp,amount,type,customer_id\n" + rows + "\n2023-01-08,invalid,deposit,123"
+    files = {"file": ("test.csv", csv_data, "text/csv")}
+    response = client.post("/transactions/upload?stream=true&chunksize=3", files=files)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 7
+    assert data["chunks"] == 3
+    assert data["errors"] == ["Row 8: could not convert string to float: 'invalid'"]
+    assert len(client.get("/transactions/?limit=100").json()) == 7
+
+def test_streaming_upload_missing_columns(client):
+    files = {"file": ("test.csv", "timestamp,amount\n2023-01-01,1.0", "text/csv")}
+    response = client.post("/transactions/upload?stream=true", files=files)
+    assert response.status_code == 400
+    assert "Missing required columns" in response.json()["detail"]
+
+def test_streaming_upload_empty_file(client):
+    response = client.post("/transactions/upload?stream=true", files={"file": ("empty.csv", b"", "text/csv")})
+    assert response.status_code == 400
+    assert "Could not parse CSV" in response.json()["detail"]
+
+def test_background_upload_returns_job(client, monkeypatch):
+    from main import app
+    from routes import transactions
+    from utils.ingest_jobs import ingest_jobs
+    override_get_db = app.dependency_overrides[transactions.get_db]
+    monkeypatch.setattr(ingest_jobs, "session_factory", lambda: next(override_get_db()))
+    csv_data = "timestamp,amount,type,customer_id\n2023-01-01,100.0,deposit,123"
+    files = {"file": ("test.csv", csv_data, "text/csv")}
+    response = client.post("/transactions/upload?background=true", files=files)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    ingest_jobs.wait(job_id, timeout=10)
+    status = client.get(f"/transactions/jobs/{job_id}")
+    assert status.status_code == 200
+    assert status.json()["status"] == "completed"
+    assert status.json()["inserted"] == 1
+
+def test_unknown_job_returns_404(client):
+    response = client.get("/transactions/jobs/does-not-exist")
+    assert response.status_code == 404
+
+def test_duplicate_upload_returns_original_result(client):
+    csv_data = "timestamp,amount,type,customer_id\n2023-01-01,100.0,deposit,123"
+    first = client.post("/transactions/upload", files={"file": ("a.csv", csv_data, "text/csv")})
+    second = client.post("/transactions/upload", files={"file": ("retry.csv", csv_data, "text/csv")})
+    assert first.status_code == 200 and second.status_code == 200
+    assert second.json()["duplicate"] is True
+    assert second.json()["inserted"] == 1
+    assert len(client.get("/transactions/").json()) == 1
+
+def test_ndjson_stream_ingest(client):
+    import json
+    lines = [json.dumps({"timestamp": f"2023-01-0{d}T10:00:00", "amount": d * 10.5, "type": "deposit", "customer_id": "123"}) for d in range(1, 6)]
+    lines.insert(2, '{"timestamp": "2023-01-01", "amount": "lots", "type": "wire", "customer_id": "1"}')
+    lines.insert(4, "{not json")
+    body = "\n".join(lines) + "\n\n"
+    response = client.post("/transactions/stream?batch_size=2", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["received"] == 7
+    assert data["inserted"] == 5
+    assert data["batches"] == 3
+    assert data["errors"][0].startswith("Line 3: amount:")
+    assert data["errors"][1].startswith("Line 5: Invalid JSON")
+    assert len(client.get("/transactions/?limit=100").json()) == 5
@@ -0,0 +1,444 @@
+import gzip
+import mimetypes
+import os
+import warnings
+import weakref
+from io import StringIO
+import pandas as pd
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.orm import Session
+from models import Transaction
+from utils.pdf_extract import find_transaction_table
+import ml
+
+REQUIRED_COLUMNS = {'timestamp', 'amount', 'type', 'customer_id'}
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "100000"))
+
+class IngestError(ValueError):
+    """
+    Raised for uploads that cannot be ingested at all (as opposed to per-row errors).
+    partial holds the inserted/anomalies/errors/chunks counts of a stream upload that failed after
+    some chunks were already committed (stream uploads are not atomic).
+    """
+    def __init__(self, message: str, partial: dict = None):
+        super().__init__(message)
+        self.partial = partial
+
+def prepare_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    if not REQUIRED_COLUMNS.issubset(df.columns):
+        raise IngestError(f"Missing required columns: {REQUIRED_COLUMNS - set(df.columns)}.")
+    return df
+
+def _strip(col: pd.Series) -> pd.Series:
+    # Strip str values only: numbers in mixed object columns (e.g. JSON) must not turn into NaN
+    if col.dtype != object:
+        return col
+    try:
+        stripped = col.str.strip()
+    except AttributeError:  # no str values at all
+        return col
+    return stripped.where(stripped.notna(), col)
+
+def _parse_timestamps(col: pd.Series) -> pd.Series:
+    # Fast path: a single inferred format for the whole column. Rows that do not fit it
+    # are retried with per-element parsing so mixed formats still behave like the old
+    # row-by-row pd.to_datetime call.
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        ts = pd.to_datetime(col, errors="coerce")
+    retry = ts.isna() & col.notna()
+    if retry.any():
+        ts.loc[retry] = pd.to_datetime(col[retry], errors="coerce", format="mixed")
+    return ts
+
+def validate_transactions(df: pd.DataFrame, row_offset: int = 0):
+    """
+    Column-wise validation and type coercion of uploaded transactions.
+    Returns (clean_df, errors) where errors are "Row N: ..." messages (1-based, shifted by row_offset).
+    """
+    raw_ts = _strip(df['timestamp'])
+    raw_amt = _strip(df['amount'])
+    ts = _parse_timestamps(raw_ts)
+    amt = pd.to_numeric(raw_amt, errors="coerce")
+
+    bad_ts = ts.isna().to_numpy()
+    bad_amt = amt.isna().to_numpy() & ~bad_ts
+    bad = bad_ts | bad_amt
+
+    errors = []
+    if bad.any():
+        positions = bad.nonzero()[0]
+        ts_values = raw_ts.to_numpy()
+        amt_values = raw_amt.to_numpy()
+        for pos in positions:
+            row = row_offset + pos + 1
+            if bad_ts[pos]:
+                value = ts_values[pos]
+                if pd.isna(value):
+                    errors.append(f"Row {row}: missing timestamp")
+                else:
+                    errors.append(f"Row {row}: Unknown datetime string format, unable to parse: {value}")
+            else:
+                value = amt_values[pos]
+                if pd.isna(value):
+                    errors.append(f"Row {row}: missing amount")
+                else:
+                    errors.append(f"Row {row}: could not convert string to float: {value!r}")
+
+    keep = ~bad
+    clean_df = pd.DataFrame({
+        'timestamp': ts[keep].to_numpy(),
+        'amount': amt[keep].astype(float).to_numpy(),
+        'type': df['type'][keep].astype(str).to_numpy(),
+        'customer_id': df['customer_id'][keep].astype(str).to_numpy(),
+    })
+    return clean_df, errors
+
+INSERT_COLUMNS = ['timestamp', 'amount', 'type', 'customer_id', 'is_anomaly']
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+# "auto" uses COPY on PostgreSQL (psycopg2) and executemany everywhere else
+INGEST_INSERT_METHOD = os.getenv("INGEST_INSERT_METHOD", "auto")
+# Skip rows whose natural key is already stored (unique index + ON CONFLICT DO NOTHING)
+INGEST_ROW_DEDUP = os.getenv("INGEST_ROW_DEDUP", "false").lower() in ("1", "true", "yes")
+NATURAL_KEY = ['timestamp', 'customer_id', 'amount', 'type']
+NATURAL_KEY_INDEX = "uq_transactions_natural_key"
+_natural_key_engines = weakref.WeakSet()
+
+def _insert_method(db: Session, method: str) -> str:
+    if method == "auto":
+        dialect = db.get_bind().dialect
+        return "copy" if dialect.name == "postgresql" and dialect.driver == "psycopg2" else "executemany"
+    if method not in ("copy", "executemany"):
+        raise ValueError(f"Unknown insert method: {method}")
+    return method
+
+def _executemany(db: Session, batch: pd.DataFrame):
+    db.execute(insert(Transaction.__table__), batch.to_dict("records"))
+    return len(batch), int(batch['is_anomaly'].sum())
+
+def _has_natural_key_index(db: Session) -> bool:
+    indexes = inspect(db.connection()).get_indexes(Transaction.__tablename__)
+    return any(ix["name"] == NATURAL_KEY_INDEX and ix["unique"] for ix in indexes)
+
+def ensure_natural_key_index(db: Session):
+    """
+    Check that the unique (timestamp, customer_id, amount, type) index row dedup relies on exists.
+    It is not part of the schema migrations because it changes insert semantics (duplicates are
+    rejected); deployments that enable INGEST_ROW_DEDUP create it once with
+    `python manage.py create-dedup-index`. Checked once per engine.
+    """
+    engine = db.get_bind()
+    if engine in _natural_key_engines:
+        return
+    if not _has_natural_key_index(db):
+        raise IngestError(f"Row dedup needs the unique index {NATURAL_KEY_INDEX} on (timestamp, customer_id, amount, type); create it with `python manage.py create-dedup-index`.")
+    _natural_key_engines.add(engine)
+
+def create_natural_key_index(db: Session, remove_duplicates: bool = False) -> int:
+    """
+    Create the row dedup index and commit. Existing duplicate transactions would make that fail:
+    with remove_duplicates they are deleted first (the lowest id of each natural key is kept),
+    otherwise ValueError reports how many there are. Returns the number of deleted rows.
+    """
+    table = Transaction.__tablename__
+    key = ', '.join(NATURAL_KEY)
+    if _has_natural_key_index(db):
+        return 0
+    duplicates = db.execute(text(
+        f"SELECT (SELECT COUNT(*) FROM {table}) - (SELECT COUNT(*) FROM (SELECT 1 FROM {table} GROUP BY {key}) keys)"
+    )).scalar()
+    if duplicates and not remove_duplicates:
+        raise ValueError(f"{duplicates} duplicate transactions prevent creating {NATURAL_KEY_INDEX}; rerun with --remove-duplicates to delete them.")
+    removed = 0
+    if duplicates:
+        removed = db.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key})"
+        )).rowcount
+    db.execute(text(f"CREATE UNIQUE INDEX {NATURAL_KEY_INDEX} ON {table} ({key})"))
+    db.commit()
+    return removed
+
+def _insert_skip_duplicates(db: Session, batch: pd.DataFrame):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise ValueError(f"Row dedup is not supported on {dialect}")
+    table = Transaction.__table__
+    # Only rows actually inserted come back, so their anomalies are not counted twice on re-ingest
+    stmt = dialect_insert(table).on_conflict_do_nothing(index_elements=NATURAL_KEY).returning(table.c.is_anomaly)
+    flags = db.execute(stmt, batch.to_dict("records")).scalars().all()
+    return len(flags), int(sum(flags))
+
+def _copy(db: Session, batch: pd.DataFrame):
+    buf = StringIO()
+    batch.to_csv(buf, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Transaction.__tablename__} ({', '.join(INSERT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buf
+        )
+    finally:
+        cursor.close()
+    return len(batch), int(batch['is_anomaly'].sum())
+
+def bulk_insert_transactions(db: Session, df: pd.DataFrame, batch_size: int = None, method: str = None, dedupe_rows: bool = None) -> int:
+    """
+    Write scored transactions in batches without building Transaction instances.
+    Uses Core insert() executemany, or COPY FROM STDIN on PostgreSQL. With dedupe_rows, rows whose
+    natural key already exists are skipped (ON CONFLICT DO NOTHING; COPY is not used). The caller commits.
+    Returns the number of inserted rows.
+    """
+    return bulk_insert_scored(db, df, batch_size, method, dedupe_rows)[0]
+
+def bulk_insert_scored(db: Session, df: pd.DataFrame, batch_size: int = None, method: str = None, dedupe_rows: bool = None):
+    """bulk_insert_transactions returning (inserted rows, anomalies among the inserted rows)."""
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    dedupe_rows = INGEST_ROW_DEDUP if dedupe_rows is None else dedupe_rows
+    if dedupe_rows:
+        ensure_natural_key_index(db)
+        write = _insert_skip_duplicates
+    else:
+        write = _copy if _insert_method(db, method or INGEST_INSERT_METHOD) == "copy" else _executemany
+    rows = df[INSERT_COLUMNS].astype({'is_anomaly': bool})
+    inserted = anomalies = 0
+    for start in range(0, len(rows), batch_size):
+        batch_inserted, batch_anomalies = write(db, rows.iloc[start:start + batch_size])
+        inserted += batch_inserted
+        anomalies += batch_anomalies
+    return inserted, anomalies
+
+def process_frame(db: Session, df: pd.DataFrame, row_offset: int = 0) -> dict:
+    """
+    Validate, score and insert one DataFrame of raw upload rows. The caller commits.
+    """
+    df = prepare_columns(df)
+    clean_df, errors = validate_transactions(df, row_offset=row_offset)
+    if clean_df.empty:
+        return {"inserted": 0, "anomalies": 0, "errors": errors}
+    clean_df['is_anomaly'] = ml.detect_anomalies(clean_df)
+    # Anomalies are counted over inserted rows: duplicates skipped by row dedup were reported before
+    inserted, anomalies = bulk_insert_scored(db, clean_df)
+    result = {"inserted": inserted, "anomalies": anomalies, "errors": errors}
+    if INGEST_ROW_DEDUP:
+        result["duplicates"] = len(clean_df) - inserted
+    return result
+
+def ingest_chunks(db: Session, chunks, progress=None) -> dict:
+    """
+    Validate/score/insert an iterable of DataFrame chunks, committing after each one so peak
+    memory is bounded by the chunk size rather than the file size.
+    Returns inserted/anomalies/errors aggregated across chunks.
+    """
+    result = {"inserted": 0, "anomalies": 0, "errors": [], "chunks": 0}
+    row_offset = 0
+    for chunk in chunks:
+        chunk_result = process_frame(db, chunk, row_offset=row_offset)
+        db.commit()
+        result["inserted"] += chunk_result["inserted"]
+        result["anomalies"] += chunk_result["anomalies"]
+        result["errors"].extend(chunk_result["errors"])
+        if "duplicates" in chunk_result:
+            result["duplicates"] = result.get("duplicates", 0) + chunk_result["duplicates"]
+        result["chunks"] += 1
+        row_offset += len(chunk)
+        if progress:
+            progress(row_offset, result)
+    return result
+
+def _ingested(result: dict) -> bool:
+    """Whether any valid row was found: inserted, or skipped as already stored by row dedup."""
+    return bool(result["inserted"] or result.get("duplicates"))
+
+def ingest_csv_stream(db: Session, fileobj, chunksize: int = None, progress=None) -> dict:
+    """
+    Parse a CSV file object with pd.read_csv(chunksize=...) and ingest it chunk by chunk.
+    """
+    with pd.read_csv(fileobj, chunksize=chunksize or INGEST_CHUNK_SIZE, encoding="utf-8") as reader:
+        return ingest_chunks(db, reader, progress=progress)
+
+def columnar_format(filename: str, content_type: str = None):
+    """Return "parquet", "arrow" (IPC file or stream) or None for an upload."""
+    if filename.endswith('.parquet') or (content_type and 'parquet' in content_type):
+        return "parquet"
+    if filename.endswith(('.arrow', '.arrows', '.ipc')) or (content_type and 'arrow' in content_type):
+        return "arrow"
+    return None
+
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+COMPRESSION_MAGIC = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+
+def detect_compression(fileobj, filename: str):
+    """Return "gzip", "zstd" or None from the file extension, falling back to magic bytes."""
+    for suffix, codec in COMPRESSION_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return codec
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    for magic, codec in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+def open_decompressed(fileobj, codec: str):
+    """
+    Wrap a compressed file object in a streaming decompressor; data is inflated as the parser
+    reads it and never held in full in memory or on disk.
+    """
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    try:
+        import zstandard
+    except ImportError:
+        raise IngestError("Zstandard uploads need the zstandard package.")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+
+def _decompression_errors():
+    errors = (OSError, EOFError)
+    try:
+        import zstandard
+        errors += (zstandard.ZstdError,)
+    except ImportError:
+        pass
+    return errors
+
+def iter_columnar_chunks(fileobj, kind: str, chunksize: int = None):
+    """
+    Yield typed DataFrames from a Parquet file or Arrow IPC file/stream, one record batch at a time.
+    """
+    import pyarrow.parquet as pq
+    if kind == "parquet":
+        batches = pq.ParquetFile(fileobj).iter_batches(batch_size=chunksize or INGEST_CHUNK_SIZE)
+    else:
+        reader = _open_arrow(fileobj)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches)) if hasattr(reader, "get_batch") else reader
+    for batch in batches:
+        yield _columnar_frame(batch)
+
+def _open_arrow(fileobj):
+    """
+    Reader for an Arrow IPC file (ARROW1 magic; what .arrow / Feather v2 files usually are) or an
+    Arrow IPC stream (.arrows / .ipc).
+    """
+    import pyarrow as pa
+    head = fileobj.read(6)
+    fileobj.seek(0)
+    if head == b"ARROW1":
+        return pa.ipc.open_file(fileobj)
+    return pa.ipc.open_stream(fileobj)
+
+def _columnar_frame(data) -> pd.DataFrame:
+    """Arrow table or record batch as a DataFrame, with decimal columns as float (not Decimal objects)."""
+    import pyarrow as pa
+    for i, field in enumerate(data.schema):
+        if pa.types.is_decimal(field.type):
+            data = data.set_column(i, field.name, data.column(i).cast(pa.float64()))
+    return data.to_pandas()
+
+def read_columnar(fileobj, kind: str) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+    if kind == "parquet":
+        return _columnar_frame(pq.read_table(fileobj))
+    return _columnar_frame(_open_arrow(fileobj).read_all())
+
+def read_pdf_table(fileobj) -> pd.DataFrame:
+    try:
+        df = find_transaction_table(fileobj.read())
+    except Exception:
+        raise IngestError("Could not parse PDF. Ensure it contains extractable tables.")
+    if df is None:
+        raise IngestError("No valid transaction table found in PDF.")
+    return df
+
+def ingest_file(db: Session, fileobj, filename: str, content_type: str = None, stream: bool = False, chunksize: int = None, progress=None) -> dict:
+    """
+    Parse an uploaded CSV, PDF, Parquet or Arrow IPC file/stream file object, then validate, score,
+    insert and commit it.
+    Blocking; call from a worker thread. Raises IngestError for files that cannot be ingested.
+    progress(rows_processed, partial_result) is called after each committed chunk.
+    With stream=True every chunk is committed on its own: if a later chunk fails, the rows of the
+    earlier ones stay inserted and the IngestError's partial reports them.
+    """
+    committed = {}
+
+    def track(rows, result):
+        committed.update(result, errors=list(result["errors"]), rows_processed=rows)
+        if progress:
+            progress(rows, result)
+    filename = (filename or "").lower()
+    codec = detect_compression(fileobj, filename)
+    if codec:
+        # .csv.gz / .csv.zst: classify by the inner name; bare compressed streams are taken as CSV
+        fileobj = open_decompressed(fileobj, codec)
+        for suffix in COMPRESSION_SUFFIXES:
+            filename = filename[:-len(suffix)] if filename.endswith(suffix) else filename
+        content_type = None
+    content_type = content_type or mimetypes.guess_type(filename)[0]
+    is_pdf = filename.endswith('.pdf') or bool(content_type and 'pdf' in content_type)
+    columnar = columnar_format(filename, content_type)
+    is_csv = filename.endswith('.csv') or bool(content_type and 'csv' in content_type) or bool(codec and not (is_pdf or columnar))
+    decompression_errors = _decompression_errors() if codec else ()
+
+    try:
+        if is_csv and stream:
+            try:
+                result = ingest_csv_stream(db, fileobj, chunksize=chunksize, progress=track)
+            except UnicodeDecodeError:
+                raise IngestError("Could not decode CSV file. Ensure it's UTF-8 encoded.")
+            except (pd.errors.ParserError, pd.errors.EmptyDataError):
+                raise IngestError("Could not parse CSV. Ensure it is a valid CSV file.")
+            except decompression_errors as e:
+                raise IngestError(f"Could not decompress {codec} upload: {str(e)}")
+            if not _ingested(result):
+                raise IngestError("No valid rows found in file.")
+            return result
+        elif is_csv:
+            # Parse straight from the (possibly decompressing) file object; no decoded copy of the body
+            try:
+                df = pd.read_csv(fileobj, encoding="utf-8")
+            except UnicodeDecodeError:
+                raise IngestError("Could not decode CSV file. Ensure it's UTF-8 encoded.")
+            except decompression_errors as e:
+                raise IngestError(f"Could not decompress {codec} upload: {str(e)}")
+            except Exception:
+                raise IngestError("Could not parse CSV. Ensure it is a valid CSV file.")
+        elif is_pdf:
+            df = read_pdf_table(fileobj)
+        elif columnar:
+            # Typed columns: timestamps and amounts arrive already parsed
+            import pyarrow as pa
+            label = "Parquet" if columnar == "parquet" else "Arrow IPC"
+            try:
+                if stream:
+                    result = ingest_chunks(db, iter_columnar_chunks(fileobj, columnar, chunksize), progress=track)
+                    if not _ingested(result):
+                        raise IngestError("No valid rows found in file.")
+                    return result
+                df = read_columnar(fileobj, columnar)
+            except pa.ArrowException:
+                raise IngestError(f"Could not parse {label} file.")
+        else:
+            raise IngestError("File must be CSV or PDF (or Parquet / Arrow IPC).")
+
+        result = process_frame(db, df)
+        if not _ingested(result):
+            raise IngestError("No valid rows found in file.")
+        db.commit()
+    except Exception as e:
+        error = e if isinstance(e, IngestError) else IngestError(f"File processing error: {str(e)}")
+        if committed.get("inserted"):
+            db.rollback()
+            error = IngestError(str(error), partial=committed)
+        if error is e:
+            raise
+        raise error from e
+    if progress:
+        progress(len(df), result)
+    return result
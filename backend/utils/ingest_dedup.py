@@ -0,0 +1,64 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import IngestedFile
+
+INGEST_HASH_CACHE_SIZE = int(os.getenv("INGEST_HASH_CACHE_SIZE", "1024"))
+HASH_CHUNK_SIZE = 1 << 20
+
+def content_hash(fileobj, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    SHA-256 of a seekable upload, read in chunks. Leaves the file positioned at the start.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+# Index of successfully ingested file hashes: persisted in ingested_files, fronted by an in-memory LRU
+class UploadIndex:
+    def __init__(self, maxsize=INGEST_HASH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _remember(self, digest: str, result: dict):
+        with self.lock:
+            self.cache[digest] = result
+            self.cache.move_to_end(digest)
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+
+    def lookup(self, db: Session, digest: str):
+        """Return the original ingest result for a file hash, or None if it has not been ingested."""
+        with self.lock:
+            if digest in self.cache:
+                self.cache.move_to_end(digest)
+                return dict(self.cache[digest])
+        row = db.query(IngestedFile).filter(IngestedFile.content_hash == digest).first()
+        if row is None:
+            return None
+        result = dict(row.result, job_id=row.job_id)
+        self._remember(digest, result)
+        return dict(result)
+
+    def record(self, db: Session, digest: str, filename: str, result: dict, job_id: str = None):
+        stored = {k: result[k] for k in ("inserted", "anomalies", "errors", "chunks", "duplicates") if k in result}
+        db.add(IngestedFile(content_hash=digest, filename=filename, job_id=job_id, result=stored))
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same file recorded it first
+            db.rollback()
+        self._remember(digest, dict(stored, job_id=job_id))
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+upload_index = UploadIndex()
@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from opentelemetry import trace
+import database
+from utils.ingest import IngestError, ingest_file
+from utils.ingest_dedup import upload_index
+
+tracer = trace.get_tracer(__name__)
+
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "20"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "1000"))
+
+class JobQueueFull(RuntimeError):
+    pass
+
+# Thread-safe in-memory registry of upload ingest jobs processed by a bounded worker pool
+class IngestJobManager:
+    def __init__(self, max_workers=INGEST_MAX_WORKERS, max_queued=INGEST_MAX_QUEUED, history=INGEST_JOB_HISTORY, session_factory=None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.history = history
+        self.session_factory = session_factory
+        self.jobs = OrderedDict()
+        self.futures = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self):
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+            return self._executor
+
+    def _pending(self):
+        return sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(self, fileobj, filename: str, content_type: str = None, stream: bool = False, chunksize: int = None, content_hash: str = None) -> dict:
+        """
+        Copy the upload to a private temp file (the request's file is closed once the response is sent)
+        and queue it for processing. Returns the new job's status, or the status of the queued/running
+        job for the same content_hash (flagged duplicate).
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "filename": filename,
+            "rows_processed": 0,
+            "inserted": 0,
+            "anomalies": 0,
+            "errors": [],
+            "detail": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        # Check and reserve the queue slot atomically, so concurrent uploads cannot overshoot max_queued
+        with self.lock:
+            if content_hash in self.inflight:
+                return dict(self.jobs[self.inflight[content_hash]], duplicate=True)
+            if self._pending() >= self.max_queued:
+                raise JobQueueFull(f"Too many pending ingest jobs (limit {self.max_queued}).")
+            self.jobs[job_id] = job
+            if content_hash:
+                self.inflight[content_hash] = job_id
+            self._evict()
+        try:
+            spool = tempfile.TemporaryFile()
+            shutil.copyfileobj(fileobj, spool)
+            spool.seek(0)
+        except Exception as e:
+            self._update(job_id, status="failed", detail=f"Ingest job error: {str(e)}", finished_at=time.time())
+            with self.lock:
+                self.inflight.pop(content_hash, None)
+            raise
+        with self.lock:
+            snapshot = dict(job)
+        future = self.executor.submit(self._run, job_id, spool, filename, content_type, stream, chunksize, content_hash)
+        with self.lock:
+            self.futures[job_id] = future
+        return snapshot
+
+    def _evict(self):
+        # Oldest finished jobs go first; queued and running jobs stay pollable however many there are
+        excess = len(self.jobs) - self.history
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("completed", "failed")][:excess]
+        for job_id in finished:
+            self.jobs.pop(job_id)
+            self.futures.pop(job_id, None)
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+
+    def _run(self, job_id, spool, filename, content_type, stream, chunksize, content_hash=None):
+        with tracer.start_as_current_span("ingest_job"):
+            self._update(job_id, status="running", started_at=time.time())
+            session_factory = self.session_factory or database.SessionLocal
+            db = session_factory()
+
+            def progress(rows, result):
+                self._update(job_id, rows_processed=rows, inserted=result["inserted"],
+                             anomalies=result["anomalies"], errors=list(result["errors"]))
+
+            try:
+                result = ingest_file(db, spool, filename, content_type, stream=stream, chunksize=chunksize, progress=progress)
+                if content_hash:
+                    upload_index.record(db, content_hash, filename, result, job_id=job_id)
+                self._update(job_id, status="completed", inserted=result["inserted"],
+                             anomalies=result["anomalies"], errors=result["errors"], finished_at=time.time())
+            except IngestError as e:
+                db.rollback()
+                # Chunks committed before a stream upload failed stay in the counts
+                partial = {k: e.partial[k] for k in ("inserted", "anomalies", "errors")} if e.partial else {}
+                self._update(job_id, status="failed", detail=str(e), finished_at=time.time(), **partial)
+            except Exception as e:
+                db.rollback()
+                self._update(job_id, status="failed", detail=f"Ingest job error: {str(e)}", finished_at=time.time())
+            finally:
+                with self.lock:
+                    self.inflight.pop(content_hash, None)
+                db.close()
+                spool.close()
+
+    def get(self, job_id: str):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: float = None):
+        with self.lock:
+            future = self.futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.get(job_id)
+
+ingest_jobs = IngestJobManager()
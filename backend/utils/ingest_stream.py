@@ -0,0 +1,105 @@
+import asyncio
+import os
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from schemas import TransactionCreate
+from utils.ingest import bulk_insert_scored
+import ml
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "5000"))
+# Micro-batches waiting for the DB writer; when full, the request body stops being read
+STREAM_QUEUE_DEPTH = int(os.getenv("STREAM_QUEUE_DEPTH", "4"))
+
+transaction_adapter = TypeAdapter(TransactionCreate)
+
+def _format_error(line_no: int, exc: ValidationError) -> str:
+    err = exc.errors()[0]
+    loc = ".".join(str(part) for part in err["loc"])
+    return f"Line {line_no}: {loc + ': ' if loc else ''}{err['msg']}"
+
+def write_batch(db: Session, rows: list) -> dict:
+    """
+    Score and insert one micro-batch of validated (timestamp, amount, type, customer_id) tuples, then commit.
+    """
+    df = pd.DataFrame(rows, columns=['timestamp', 'amount', 'type', 'customer_id'])
+    df['is_anomaly'] = ml.detect_anomalies(df)
+    inserted, anomalies = bulk_insert_scored(db, df)
+    db.commit()
+    return {"inserted": inserted, "anomalies": anomalies}
+
+async def ingest_ndjson(db: Session, chunks, batch_size: int = None, queue_depth: int = None) -> dict:
+    """
+    Consume an async iterator of byte chunks holding newline-delimited JSON transactions.
+    Lines are validated as they arrive and grouped into micro-batches that a single writer task
+    scores and bulk inserts off the event loop. The bounded queue between the two applies
+    backpressure: while the writer is behind, no more of the body is read.
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    queue = asyncio.Queue(maxsize=queue_depth or STREAM_QUEUE_DEPTH)
+    result = {"received": 0, "inserted": 0, "anomalies": 0, "errors": [], "batches": 0}
+
+    async def writer():
+        while True:
+            rows = await queue.get()
+            if rows is None:
+                return
+            written = await run_in_threadpool(write_batch, db, rows)
+            result["inserted"] += written["inserted"]
+            result["anomalies"] += written["anomalies"]
+            result["batches"] += 1
+
+    writer_task = asyncio.create_task(writer())
+
+    async def enqueue(rows):
+        # Wait for room in the queue, but surface a writer failure instead of waiting forever
+        put = asyncio.ensure_future(queue.put(rows))
+        await asyncio.wait({put, writer_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            writer_task.result()
+
+    validate = transaction_adapter.validate_json
+    batch = []
+    line_no = 0
+    pending = []  # pieces of the unfinished last line; joined once its newline arrives
+
+    def handle(line: bytes):
+        if not line.strip():
+            return
+        result["received"] += 1
+        try:
+            tx = validate(line)
+        except ValidationError as e:
+            result["errors"].append(_format_error(line_no, e))
+            return
+        batch.append((tx.timestamp, tx.amount, tx.type, tx.customer_id))
+
+    try:
+        async for chunk in chunks:
+            if b"\n" not in chunk:
+                pending.append(chunk)
+                continue
+            lines = chunk.split(b"\n")
+            pending.append(lines[0])
+            lines[0] = b"".join(pending)
+            tail = lines.pop()
+            pending = [tail] if tail else []
+            for line in lines:
+                line_no += 1
+                handle(line)
+                if len(batch) >= batch_size:
+                    await enqueue(batch)
+                    batch = []
+        if pending:
+            line_no += 1
+            handle(b"".join(pending))
+        if batch:
+            await enqueue(batch)
+        await enqueue(None)
+        await writer_task
+    finally:
+        if not writer_task.done():
+            writer_task.cancel()
+    return result
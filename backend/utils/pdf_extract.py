@@ -0,0 +1,134 @@
+"""
+Page-parallel PDF table extraction for statement uploads.
+Kept free of app imports (models, ml) so spawned worker processes start quickly.
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import pandas as pd
+
+TABLE_HEADERS = {'timestamp', 'amount', 'type', 'customer_id'}
+PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "20"))
+# Ranges per worker: smaller ranges let us stop sooner once the table is found
+PDF_RANGES_PER_WORKER = 4
+
+# Long-lived worker pool (started with the app), so uploads do not pay for spawning interpreters
+_pool = None
+_pool_lock = threading.Lock()
+
+def _warm_up():
+    import pdfplumber  # noqa: F401
+
+def _executor(max_workers: int = None) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers or PDF_MAX_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def start(max_workers: int = None):
+    """Create the worker pool and have every worker import pdfplumber ahead of the first upload."""
+    max_workers = max_workers or PDF_MAX_WORKERS
+    if max_workers <= 1:
+        return
+    pool = _executor(max_workers)
+    for _ in range(max_workers):
+        pool.submit(_warm_up)
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _is_transaction_table(table) -> bool:
+    if not table or not table[0]:
+        return False
+    headers = [(h or "").strip().lower() for h in table[0]]
+    return TABLE_HEADERS.issubset(headers)
+
+def _scan_pages(pdf, start: int, stop: int):
+    """
+    Return (page_number, table) for the first transaction table in pages [start, stop), or None.
+    pdf is the file's bytes or, in worker processes, its path.
+    """
+    import pdfplumber
+    with pdfplumber.open(BytesIO(pdf) if isinstance(pdf, bytes) else pdf) as doc:
+        for page_number in range(start, stop):
+            for table in doc.pages[page_number].extract_tables():
+                if _is_transaction_table(table):
+                    return page_number, table
+    return None
+
+def _page_ranges(page_count: int, parts: int):
+    size = max(1, -(-page_count // parts))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def find_transaction_table(pdf_bytes: bytes, max_workers: int = None, min_parallel_pages: int = None):
+    """
+    Locate the first table (in page order) whose header has the transaction columns and return it
+    as a DataFrame, or None. Large PDFs are split into page ranges scanned by the worker pool;
+    remaining ranges are cancelled (and running ones no longer waited for) as soon as an earlier
+    range yields the table.
+    """
+    import pdfplumber
+    max_workers = max_workers or PDF_MAX_WORKERS
+    min_parallel_pages = min_parallel_pages or PDF_PARALLEL_MIN_PAGES
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        page_count = len(pdf.pages)
+
+    if max_workers <= 1 or page_count < min_parallel_pages:
+        match = _scan_pages(pdf_bytes, 0, page_count)
+    else:
+        match = _scan_parallel(pdf_bytes, page_count, max_workers)
+
+    if match is None:
+        return None
+    _, table = match
+    return pd.DataFrame(table[1:], columns=table[0])
+
+def _scan_parallel(pdf_bytes: bytes, page_count: int, max_workers: int):
+    # Workers read the PDF from a temp file rather than getting the bytes pickled with every range
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf_bytes)
+    ranges = _page_ranges(page_count, max_workers * PDF_RANGES_PER_WORKER)
+    remaining = [len(ranges)]
+    lock = threading.Lock()
+
+    def release(count=1):
+        # The temp file goes once every range has finished or been cancelled
+        with lock:
+            remaining[0] -= count
+            last = remaining[0] == 0
+        if last:
+            os.unlink(path)
+
+    pool = _executor(max_workers)
+    futures = []
+    try:
+        for start, stop in ranges:
+            future = pool.submit(_scan_pages, path, start, stop)
+            future.add_done_callback(lambda _: release())
+            futures.append(future)
+        # Futures are checked in page order, so the first hit is the earliest table
+        for future in futures:
+            match = future.result()
+            if match is not None:
+                return match
+        return None
+    except BrokenProcessPool:
+        shutdown()
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+        if len(futures) < len(ranges):
+            release(len(ranges) - len(futures))
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from opentelemetry import trace
+
+tracer = trace.get_tracer(__name__)
+
+RETRAIN_JOB_HISTORY = int(os.getenv("RETRAIN_JOB_HISTORY", "100"))
+
+# Single-flight background retraining: one job runs at a time on a dedicated thread, at most one more
+# waits behind it, and requests arriving while that one waits are folded into it (it trains on the
+# newest data submitted). Request handlers only enqueue, so a fit never ties up a request worker.
+class RetrainJobManager:
+    def __init__(self, train_fn=None, history=RETRAIN_JOB_HISTORY):
+        self.train_fn = train_fn  # default: ml_extended.auto_retrain, imported on first run
+        self.history = history
+        self.jobs = OrderedDict()
+        self.futures = {}
+        self.data = {}        # job_id -> training data of a queued job
+        self.pending = None   # id of the job waiting to run
+        self.running = None   # id of the job being trained
+        self.lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self):
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+            return self._executor
+
+    def submit(self, df) -> dict:
+        """
+        Queue a retrain on df. While another job is still queued, df replaces its data instead and that
+        job's status is returned flagged "coalesced".
+        """
+        with self.lock:
+            if self.pending is not None:
+                job = self.jobs[self.pending]
+                self.data[self.pending] = df
+                job["rows"] = len(df)
+                job["requests"] += 1
+                return dict(job, coalesced=True)
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "status": "queued",
+                "rows": len(df),
+                "requests": 1,
+                "result": None,
+                "detail": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "duration_ms": None,
+            }
+            self.jobs[job_id] = job
+            self.data[job_id] = df
+            self.pending = job_id
+            while len(self.jobs) > self.history:
+                oldest = next(iter(self.jobs))
+                self.jobs.pop(oldest)
+                self.futures.pop(oldest, None)
+            snapshot = dict(job, coalesced=False)
+        future = self.executor.submit(self._run, job_id)
+        with self.lock:
+            self.futures[job_id] = future
+        return snapshot
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+
+    def _run(self, job_id):
+        with tracer.start_as_current_span("retrain_job"):
+            with self.lock:
+                df = self.data.pop(job_id)
+                if self.pending == job_id:
+                    self.pending = None
+                self.running = job_id
+            start = time.time()
+            self._update(job_id, status="running", started_at=start)
+            train_fn = self.train_fn
+            if train_fn is None:
+                from ml_extended import auto_retrain as train_fn
+            try:
+                result = train_fn(df)
+                self._update(job_id, status="completed", result=result)
+            except Exception as e:
+                self._update(job_id, status="failed", detail=f"Retrain job error: {str(e)}")
+            finally:
+                finished = time.time()
+                self._update(job_id, finished_at=finished, duration_ms=(finished - start) * 1000)
+                with self.lock:
+                    self.running = None
+
+    def get(self, job_id: str):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def status(self) -> dict:
+        """Running and queued job ids plus the most recently created job."""
+        with self.lock:
+            latest = dict(next(reversed(self.jobs.values()))) if self.jobs else None
+            return {"running": self.running, "pending": self.pending, "latest": latest}
+
+    def wait(self, job_id: str, timeout: float = None):
+        with self.lock:
+            future = self.futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.get(job_id)
+
+retrain_jobs = RetrainJobManager()
@@ -47,3 +47,22 @@ def record_trading_volume_deviation_percentage(percentage: float, attrs: dict =
 
 def record_compliance_risk_score(score: float, attrs: dict = None):
     compliance_risk_score_metric.record(score, attributes=attrs or {})
+
+# --- Micro-batched scoring (batcher.MicroBatcher) ---
+scoring_batch_rows = meter.create_histogram(
+    "scoring.batch.rows",
+    unit="1",
+    description="Rows per coalesced scoring batch"
+)
+
+scoring_queue_delay = meter.create_histogram(
+    "scoring.queue.delay",
+    unit="ms",
+    description="Time a scoring request waited to be batched"
+)
+
+training_duration = meter.create_histogram(
+    "model.training.duration",
+    unit="ms",
+    description="Duration of model retraining runs"
+)
@@ -0,0 +1,152 @@
+"""
+Background MLflow experiment tracking.
+Scoring code only enqueues; a single worker thread batches params/metrics into log_batch calls and
+uploads a model artifact once per (model, version). Set MLFLOW_TRACKING=false to turn tracking off.
+"""
+import os
+import queue
+import tempfile
+import threading
+import time
+
+MLFLOW_TRACKING = os.getenv("MLFLOW_TRACKING", "true").lower() not in ("0", "false", "off", "no")
+MLFLOW_EXPERIMENT = os.getenv("MLFLOW_EXPERIMENT", "anomaly-detection")
+TRACKING_FLUSH_SECONDS = float(os.getenv("TRACKING_FLUSH_SECONDS", "5"))
+TRACKING_QUEUE_SIZE = int(os.getenv("TRACKING_QUEUE_SIZE", "10000"))
+MLFLOW_BATCH_LIMIT = 1000  # metrics per log_batch request
+
+class ExperimentTracker:
+    def __init__(self, enabled=None, experiment=None, flush_seconds=None, max_queued=None, client=None):
+        self.enabled = MLFLOW_TRACKING if enabled is None else enabled
+        self.experiment = experiment or MLFLOW_EXPERIMENT
+        self.flush_seconds = TRACKING_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.queue = queue.Queue(maxsize=max_queued or TRACKING_QUEUE_SIZE)
+        self.client = client
+        self.run_id = None
+        self.params = {}
+        self.logged_models = set()
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def _put(self, item) -> bool:
+        if not self.enabled:
+            return False
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._worker, name="experiment-tracker", daemon=True)
+                self.thread.start()
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            # Tracking is best effort: never slow down scoring to wait for it
+            self.dropped += 1
+            return False
+
+    def log_metrics(self, metrics: dict, params: dict = None) -> bool:
+        """Queue metrics (and params) for the next batched write. Never blocks."""
+        return self._put(("metrics", int(time.time() * 1000), metrics, params or {}))
+
+    def log_model(self, model, name: str, version) -> bool:
+        """Queue an artifact upload of model; only the first call per (name, version) does anything."""
+        if not self.enabled:
+            return False
+        with self.lock:
+            if (name, version) in self.logged_models:
+                return False
+            self.logged_models.add((name, version))
+        return self._put(("model", name, version, model))
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        if self._put(("flush",)):
+            self.queue.join()
+
+    def close(self):
+        self.flush()
+        if self.run_id is not None and self.client is not None:
+            self.client.set_terminated(self.run_id)
+            self.run_id = None
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "queued": self.queue.qsize(), "dropped": self.dropped,
+                "errors": self.errors, "last_error": self.last_error, "run_id": self.run_id}
+
+    def _mlflow_client(self):
+        if self.client is None:
+            from mlflow.tracking import MlflowClient
+            self.client = MlflowClient()
+        return self.client
+
+    def _run(self, params: dict) -> str:
+        """Current run id; params are immutable per run, so a changed value starts a new run."""
+        client = self._mlflow_client()
+        changed = any(k in self.params and self.params[k] != str(v) for k, v in params.items())
+        if self.run_id is None or changed:
+            if self.run_id is not None:
+                client.set_terminated(self.run_id)
+            experiment = client.get_experiment_by_name(self.experiment)
+            experiment_id = experiment.experiment_id if experiment else client.create_experiment(self.experiment)
+            self.run_id = client.create_run(experiment_id, run_name="anomaly-scoring").info.run_id
+            self.params = {}
+        return self.run_id
+
+    def _write_metrics(self, pending: list):
+        from mlflow.entities import Metric, Param
+        params = {}
+        for _, _, _, p in pending:
+            params.update(p)
+        run_id = self._run(params)
+        new_params = [Param(k, str(v)) for k, v in params.items() if k not in self.params]
+        metrics = [Metric(key, float(value), ts, 0) for _, ts, values, _ in pending for key, value in values.items()]
+        client = self._mlflow_client()
+        for start in range(0, max(len(metrics), 1), MLFLOW_BATCH_LIMIT):
+            client.log_batch(run_id, metrics=metrics[start:start + MLFLOW_BATCH_LIMIT],
+                             params=new_params if start == 0 else [])
+        self.params.update({p.key: p.value for p in new_params})
+
+    def _write_model(self, name: str, version, model):
+        import mlflow.sklearn
+        run_id = self._run({})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model")
+            mlflow.sklearn.save_model(model, path)
+            self._mlflow_client().log_artifacts(run_id, path, f"{name}-v{version}")
+        self._mlflow_client().set_tag(run_id, f"{name}.version", str(version))
+
+    def _write(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+
+    def _worker(self):
+        pending, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item[0] == "metrics":
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+                if len(pending) < MLFLOW_BATCH_LIMIT:
+                    continue
+            # Deadline reached, batch full, flush requested or a model to upload: write what is pending
+            if pending:
+                self._write(self._write_metrics, pending)
+                for _ in pending:
+                    self.queue.task_done()
+                pending, deadline = [], None
+            if item is not None and item[0] == "model":
+                self._write(self._write_model, *item[1:])
+            if item is not None and item[0] != "metrics":
+                self.queue.task_done()
+
+tracker = ExperimentTracker()